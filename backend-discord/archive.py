@@ -0,0 +1,291 @@
+import os
+import sys
+import time
+import wave
+import shutil
+import asyncio
+import hashlib
+import pathlib
+import subprocess
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+
+from recorder import iter_pcm, segment_paths, FLUSH_SIZE
+from storage import run_io
+
+# Recordings that ended more than this many days ago are compressed
+ARCHIVE_AFTER_DAYS = float(os.getenv('ARCHIVE_AFTER_DAYS', 30))
+# 'flac' (lossless) or 'opus' (much smaller, lossy)
+ARCHIVE_FORMAT = os.getenv('ARCHIVE_FORMAT', 'flac')
+ARCHIVE_OPUS_BITRATE = os.getenv('ARCHIVE_OPUS_BITRATE', '48k')
+# Recordings compressed per batch, the catalog is updated after each one
+ARCHIVE_BATCH = int(os.getenv('ARCHIVE_BATCH', 8))
+# Encoder processes. Kept low and niced so the live bot keeps the CPU
+ARCHIVE_WORKERS = int(os.getenv('ARCHIVE_WORKERS', 1))
+# Disk read budget per worker in MB/s, 0 for unlimited
+ARCHIVE_IO_RATE = float(os.getenv('ARCHIVE_IO_RATE', 8))
+
+# {format: (suffix, ffmpeg muxer, encoder args)}
+_CODECS = {
+    'flac': ('.flac', 'flac', ['-c:a', 'flac', '-compression_level', '8']),
+    'opus': ('.opus', 'ogg', ['-c:a', 'libopus', '-b:a', ARCHIVE_OPUS_BITRATE, '-application', 'audio']),
+}
+
+# Allowed difference in length between a recording and its lossy encoding
+_OPUS_TOLERANCE = 0.1
+
+
+class _Throttle:
+    """Sleeps as needed to keep reads under `rate` bytes per second"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.start = time.monotonic()
+        self.total = 0
+
+    def consume(self, size: int):
+        if self.rate <= 0:
+            return
+        self.total += size
+        ahead = self.total / self.rate - (time.monotonic() - self.start)
+        if ahead > 0:
+            time.sleep(ahead)
+
+
+def _lower_priority():
+    # Worker initializer: encoding must never compete with the bot's voice threads
+    try:
+        os.nice(10)
+    except (AttributeError, OSError):
+        pass
+
+
+def _decode(path: pathlib.Path, rate: int, channels: int, throttle: _Throttle):
+    """Return the (sample bytes, sha256) of an encoded file decoded back to PCM"""
+    process = subprocess.Popen(
+        ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-i', str(path),
+         '-f', 's16le', '-ar', str(rate), '-ac', str(channels), 'pipe:1'],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        while True:
+            block = process.stdout.read(FLUSH_SIZE)
+            if not block:
+                break
+            digest.update(block)
+            size += len(block)
+            throttle.consume(len(block))
+    finally:
+        process.stdout.close()
+        returncode = process.wait()
+    if returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to decode {path}")
+    return size, digest.hexdigest()
+
+
+def compress_recording(job: dict) -> dict:
+    """Encode one recording next to the original and verify it. Runs in a worker process.
+
+    `job` holds the recording 'path', the archive 'format' and the 'io_rate'
+    in bytes per second. The encoding is written to a .part file and only
+    renamed into place once it decodes back to the same audio, sample for
+    sample for FLAC and to the same length for Opus. The original is left
+    alone, replacing it is up to the caller.
+    """
+    source = pathlib.Path(job['path'])
+    suffix, muxer, args = _CODECS[job['format']]
+    target = source.with_suffix(suffix)
+    part = target.with_name(target.name + '.part')
+
+    with wave.open(str(segment_paths(source)[0]), 'rb') as wav_file:
+        rate, channels, width = wav_file.getframerate(), wav_file.getnchannels(), wav_file.getsampwidth()
+    if width != 2:
+        raise ValueError(f"{source} is not 16-bit PCM")
+
+    throttle = _Throttle(job['io_rate'])
+    digest = hashlib.sha256()
+    size = 0
+    process = subprocess.Popen(
+        ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+         '-f', 's16le', '-ar', str(rate), '-ac', str(channels), '-i', 'pipe:0', *args, '-f', muxer, str(part)],
+        stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    try:
+        try:
+            for block in iter_pcm(source):
+                digest.update(block)
+                size += len(block)
+                process.stdin.write(block)
+                throttle.consume(len(block))
+        finally:
+            process.stdin.close()
+            errors = process.stderr.read().decode(errors='replace').strip()
+            returncode = process.wait()
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg failed to encode {source}: {errors}")
+
+        with open(part, 'rb') as f:
+            os.fsync(f.fileno())
+
+        decoded_size, decoded_digest = _decode(part, rate, channels, throttle)
+        if job['format'] == 'flac':
+            if decoded_digest != digest.hexdigest():
+                raise RuntimeError(f"{part} does not decode to the original audio")
+        elif abs(decoded_size - size) > _OPUS_TOLERANCE * rate * channels * width:
+            raise RuntimeError(f"{part} is {decoded_size} bytes of audio, expected {size}")
+
+        os.replace(part, target)
+    except BaseException:
+        part.unlink(missing_ok=True)
+        raise
+
+    return {
+        'path': str(source),
+        'archive': str(target),
+        'source_size': sum(p.stat().st_size for p in segment_paths(source)),
+        'file_size': target.stat().st_size,
+        'duration': size / (rate * channels * width)
+    }
+
+
+def _relink_metadata(metadata_path, old_path, new_path):
+    """Point a metadata file's `file_path` line at the compressed recording"""
+    path = pathlib.Path(metadata_path)
+    if not path.exists():
+        return
+    lines = path.read_text(encoding='utf-8').split('\n')
+    for i, line in enumerate(lines):
+        if not line:
+            break  # The transcript follows the first blank line
+        if line == f"file_path: {old_path}":
+            lines[i] = f"file_path: {new_path}"
+    part = path.with_name(path.name + '.part')
+    part.write_text('\n'.join(lines), encoding='utf-8')
+    os.replace(part, path)
+
+
+class Archiver:
+    """Compresses old recordings in the background, one batch at a time.
+
+    Progress lives in the catalog: a recording is switched to its compressed
+    file, and its WAV deleted, as soon as the encoding is verified, so an
+    interrupted run simply continues with the recordings still listed as WAV.
+    `owns` optionally limits the archiver to some guilds, e.g. a shard's.
+    """
+
+    def __init__(self, catalog, *, after_days: float = ARCHIVE_AFTER_DAYS, format: str = ARCHIVE_FORMAT,
+                 batch_size: int = ARCHIVE_BATCH, workers: int = ARCHIVE_WORKERS,
+                 io_rate: float = ARCHIVE_IO_RATE, owns=None):
+        if format not in _CODECS:
+            raise ValueError(f"Unknown archive format {format!r}")
+        self.catalog = catalog
+        self.after = timedelta(days=after_days)
+        self.format = format
+        self.batch_size = batch_size
+        self.workers = workers
+        self.io_rate = io_rate * 1024 * 1024
+        self.owns = owns
+        self.failed = set()  # Paths that failed in this process, not retried until restart
+        self._executor = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def available(self) -> bool:
+        return shutil.which('ffmpeg') is not None
+
+    def pending(self) -> list:
+        """Catalog rows of recordings due for compression"""
+        rows = self.catalog.find_uncompressed(datetime.now() - self.after)
+        return [
+            row for row in rows
+            if row['file_path'] not in self.failed and (self.owns is None or self.owns(row['guild_id']))
+        ]
+
+    def _finish(self, row: dict, result: dict):
+        """Switch the catalog and metadata to the compressed file, then delete the original"""
+        self.catalog.update(row['file_path'], file_path=result['archive'], file_size=result['file_size'])
+        if row['metadata_path']:
+            _relink_metadata(row['metadata_path'], row['file_path'], result['archive'])
+
+        source = pathlib.Path(row['file_path'])
+        if source.is_dir():
+            shutil.rmtree(source)
+        else:
+            source.unlink(missing_ok=True)
+
+    async def run_batch(self) -> dict:
+        """Compress up to `batch_size` recordings. Returns counts and bytes saved"""
+        async with self._lock:
+            stats = {'compressed': 0, 'failed': 0, 'saved': 0, 'remaining': 0}
+            if not self.available:
+                print("Archiving needs ffmpeg, skipping")
+                return stats
+
+            rows = await run_io(self.pending)
+            batch, stats['remaining'] = rows[:self.batch_size], max(0, len(rows) - self.batch_size)
+            if not batch:
+                return stats
+
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_lower_priority)
+            loop = asyncio.get_running_loop()
+            jobs = [{'path': row['file_path'], 'format': self.format, 'io_rate': self.io_rate / self.workers}
+                    for row in batch]
+            results = await asyncio.gather(
+                *(loop.run_in_executor(self._executor, compress_recording, job) for job in jobs),
+                return_exceptions=True
+            )
+
+            for row, result in zip(batch, results):
+                if isinstance(result, BaseException):
+                    print(f"Error archiving {row['file_path']}: {result}")
+                    self.failed.add(row['file_path'])
+                    stats['failed'] += 1
+                    continue
+                try:
+                    await run_io(self._finish, row, result)
+                except OSError as e:
+                    print(f"Error replacing {row['file_path']} with {result['archive']}: {e}")
+                    self.failed.add(row['file_path'])
+                    stats['failed'] += 1
+                    continue
+                stats['compressed'] += 1
+                stats['saved'] += result['source_size'] - result['file_size']
+            return stats
+
+    async def run(self, progress=None) -> dict:
+        """Compress batches until nothing is due. `progress` is called with each batch's stats"""
+        totals = {'compressed': 0, 'failed': 0, 'saved': 0}
+        while True:
+            stats = await self.run_batch()
+            for key in totals:
+                totals[key] += stats[key]
+            if progress is not None:
+                progress(stats)
+            if not stats['remaining'] or not (stats['compressed'] or stats['failed']):
+                return totals
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+if __name__ == '__main__':
+    # python archive.py [days] — compress recordings older than `days`, resuming where the last run stopped
+    from catalog import RecordingCatalog
+
+    days = float(sys.argv[1]) if len(sys.argv) > 1 else ARCHIVE_AFTER_DAYS
+    archiver = Archiver(RecordingCatalog(), after_days=days)
+
+    def report(stats):
+        print(f"Compressed {stats['compressed']}, failed {stats['failed']}, "
+              f"saved {stats['saved'] / 1024 / 1024:.1f} MB, {stats['remaining']} left")
+
+    try:
+        totals = asyncio.run(archiver.run(report))
+    finally:
+        archiver.close()
+    print(f"Done: {totals['compressed']} recordings compressed, {totals['saved'] / 1024 / 1024:.1f} MB saved")
@@ -0,0 +1,428 @@
+import os
+import wave
+import bisect
+import contextlib
+import shutil
+import tempfile
+import subprocess
+import pathlib
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from recorder import segment_paths
+
+# Whisper resamples everything to 16 kHz mono, so there is no point uploading more
+ASR_SAMPLE_RATE = 16000
+# Container for uploads: 'flac' (lossless), 'opus' (smallest) or 'wav'. Needs ffmpeg except for 'wav'
+ASR_FORMAT = os.getenv('ASR_FORMAT', 'flac')
+# Input frames read at a time when converting a recording
+BLOCK_FRAMES = 48000 * 30
+
+# Uploads are split into chunks of about this many seconds, transcribed concurrently
+CHUNK_SECONDS = float(os.getenv('CHUNK_SECONDS', 600))
+# Seconds each chunk runs past its cut into the next one
+CHUNK_OVERLAP = 2.0
+# Chunks are cut at the quietest point in this many seconds before CHUNK_SECONDS
+CHUNK_SEARCH = 30.0
+
+# Length in seconds of the windows the voice activity detector judges
+VAD_FRAME = 0.03
+# RMS level (on the int16 scale) above which a window counts as speech
+VAD_THRESHOLD = float(os.getenv('VAD_THRESHOLD', 200))
+# Pauses longer than this are cut out before upload
+VAD_MIN_SILENCE = float(os.getenv('VAD_MIN_SILENCE', 1.0))
+# Silence kept on each side of speech when a pause is cut
+VAD_PADDING = 0.3
+
+_CODECS = {
+    'flac': ('.flac', ['-c:a', 'flac']),
+    'opus': ('.ogg', ['-c:a', 'libopus', '-b:a', '24k', '-application', 'voip']),
+}
+
+
+def _codec():
+    """Return the (suffix, ffmpeg args) to encode with, or None to write a plain WAV"""
+    if ASR_FORMAT not in _CODECS or not shutil.which('ffmpeg'):
+        return None
+    return _CODECS[ASR_FORMAT]
+
+
+class Downsampler:
+    """Streaming downmix to mono and integer-factor resample to ASR_SAMPLE_RATE.
+
+    Uses a windowed-sinc low-pass evaluated only at the kept output samples, so
+    each block is a single strided matrix-vector product. Filter history and
+    decimation phase carry over between blocks, so a recording can be fed in
+    pieces without clicks at the seams.
+    """
+
+    def __init__(self, rate: int, channels: int, taps_per_phase: int = 8):
+        if rate % ASR_SAMPLE_RATE:
+            raise ValueError(f"Can't resample {rate} Hz to {ASR_SAMPLE_RATE} Hz by an integer factor")
+
+        self.channels = channels
+        self.factor = rate // ASR_SAMPLE_RATE
+
+        # Cut off a little below the new Nyquist frequency to keep aliasing out of the speech band
+        n = taps_per_phase * self.factor + 1
+        t = np.arange(n) - (n - 1) / 2
+        cutoff = 0.9 / self.factor
+        taps = cutoff * np.sinc(cutoff * t) * np.hamming(n)
+        self.taps = (taps / taps.sum()).astype(np.float32)
+
+        self._history = np.zeros(n - 1, dtype=np.float32)
+        self._phase = 0
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Convert interleaved int16 samples and return the 16 kHz mono int16 samples"""
+        mono = samples.reshape(-1, self.channels).mean(axis=1, dtype=np.float32)
+        x = np.concatenate((self._history, mono))
+        self._history = x[len(mono):]
+
+        # Window i of x ends on input sample i, keep every factor-th one
+        windows = sliding_window_view(x, len(self.taps))[self._phase::self.factor]
+        self._phase = (self._phase - len(mono)) % self.factor
+
+        out = windows @ self.taps
+        return np.clip(np.rint(out), -32768, 32767).astype(np.int16)
+
+
+class SilenceRemover:
+    """Streaming energy-based VAD that drops long silences from 16 kHz mono audio.
+
+    Audio is judged in VAD_FRAME windows. Pauses shorter than `min_silence` are
+    kept whole so speech keeps its rhythm, longer ones are cut down to `padding`
+    on each side. `offsets` maps the kept audio back to the input: a list of
+    (output seconds, input seconds) pairs, one per contiguous kept stretch.
+    """
+
+    def __init__(self, threshold: float = VAD_THRESHOLD, min_silence: float = VAD_MIN_SILENCE,
+                 padding: float = VAD_PADDING):
+        self.threshold = threshold
+        self.frame = int(VAD_FRAME * ASR_SAMPLE_RATE)
+        self.min_silence = max(1, int(min_silence / VAD_FRAME))
+        self.padding = max(0, min(int(padding / VAD_FRAME), self.min_silence // 2))
+        self.offsets = []
+
+        self._remainder = np.zeros(0, dtype=np.int16)
+        self._position = 0  # Input samples consumed
+        self._written = 0  # Output samples produced
+        self._next_input = None  # Input position that would continue the current stretch
+        self._silence = []  # (position, frame) of the silence run in progress
+        self._cutting = False  # Whether the run in progress is long enough to be cut
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Feed 16 kHz mono int16 samples and return the samples that are kept so far"""
+        samples = np.concatenate((self._remainder, samples))
+        n = len(samples) // self.frame * self.frame
+        self._remainder = samples[n:]
+        if not n:
+            return samples[:0]
+
+        frames = samples[:n].reshape(-1, self.frame)
+        rms = np.sqrt(np.mean(frames.astype(np.float32) ** 2, axis=1))
+
+        out = []
+        for frame, loud in zip(frames, rms > self.threshold):
+            position = self._position
+            self._position += self.frame
+
+            if loud:
+                if self._cutting:
+                    # Only the padding before the speech resumes survives a cut
+                    self._silence = self._silence[len(self._silence) - self.padding:] if self.padding else []
+                self._emit(self._silence, out)
+                self._silence = []
+                self._cutting = False
+                self._emit([(position, frame)], out)
+                continue
+
+            self._silence.append((position, frame))
+            if not self._cutting and len(self._silence) > self.min_silence:
+                # Long pause: keep the padding after the speech, then only track the tail
+                self._emit(self._silence[:self.padding], out)
+                self._silence = self._silence[self.padding:]
+                self._cutting = True
+            if self._cutting and len(self._silence) > self.padding:
+                del self._silence[0]
+
+        return np.concatenate(out) if out else samples[:0]
+
+    def finish(self) -> np.ndarray:
+        """Return the samples still held back at the end of the input"""
+        out = []
+        if len(self._remainder):
+            frame, self._remainder = self._remainder, self._remainder[:0]
+            self._silence.append((self._position, frame))
+            self._position += len(frame)
+        if not self._cutting:
+            self._emit(self._silence, out)
+        self._silence = []
+        return np.concatenate(out) if out else np.zeros(0, dtype=np.int16)
+
+    def _emit(self, frames, out):
+        for position, frame in frames:
+            if position != self._next_input:
+                self.offsets.append((self._written / ASR_SAMPLE_RATE, position / ASR_SAMPLE_RATE))
+            out.append(frame)
+            self._written += len(frame)
+            self._next_input = position + len(frame)
+
+
+def remap_time(t: float, offsets: list, end: bool = False) -> float:
+    """Map a timestamp in uploaded audio back onto the input's timeline.
+
+    A time exactly on the seam between two stretches belongs to the later one
+    for start times and to the earlier one for `end` times.
+    """
+    if not offsets:
+        return t
+    starts = [output for output, _ in offsets]
+    i = (bisect.bisect_left(starts, t) if end else bisect.bisect_right(starts, t)) - 1
+    output, original = offsets[max(i, 0)]
+    return original + t - output
+
+
+def remap_transcription(transcription: dict, offsets: list) -> dict:
+    """Return a parsed transcription with its segment and word times remapped through `offsets`"""
+    result = dict(transcription)
+    for key in ('segments', 'words'):
+        result[key] = [
+            {**item, 'start': remap_time(item['start'], offsets), 'end': remap_time(item['end'], offsets, end=True)}
+            for item in transcription[key]
+        ]
+    return result
+
+
+class _UploadWriter:
+    """Writes 16 kHz mono int16 blocks to an upload file, encoding through ffmpeg if configured"""
+
+    def __init__(self, out_base: pathlib.Path):
+        codec = _codec()
+        self._process = None
+        self._wav = None
+
+        if codec is not None:
+            suffix, args = codec
+            self.path = out_base.with_suffix(suffix)
+            self._errors = tempfile.TemporaryFile()
+            self._process = subprocess.Popen(
+                ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+                 '-f', 's16le', '-ar', str(ASR_SAMPLE_RATE), '-ac', '1', '-i', 'pipe:0', *args, str(self.path)],
+                stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._errors
+            )
+        else:
+            self.path = out_base.with_suffix('.wav')
+            self._wav = wave.open(str(self.path), 'wb')
+            self._wav.setnchannels(1)
+            self._wav.setsampwidth(2)
+            self._wav.setframerate(ASR_SAMPLE_RATE)
+
+    def write(self, samples: np.ndarray):
+        if not len(samples):
+            return
+        if self._process is not None:
+            self._process.stdin.write(samples.tobytes())
+        else:
+            self._wav.writeframes(samples.tobytes())
+
+    def close(self) -> pathlib.Path:
+        if self._wav is not None:
+            self._wav.close()
+            return self.path
+
+        self._process.stdin.close()
+        returncode = self._process.wait()
+        self._errors.seek(0)
+        errors = self._errors.read().decode(errors='replace')
+        self._errors.close()
+        if returncode != 0:
+            self.path.unlink(missing_ok=True)
+            raise RuntimeError(f"ffmpeg failed to encode {self.path}: {errors}")
+        return self.path
+
+
+class _ChunkWriter:
+    """Splits 16 kHz mono audio into overlapping upload files at quiet points.
+
+    A chunk is cut once it reaches CHUNK_SECONDS, at the quietest VAD frame in
+    the last CHUNK_SEARCH seconds. Each chunk runs CHUNK_OVERLAP seconds past its
+    cut and the next one starts at the cut, so a word spoken across the cut is
+    heard whole by at least one of them.
+    """
+
+    def __init__(self, out_base: pathlib.Path):
+        self.out_base = out_base
+        self.chunks = []  # {'path', 'start', 'end'}: upload file and the span of audio it owns, in seconds
+        self._blocks = []
+        self._buffered = 0
+        self._start = 0  # Position of the buffer's first sample in the whole upload
+
+    def write(self, samples: np.ndarray):
+        if not len(samples):
+            return
+        self._blocks.append(samples)
+        self._buffered += len(samples)
+
+        limit = int((CHUNK_SECONDS + CHUNK_OVERLAP) * ASR_SAMPLE_RATE)
+        while self._buffered >= limit:
+            buffer = np.concatenate(self._blocks)
+            cut = self._find_cut(buffer)
+            self._write_chunk(buffer[:cut + int(CHUNK_OVERLAP * ASR_SAMPLE_RATE)], self._start + cut)
+            self._blocks = [buffer[cut:]]
+            self._buffered = len(buffer) - cut
+            self._start += cut
+
+    def close(self) -> list:
+        if self._buffered:
+            self._write_chunk(np.concatenate(self._blocks), None)
+        self._blocks = []
+        self._buffered = 0
+        return self.chunks
+
+    def discard(self):
+        for chunk in self.chunks:
+            pathlib.Path(chunk['path']).unlink(missing_ok=True)
+
+    def _find_cut(self, buffer: np.ndarray) -> int:
+        frame = int(VAD_FRAME * ASR_SAMPLE_RATE)
+        target = int(CHUNK_SECONDS * ASR_SAMPLE_RATE)
+        first = max(0, target - int(CHUNK_SEARCH * ASR_SAMPLE_RATE)) // frame * frame
+        frames = buffer[first:target // frame * frame].reshape(-1, frame).astype(np.float32)
+        if not len(frames):
+            return target
+        quietest = int(np.argmin(np.mean(frames * frames, axis=1)))
+        return first + quietest * frame + frame // 2
+
+    def _write_chunk(self, samples: np.ndarray, end):
+        writer = _UploadWriter(self.out_base.with_name(f"{self.out_base.name}_{len(self.chunks):03d}"))
+        try:
+            writer.write(samples)
+        except BaseException:
+            with contextlib.suppress(Exception):
+                writer.close()
+            writer.path.unlink(missing_ok=True)
+            raise
+        path = writer.close()
+
+        self.chunks.append({
+            'path': str(path),
+            'start': self._start / ASR_SAMPLE_RATE,
+            'end': end / ASR_SAMPLE_RATE if end is not None else None
+        })
+
+
+def _convert(blocks, out_base: pathlib.Path) -> dict:
+    """Strip silence from 16 kHz mono blocks and write them to chunked upload files.
+
+    Returns the 'chunks' written by `_ChunkWriter` and the 'offsets' map from
+    `SilenceRemover`, which applies to times on the concatenated chunks.
+    """
+    remover = SilenceRemover()
+    writer = _ChunkWriter(out_base)
+    try:
+        for block in blocks:
+            writer.write(remover.process(block))
+        writer.write(remover.finish())
+        chunks = writer.close()
+    except BaseException:
+        writer.discard()
+        raise
+    return {'chunks': chunks, 'offsets': remover.offsets}
+
+
+def stitch_chunks(chunks: list, transcriptions: list) -> dict:
+    """Merge parsed transcriptions of overlapping chunks into one on the upload timeline.
+
+    A segment or word belongs to the chunk whose span contains its midpoint,
+    so whatever was transcribed twice in an overlap is only kept once.
+    """
+    segments, words = [], []
+    for chunk, transcription in zip(chunks, transcriptions):
+        start, end = chunk['start'], chunk['end']
+        for key, items in (('segments', segments), ('words', words)):
+            for item in transcription[key]:
+                item = {**item, 'start': item['start'] + start, 'end': item['end'] + start}
+                middle = (item['start'] + item['end']) / 2
+                if middle >= start and (end is None or middle < end):
+                    items.append(item)
+
+    if len(transcriptions) == 1:
+        text = transcriptions[0]['text']
+    else:
+        text = " ".join(segment['text'] for segment in segments)
+    return {'text': text, 'segments': segments, 'words': words}
+
+
+def write_asr_audio(samples: np.ndarray, rate: int, channels: int, out_base: pathlib.Path) -> dict:
+    """Write int16 PCM already in memory as 16 kHz mono upload files without long silences.
+
+    Downmixing and resampling are done with numpy, the result is piped through
+    ffmpeg encodes when ASR_FORMAT asks for them. `out_base` is the path without
+    a suffix. Returns the same shape as `_convert`.
+    """
+    return write_asr_blocks([samples], rate, channels, out_base)
+
+
+def write_asr_blocks(blocks, rate: int, channels: int, out_base: pathlib.Path) -> dict:
+    """Like `write_asr_audio`, for int16 PCM read in blocks so it never has to be in memory at once"""
+    downsampler = Downsampler(rate, channels)
+    return _convert((downsampler.process(block) for block in blocks), out_base)
+
+
+def _read_blocks(path: pathlib.Path):
+    """Yield a recording, a WAV file or a journal of WAV segments, as 16 kHz mono int16 blocks"""
+    segments = segment_paths(path)
+
+    if shutil.which('ffmpeg'):
+        # One streaming ffmpeg pass downmixes and resamples, joining segments with the concat demuxer
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as playlist:
+            playlist.writelines(f"file '{segment.resolve()}'\n" for segment in segments)
+        process = subprocess.Popen(
+            ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-f', 'concat', '-safe', '0', '-i', playlist.name,
+             '-f', 's16le', '-ac', '1', '-ar', str(ASR_SAMPLE_RATE), 'pipe:1'],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        try:
+            while True:
+                block = process.stdout.read(BLOCK_FRAMES // 3 * 2)
+                if not block:
+                    break
+                yield np.frombuffer(block[:len(block) // 2 * 2], dtype=np.int16)
+        finally:
+            process.stdout.close()
+            returncode = process.wait()
+            os.unlink(playlist.name)
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg failed to decode {path}")
+        return
+
+    downsampler = None
+    for segment in segments:
+        with wave.open(str(segment), 'rb') as wav_file:
+            if downsampler is None:
+                downsampler = Downsampler(wav_file.getframerate(), wav_file.getnchannels())
+            while True:
+                block = wav_file.readframes(BLOCK_FRAMES)
+                if not block:
+                    break
+                yield downsampler.process(np.frombuffer(block, dtype=np.int16))
+
+
+def convert_for_asr(path: pathlib.Path, out_base: pathlib.Path) -> dict:
+    """Convert a recording on disk to 16 kHz mono upload files without long silences.
+
+    The recording is streamed block by block, so memory use doesn't grow with
+    its length. Returns the same shape as `_convert`.
+    """
+    return _convert(_read_blocks(path), out_base)
+
+
+def prepare_recording(path) -> dict:
+    """Convert a mixed recording for upload. Runs in a worker process.
+
+    Returns the 'chunks' to upload and the 'offsets' to remap their timestamps with.
+    """
+    path = pathlib.Path(path)
+    return convert_for_asr(path, path.with_name(f"{path.stem}_asr"))
@@ -0,0 +1,227 @@
+import os
+import sys
+import sqlite3
+import pathlib
+import threading
+from datetime import datetime
+
+from recorder import recording_size
+
+# SQLite database indexing every recording under audio_recordings/
+CATALOG_PATH = pathlib.Path(os.getenv('CATALOG_PATH', 'audio_recordings/catalog.db'))
+
+# Transcript states stored in the catalog
+TRANSCRIPT_NONE = 'none'
+TRANSCRIPT_PENDING = 'pending'
+TRANSCRIPT_DONE = 'done'
+TRANSCRIPT_FAILED = 'failed'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS recordings (
+    id INTEGER PRIMARY KEY,
+    file_path TEXT NOT NULL UNIQUE,
+    metadata_path TEXT,
+    guild_id INTEGER NOT NULL,
+    guild_name TEXT,
+    channel_id INTEGER,
+    channel_name TEXT,
+    start_time TEXT NOT NULL,
+    end_time TEXT,
+    duration REAL,
+    file_size INTEGER,
+    transcript_status TEXT NOT NULL DEFAULT 'none',
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS recordings_guild_time ON recordings (guild_id, start_time);
+CREATE INDEX IF NOT EXISTS recordings_channel_time ON recordings (channel_id, start_time);
+CREATE INDEX IF NOT EXISTS recordings_time ON recordings (start_time, end_time);
+CREATE INDEX IF NOT EXISTS recordings_duration ON recordings (duration);
+CREATE INDEX IF NOT EXISTS recordings_size ON recordings (file_size);
+CREATE INDEX IF NOT EXISTS recordings_status ON recordings (transcript_status);
+"""
+
+_COLUMNS = (
+    'file_path', 'metadata_path', 'guild_id', 'guild_name', 'channel_id', 'channel_name',
+    'start_time', 'end_time', 'duration', 'file_size', 'transcript_status'
+)
+
+
+class RecordingCatalog:
+    """Index of recordings so they can be found without scanning metadata files.
+
+    Every method runs a single transaction. Connections are per thread, so
+    the catalog can be used from the recording I/O executor through `run_io`.
+    """
+
+    def __init__(self, path=CATALOG_PATH):
+        self.path = pathlib.Path(path)
+        self._local = threading.local()
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            # WAL lets readers and the bot's writes proceed at the same time
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def upsert(self, **fields):
+        """Insert or update the recording with `file_path`.
+
+        Needs at least 'guild_id' and 'start_time', stored fields that are not
+        given keep their values. Use `update` to change an existing recording.
+        """
+        self.upsert_many([fields])
+
+    def upsert_many(self, rows: list):
+        """Insert or update many recordings in one transaction"""
+        conn = self._connection()
+        with conn:
+            for fields in rows:
+                fields = self._prepare(fields)
+                names = list(fields)
+                updates = ", ".join(f"{name} = excluded.{name}" for name in names if name != 'file_path')
+                conn.execute(
+                    f"INSERT INTO recordings ({', '.join(names)}) VALUES ({', '.join('?' * len(names))}) "
+                    f"ON CONFLICT (file_path) DO UPDATE SET {updates}",
+                    [fields[name] for name in names]
+                )
+
+    def update(self, file_path, /, **fields) -> bool:
+        """Change fields of the recording with `file_path`, which may itself be renamed.
+
+        Returns False if there is no such recording.
+        """
+        fields = self._prepare(fields)
+        names = list(fields)
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(
+                f"UPDATE recordings SET {', '.join(f'{name} = ?' for name in names)} WHERE file_path = ?",
+                [fields[name] for name in names] + [str(file_path)]
+            )
+        return cursor.rowcount > 0
+
+    def set_status(self, file_path, status: str) -> bool:
+        return self.update(file_path, transcript_status=status)
+
+    def _prepare(self, fields: dict) -> dict:
+        unknown = set(fields) - set(_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown catalog columns: {', '.join(sorted(unknown))}")
+
+        fields = {**fields, 'updated_at': datetime.now().isoformat()}
+        for name in ('file_path', 'metadata_path'):
+            if fields.get(name) is not None:
+                fields[name] = str(fields[name])
+        return fields
+
+    def find(self, guild_id: int = None, channel_id: int = None, since: datetime = None,
+             until: datetime = None, status: str = None, limit: int = None) -> list:
+        """Return recordings matching every filter given, newest first"""
+        clauses, params = [], []
+        if guild_id is not None:
+            clauses.append("guild_id = ?")
+            params.append(guild_id)
+        if channel_id is not None:
+            clauses.append("channel_id = ?")
+            params.append(channel_id)
+        if since is not None:
+            clauses.append("start_time >= ?")
+            params.append(since.isoformat())
+        if until is not None:
+            clauses.append("start_time < ?")
+            params.append(until.isoformat())
+        if status is not None:
+            clauses.append("transcript_status = ?")
+            params.append(status)
+
+        query = "SELECT * FROM recordings"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY start_time DESC"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+
+        return [dict(row) for row in self._connection().execute(query, params)]
+
+    def find_uncompressed(self, ended_before: datetime) -> list:
+        """Return finished WAV recordings that ended before `ended_before`, oldest first.
+
+        Recordings still being transcribed are left out so their audio is not
+        replaced while it is read.
+        """
+        query = (
+            "SELECT * FROM recordings WHERE end_time < ? AND transcript_status != ? "
+            "AND (file_path LIKE '%.wav' OR file_path LIKE '%.journal') ORDER BY start_time"
+        )
+        return [dict(row) for row in self._connection().execute(query, (ended_before.isoformat(), TRANSCRIPT_PENDING))]
+
+    def import_metadata(self, directory) -> int:
+        """Bulk-import every *_metadata.txt file under `directory`. Returns the number imported"""
+        rows = []
+        for metadata_path in sorted(pathlib.Path(directory).glob('*/*_metadata.txt')):
+            try:
+                row = parse_metadata(metadata_path)
+            except (OSError, ValueError) as e:
+                print(f"Skipping {metadata_path}: {e}")
+                continue
+            if row is not None:
+                rows.append(row)
+
+        self.upsert_many(rows)
+        return len(rows)
+
+
+def parse_metadata(metadata_path: pathlib.Path):
+    """Turn a metadata file written by storage.write_metadata into catalog fields"""
+    metadata = {}
+    has_transcript = False
+    with open(metadata_path, encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line:
+                # A blank line separates the metadata from the transcript
+                has_transcript = bool(f.read().strip())
+                break
+            key, sep, value = line.partition(': ')
+            if sep:
+                metadata[key] = value
+
+    if 'file_path' not in metadata or 'guild_id' not in metadata or 'start_time' not in metadata:
+        return None
+
+    # Recordings made on Windows store backslashes, which pathlib on POSIX takes as part of the name
+    file_path = pathlib.Path(pathlib.PureWindowsPath(metadata['file_path']).as_posix())
+    if not file_path.exists():
+        # Relative to wherever the bot ran, try next to the metadata file instead
+        sibling = metadata_path.parent / file_path.name
+        if sibling.exists():
+            file_path = sibling
+    start_time = datetime.fromisoformat(metadata['start_time'])
+    end_time = datetime.fromisoformat(metadata['end_time']) if 'end_time' in metadata else None
+
+    return {
+        'file_path': str(file_path),
+        'metadata_path': str(metadata_path),
+        'guild_id': int(metadata['guild_id']),
+        'guild_name': metadata.get('guild_name'),
+        'channel_name': metadata.get('channel_name'),
+        'start_time': start_time.isoformat(),
+        'end_time': end_time.isoformat() if end_time else None,
+        'duration': (end_time - start_time).total_seconds() if end_time else None,
+        'file_size': recording_size(file_path) if file_path.exists() else None,
+        'transcript_status': TRANSCRIPT_DONE if has_transcript else TRANSCRIPT_NONE
+    }
+
+
+if __name__ == '__main__':
+    # python catalog.py [recordings directory]
+    directory = sys.argv[1] if len(sys.argv) > 1 else 'audio_recordings'
+    count = RecordingCatalog().import_metadata(directory)
+    print(f"Imported {count} recordings into {CATALOG_PATH}")
@@ -6,6 +6,11 @@ from .sinks import *
 from .video import *
 from .opus import *
 from .rtp import *
+from .ogg import *
+from .pool import *
+from .buffer import *
+from .telemetry import *
+from .timers import *
 
 from . import (
     rtp as rtp,
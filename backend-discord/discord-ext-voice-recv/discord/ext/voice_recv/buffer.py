@@ -2,19 +2,36 @@
 
 from __future__ import annotations
 
+import math
+import time
 import heapq
 import threading
 
-from typing import TYPE_CHECKING, overload
+from .rtp import FakePacket
+
+from discord.opus import Decoder
+
+from typing import TYPE_CHECKING, Final, overload
 
 if TYPE_CHECKING:
-    from typing import Literal, Optional, List
+    from typing import Literal, Optional, List, Union
     from .rtp import RTPPacket
 
+    JitterBuffer = Union['HeapJitterBuffer', 'RingJitterBuffer']
+
 __all__ = [
     'HeapJitterBuffer',
+    'RingJitterBuffer',
+    'AdaptiveJitterBuffer',
+    'JitterEstimator',
 ]
 
+FRAME_DURATION: Final = Decoder.FRAME_LENGTH / 1000
+
+# Returned by RingJitterBuffer.pop() for a sequence number it gave up waiting for.
+# Falsy like FakePacket, so the decoder conceals the missing frame.
+GAP: Final = FakePacket(0, 0, 0)
+
 
 class HeapJitterBuffer:
     """Push item in, pop items out"""
@@ -46,6 +63,16 @@ class HeapJitterBuffer:
     def __len__(self) -> int:
         return len(self._buffer)
 
+    @property
+    def ready(self) -> bool:
+        """Whether a packet can be popped right now without waiting."""
+        return self._has_item.is_set() and self._prefill == 0
+
+    @property
+    def delay(self) -> float:
+        """How long the buffer may deliberately hold packets back, in seconds."""
+        return 0.0
+
     def _push(self, packet: RTPPacket, seq: int) -> None:
         heapq.heappush(self._buffer, (seq, packet))
 
@@ -208,3 +235,400 @@ class HeapJitterBuffer:
         self._has_item.clear()
         self._prefill = self.prefill
         self._last_tx = self._last_rx = self._generation = self._generation_ts = 0
+
+
+class RingJitterBuffer:
+    """Fixed capacity jitter buffer indexed by ``sequence % maxsize``.
+
+    Sequence numbers are unwrapped against the newest one received, so 16 bit
+    rollover needs no special casing.  Push, pop, :meth:`peek_next` and gap
+    detection are O(1); only :meth:`flush` and looking past a gap walk slots.
+    Every method holds a lock, so pushing from the socket thread and popping
+    from the router thread is safe.
+
+    Unlike :class:`HeapJitterBuffer`, packets that arrive out of order are kept
+    as long as their turn has not passed yet.  A missing packet is waited on
+    until ``maxsize`` sequence numbers are pending, then :meth:`pop` returns a
+    falsy placeholder so the decoder can conceal it (using fec from the next
+    packet when it is there) instead of skipping it silently.
+    """
+
+    def __init__(self, maxsize: int = 10, *, prefsize: int = 1, prefill: int = 1):
+        if maxsize < 1:
+            raise ValueError(f'maxsize ({maxsize}) must be greater than 0')
+
+        if not 0 <= prefsize <= maxsize:
+            raise ValueError(f'prefsize must be between 0 and maxsize ({maxsize})')
+
+        self.maxsize: int = maxsize
+        self.prefsize: int = prefsize
+        self.prefill: int = prefill
+        self._prefill: int = prefill
+
+        self._slots: List[Optional[RTPPacket]] = [None] * maxsize
+        self._count: int = 0
+        # Unwrapped sequence numbers: the next one to pop, and the newest one received
+        self._next: Optional[int] = None
+        self._newest: Optional[int] = None
+        self._started: bool = False  # whether anything was popped since the last reset
+        # How many sequence numbers may be pending before a missing one is given up on
+        self._patience: int = maxsize
+
+        self.late: int = 0  # packets dropped because their turn had passed
+
+        self._lock: threading.Lock = threading.Lock()
+        self._has_item: threading.Condition = threading.Condition(self._lock)
+        self._ready: bool = False
+
+    def __bool__(self) -> bool:
+        return self._count > 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def ready(self) -> bool:
+        """Whether a packet can be popped right now without waiting."""
+        return self._ready
+
+    @property
+    def delay(self) -> float:
+        """How long the buffer may deliberately hold packets back, in seconds."""
+        return (self._patience - 1) * FRAME_DURATION
+
+    def _unwrap(self, sequence: int) -> int:
+        if self._newest is None:
+            return sequence
+
+        delta = (sequence - self._newest) & 0xFFFF
+        if delta >= 0x8000:
+            delta -= 0x10000
+        return self._newest + delta
+
+    def _update_ready(self) -> None:
+        if self._prefill > 0 or not self._count:
+            self._ready = False
+        else:
+            self._ready = (
+                self._slots[self._next % self.maxsize] is not None  # type: ignore
+                and self._count > self.prefsize
+            ) or self._newest - self._next + 1 >= self._patience  # type: ignore
+        if self._ready:
+            self._has_item.notify_all()
+
+    def _advance_to(self, seq: int) -> None:
+        # Drop everything before `seq` to make room, the window can only move forward
+        if seq - self._next >= self.maxsize:  # type: ignore
+            self._slots = [None] * self.maxsize
+            self._count = 0
+        else:
+            for s in range(self._next, seq):  # type: ignore
+                index = s % self.maxsize
+                if self._slots[index] is not None:
+                    self._slots[index] = None
+                    self._count -= 1
+        self._next = seq
+
+    def push(self, packet: RTPPacket) -> bool:
+        """
+        Push a packet into the buffer.  Returns False if the packet was too late or
+        a duplicate.  A packet too far ahead moves the window, dropping the oldest.
+        """
+
+        with self._lock:
+            seq = self._unwrap(packet.sequence)
+
+            if self._next is None:
+                self._next = self._newest = seq
+            elif seq < self._next:
+                # Late, unless nothing was played yet and it still fits in the window
+                if self._started or self._newest - seq >= self.maxsize:  # type: ignore
+                    self.late += 1
+                    return False
+                self._next = seq
+
+            if seq >= self._next + self.maxsize:
+                self._advance_to(seq - self.maxsize + 1)
+                if not self._count:
+                    # Nothing left to wait for, no point concealing the whole window
+                    self._next = seq
+
+            index = seq % self.maxsize
+            if self._slots[index] is not None:
+                return False
+
+            self._slots[index] = packet
+            self._count += 1
+            self._newest = max(self._newest, seq)  # type: ignore
+
+            if self._prefill > 0:
+                self._prefill -= 1
+
+            self._update_ready()
+            return True
+
+    def _pop(self) -> Optional[RTPPacket]:
+        if not self._ready:
+            return None
+
+        index = self._next % self.maxsize  # type: ignore
+        packet = self._slots[index]
+        if packet is None:
+            packet = GAP
+        else:
+            self._slots[index] = None
+            self._count -= 1
+
+        self._next += 1  # type: ignore
+        self._started = True
+        self._update_ready()
+        return packet
+
+    @overload
+    def pop(self, *, timeout: float = 1.0) -> Optional[RTPPacket]:
+        ...
+
+    @overload
+    def pop(self, *, timeout: Literal[0]) -> Optional[RTPPacket]:
+        ...
+
+    def pop(self, *, timeout=1.0):
+        """
+        If timeout is a positive number, wait as long as timeout for a packet
+        to be ready and return that packet, otherwise return None.  The packet
+        is falsy if it was given up on and should be concealed.
+        """
+
+        with self._lock:
+            if timeout and not self._ready:
+                self._has_item.wait(timeout)
+            return self._pop()
+
+    def _first(self) -> Optional[RTPPacket]:
+        if not self._count:
+            return None
+
+        for seq in range(self._next, self._newest + 1):  # type: ignore
+            packet = self._slots[seq % self.maxsize]
+            if packet is not None:
+                return packet
+
+    def peek(self, *, all: bool = False) -> Optional[RTPPacket]:
+        """
+        Returns the next packet in the buffer only if it is ready, meaning it can
+        be popped. When `all` is set to True, it returns the next packet, if any.
+        """
+
+        with self._lock:
+            if all:
+                return self._first()
+            if self._ready:
+                return self._slots[self._next % self.maxsize]  # type: ignore
+
+    def peek_next(self) -> Optional[RTPPacket]:
+        """
+        Returns the next packet in the buffer only if it is sequential.
+        """
+
+        with self._lock:
+            if self._next is None:
+                return None
+            return self._slots[self._next % self.maxsize]
+
+    def gap(self) -> int:
+        """
+        Returns the number of missing packets between the last packet to be
+        popped and the next packet held.  Returns 0 otherwise.
+        """
+
+        with self._lock:
+            if not self._started or not self._count:
+                return 0
+
+            first = self._first()
+            return self._unwrap(first.sequence) - self._next if first is not None else 0  # type: ignore
+
+    def flush(self) -> List[RTPPacket]:
+        """
+        Return all remaining packets.
+        """
+
+        with self._lock:
+            packets = []
+            if self._count:
+                for seq in range(self._next, self._newest + 1):  # type: ignore
+                    index = seq % self.maxsize
+                    if self._slots[index] is not None:
+                        packets.append(self._slots[index])
+                        self._slots[index] = None
+
+                self._next = self._newest + 1  # type: ignore
+                self._started = True
+
+            self._count = 0
+            self._prefill = self.prefill
+            self._ready = False
+
+            return packets
+
+    def reset(self) -> None:
+        """
+        Clear buffer and reset internal counters.
+        """
+
+        with self._lock:
+            self._slots = [None] * self.maxsize
+            self._count = 0
+            self._next = self._newest = None
+            self._started = False
+            self._prefill = self.prefill
+            self._ready = False
+
+
+class JitterEstimator:
+    """Interarrival jitter of one stream, estimated as in RFC 3550 section 6.4.1.
+
+    Jitter reported by RTCP receiver reports can be fed in with :meth:`report`,
+    in which case :attr:`jitter` is the larger of the two.
+    """
+
+    # Transit time changes bigger than this are a new talk spurt, not jitter
+    MAX_DELTA: Final = 1.0
+
+    def __init__(self, clock_rate: int = Decoder.SAMPLING_RATE):
+        self.clock_rate: int = clock_rate
+        self.estimate: float = 0.0  # seconds
+        self.reported: float = 0.0  # seconds
+
+        self._last_timestamp: Optional[int] = None
+        self._last_arrival: float = 0.0
+
+    @property
+    def jitter(self) -> float:
+        """The current jitter estimate, in seconds."""
+        return max(self.estimate, self.reported)
+
+    def update(self, timestamp: int, arrival: float) -> float:
+        """Updates the estimate with a packet's rtp timestamp and arrival time in seconds."""
+
+        if self._last_timestamp is not None:
+            elapsed = ((timestamp - self._last_timestamp + 0x80000000) & 0xFFFFFFFF) - 0x80000000
+            delta = abs((arrival - self._last_arrival) - elapsed / self.clock_rate)
+            if delta < self.MAX_DELTA:
+                self.estimate += (delta - self.estimate) / 16
+
+        self._last_timestamp = timestamp
+        self._last_arrival = arrival
+        return self.jitter
+
+    def report(self, jitter: int) -> None:
+        """Takes the jitter field of an rtcp report block, in timestamp units."""
+        self.reported = jitter / self.clock_rate
+
+    def reset(self) -> None:
+        self.estimate = self.reported = 0.0
+        self._last_timestamp = None
+
+
+class AdaptiveJitterBuffer(RingJitterBuffer):
+    """A :class:`RingJitterBuffer` whose playout delay follows the measured jitter.
+
+    The delay is ``headroom`` times the jitter estimate, rounded up to whole
+    frames and kept between ``min_delay`` and ``max_delay`` seconds.  It is
+    both how many packets are held before the oldest is released and how long
+    a missing packet is waited on before it is concealed.  The delay grows as
+    soon as jitter rises or a packet arrives too late to be used, and shrinks
+    by one frame at most every ``decay`` packets, so a single quiet second does
+    not undo it.
+
+    :meth:`live` and :meth:`archival` make buffers tuned for the two ends:
+    the lowest latency the network allows, or the fewest concealed frames.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 32,
+        *,
+        min_delay: float = FRAME_DURATION,
+        max_delay: float = 0.2,
+        headroom: float = 2.0,
+        decay: int = 50,
+        prefill: int = 1,
+    ):
+        min_frames = max(0, round(min_delay / FRAME_DURATION))
+        max_frames = round(max_delay / FRAME_DURATION)
+        if not min_frames <= max_frames < maxsize:
+            raise ValueError(f'delays must be ordered and shorter than maxsize ({maxsize}) frames')
+
+        super().__init__(maxsize, prefsize=min_frames, prefill=prefill)
+
+        self.min_frames: int = min_frames
+        self.max_frames: int = max_frames
+        self.headroom: float = headroom
+        self.decay: int = decay
+        self.estimator: JitterEstimator = JitterEstimator()
+
+        self._since_change: int = 0
+        self._set_frames(min_frames)
+
+    @classmethod
+    def live(cls) -> AdaptiveJitterBuffer:
+        """For sinks that want audio as soon as possible, like live transcription."""
+        return cls(min_delay=FRAME_DURATION, max_delay=0.12, headroom=2.0)
+
+    @classmethod
+    def archival(cls) -> AdaptiveJitterBuffer:
+        """For sinks that keep the audio, where latency matters less than gaps."""
+        return cls(min_delay=3 * FRAME_DURATION, max_delay=0.4, headroom=4.0, decay=250)
+
+    @property
+    def jitter(self) -> float:
+        """The current jitter estimate, in seconds."""
+        return self.estimator.jitter
+
+    @property
+    def frames(self) -> int:
+        """The current playout delay, in frames."""
+        return self.prefsize
+
+    def _set_frames(self, frames: int) -> None:
+        # Called with _lock held, or from __init__
+        self.prefsize = frames
+        self._patience = frames + 1
+        self._since_change = 0
+
+    def _adapt(self, *, late: bool) -> None:
+        target = math.ceil(self.headroom * self.estimator.jitter / FRAME_DURATION)
+        if late:
+            target = max(target, self.prefsize + 1)
+        target = min(max(target, self.min_frames), self.max_frames)
+
+        with self._lock:
+            self._since_change += 1
+            if target > self.prefsize:
+                self._set_frames(target)
+            elif target < self.prefsize and self._since_change >= self.decay:
+                self._set_frames(self.prefsize - 1)
+            else:
+                return
+
+            self._update_ready()
+
+    def push(self, packet: RTPPacket) -> bool:
+        self.estimator.update(packet.timestamp, time.monotonic())
+
+        late = self.late
+        accepted = super().push(packet)
+        self._adapt(late=self.late != late)
+        return accepted
+
+    def report_jitter(self, jitter: int) -> None:
+        """Takes the jitter field of an rtcp report block about this stream, in timestamp units."""
+        self.estimator.report(jitter)
+        self._adapt(late=False)
+
+    def reset(self) -> None:
+        super().reset()
+        self.estimator.reset()
+        with self._lock:
+            self._set_frames(self.min_frames)
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import annotations
+
+import random
+import struct
+import logging
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import IO, List
+
+log = logging.getLogger(__name__)
+
+__all__ = [
+    'OggOpusWriter',
+    'opus_packet_samples',
+]
+
+
+def _make_crc_table() -> List[int]:
+    table = []
+    for i in range(256):
+        r = i << 24
+        for _ in range(8):
+            r = (r << 1) ^ 0x04C11DB7 if r & 0x80000000 else r << 1
+        table.append(r & 0xFFFFFFFF)
+    return table
+
+
+_CRC_TABLE = _make_crc_table()
+
+# 48 kHz samples per frame for each TOC config, see RFC 6716 section 3.1
+_FRAME_SAMPLES = (
+    [480, 960, 1920, 2880] * 3  # SILK 10/20/40/60 ms
+    + [480, 960] * 2  # Hybrid 10/20 ms
+    + [120, 240, 480, 960] * 4  # CELT 2.5/5/10/20 ms
+)
+
+
+def _ogg_crc(data: bytes) -> int:
+    crc = 0
+    table = _CRC_TABLE
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ table[((crc >> 24) ^ byte) & 0xFF]
+    return crc
+
+
+def opus_packet_samples(packet: bytes) -> int:
+    """Returns the duration of an opus packet in 48 kHz samples, read from its TOC byte."""
+    if not packet:
+        return 0
+
+    toc = packet[0]
+    frame_samples = _FRAME_SAMPLES[toc >> 3]
+    code = toc & 0x03
+
+    if code == 0:
+        frames = 1
+    elif code != 3:
+        frames = 2
+    elif len(packet) > 1:
+        frames = packet[1] & 0x3F
+    else:
+        frames = 0
+
+    return frame_samples * frames
+
+
+class OggOpusWriter:
+    """Writes opus packets into an Ogg Opus stream (RFC 7845) without re-encoding.
+
+    Granule positions are supplied by the caller in 48 kHz samples, the same
+    clock as rtp timestamps.  Packets are collected into pages of up to
+    ``page_duration`` seconds of audio before being written out.
+    """
+
+    PAGE_SIZE_LIMIT = 4096
+
+    def __init__(
+        self,
+        file: IO[bytes],
+        *,
+        channels: int = 2,
+        pre_skip: int = 0,
+        page_duration: float = 1.0,
+        vendor: str = 'discord-ext-voice-recv',
+    ):
+        self.file: IO[bytes] = file
+        self.page_duration_samples: int = int(page_duration * 48000)
+
+        self._serial: int = random.getrandbits(32)
+        self._sequence: int = 0
+        self._granule: int = 0
+        self._page_start_granule: int = 0
+        self._packets: List[bytes] = []
+        self._segments: int = 0
+        self._size: int = 0
+        self._closed: bool = False
+
+        head = struct.pack('<8sBBHIhB', b'OpusHead', 1, channels, pre_skip, 48000, 0, 0)
+        vendor_bytes = vendor.encode()
+        tags = b'OpusTags' + struct.pack('<I', len(vendor_bytes)) + vendor_bytes + struct.pack('<I', 0)
+
+        # the headers each get a page of their own
+        self._write_page([head], 0, 0x02)
+        self._write_page([tags], 0, 0x00)
+
+    @property
+    def granule(self) -> int:
+        """The granule position of the last packet written."""
+        return self._granule
+
+    def write(self, packet: bytes, granule: int) -> None:
+        """Adds a packet that ends at ``granule`` samples into the stream."""
+        if self._closed:
+            raise ValueError('write to closed OggOpusWriter')
+
+        segments = len(packet) // 255 + 1
+        if self._packets and (
+            self._segments + segments > 255 or self._size + len(packet) > self.PAGE_SIZE_LIMIT
+        ):
+            self.flush()
+
+        if not self._packets:
+            self._page_start_granule = self._granule
+
+        self._packets.append(packet)
+        self._segments += segments
+        self._size += len(packet)
+        self._granule = granule
+
+        if granule - self._page_start_granule >= self.page_duration_samples:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes out the packets collected so far as a page."""
+        if self._packets:
+            self._write_page(self._packets, self._granule, 0x00)
+            self._packets = []
+            self._segments = self._size = 0
+
+    def close(self) -> None:
+        """Writes the final page, marked end of stream.  Does not close the file."""
+        if self._closed:
+            return
+
+        self._closed = True
+        self._write_page(self._packets, self._granule, 0x04)
+        self._packets = []
+
+    def _write_page(self, packets: List[bytes], granule: int, header_type: int) -> None:
+        lacing = bytearray()
+        for packet in packets:
+            full, rest = divmod(len(packet), 255)
+            lacing += b'\xff' * full
+            lacing.append(rest)
+
+        header = struct.pack(
+            '<4sBBqIIIB', b'OggS', 0, header_type, granule, self._serial, self._sequence, 0, len(lacing)
+        )
+        page = bytearray(header)
+        page += lacing
+        for packet in packets:
+            page += packet
+
+        struct.pack_into('<I', page, 22, _ogg_crc(page))
+        self.file.write(page)
+        self._sequence += 1
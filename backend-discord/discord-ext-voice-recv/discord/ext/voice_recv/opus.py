@@ -6,17 +6,20 @@ import logging
 
 from typing import TYPE_CHECKING, Final
 
-from .buffer import HeapJitterBuffer as JitterBuffer
 from .rtp import FakePacket
+from .buffer import AdaptiveJitterBuffer
 
 from discord.opus import Decoder
 
 if TYPE_CHECKING:
-    from typing import Optional, Tuple, Dict, Callable, Any
+    from typing import Optional, Tuple, Dict, List, Callable, Any
     from .rtp import RTPPacket, AudioPacket
     from .sinks import AudioSink
     from .router import PacketRouter
     from .voice_client import VoiceRecvClient
+    from .pool import VoicePool, PCMBuffer
+    from .telemetry import StreamStats
+    from .buffer import JitterBuffer
     from .types import MemberOrUser as User
 
     EventCB = Callable[..., Any]
@@ -34,25 +37,65 @@ BUFFER_TIMEOUT: Final = 0.05
 class VoiceData:
     """Container object for audio data and source user."""
 
-    __slots__ = ('packet', 'source', 'pcm')
+    __slots__ = ('packet', 'source', 'pcm', '_buffer')
 
     def __init__(self, packet: AudioPacket, source: Optional[User], *, pcm: Optional[bytes] = None):
         self.packet: AudioPacket = packet
         self.source: Optional[User] = source
         self.pcm: bytes = pcm if pcm else b''
+        self._buffer: Optional[PCMBuffer] = None  # set when pcm is decoded into a pooled buffer
 
     @property
     def opus(self) -> Optional[bytes]:
         return self.packet.decrypted_data
 
 
+class DecodeJob:
+    """A popped packet and the decoder call that turns it into pcm.
+
+    Everything that depends on the jitter buffer (like choosing fec data) is
+    decided when the job is made, so :meth:`run` can happen on another thread.
+    Jobs from the same decoder must still be run one at a time, in order.
+    """
+
+    __slots__ = ('data', 'decoder', 'opus', 'fec', 'pool')
+
+    def __init__(
+        self,
+        data: VoiceData,
+        decoder: Optional[Decoder],
+        opus: Optional[bytes],
+        fec: bool,
+        pool: Optional[VoicePool] = None,
+    ):
+        self.data: VoiceData = data
+        self.decoder: Optional[Decoder] = decoder
+        self.opus: Optional[bytes] = opus
+        self.fec: bool = fec
+        self.pool: Optional[VoicePool] = pool
+
+    @property
+    def ssrc(self) -> int:
+        return self.data.packet.ssrc
+
+    def run(self) -> VoiceData:
+        if self.decoder is None:
+            pass
+        elif self.pool is not None:
+            self.pool.decode(self.data, self.decoder, self.opus, self.fec)
+        else:
+            self.data.pcm = self.decoder.decode(self.opus, fec=self.fec)
+        return self.data
+
+
 class PacketDecoder:
     def __init__(self, router: PacketRouter, ssrc: int):
         self.router: PacketRouter = router
         self.ssrc: int = ssrc
 
         self._decoder: Optional[Decoder] = None if self.sink.wants_opus() else Decoder()
-        self._buffer: JitterBuffer = JitterBuffer()
+        self._buffer: JitterBuffer = router.jitter_buffer()
+        self.stats: StreamStats = router.telemetry.stream(ssrc)
         self._cached_id: Optional[int] = None
 
         self._last_ts: int = 0
@@ -69,15 +112,58 @@ class PacketDecoder:
     def _get_cached_member(self) -> Optional[User]:
         return self._get_user(self._cached_id) if self._cached_id else None
 
-    def push_packet(self, packet: RTPPacket) -> None:
-        self._buffer.push(packet)
+    @property
+    def ready(self) -> bool:
+        """Whether a packet can be popped without waiting."""
+        return self._buffer.ready
+
+    @property
+    def pending(self) -> bool:
+        """Whether any packets are buffered, ready or not."""
+        return bool(self._buffer)
+
+    @property
+    def depth(self) -> int:
+        """How many packets are buffered."""
+        return len(self._buffer)
+
+    @property
+    def timeout(self) -> float:
+        """How long buffered packets may wait for the next one before being flushed."""
+        return BUFFER_TIMEOUT + self._buffer.delay
+
+    def push_packet(self, packet: RTPPacket) -> bool:
+        accepted = self._buffer.push(packet)
+        self.stats.packet_received(packet, accepted=accepted, depth=len(self._buffer))
+        return accepted
 
     def pop_data(self, *, timeout: float = BUFFER_TIMEOUT) -> Optional[VoiceData]:
+        job = self.pop_job(timeout=timeout)
+        if job is None:
+            return
+
+        return job.run()
+
+    def pop_job(self, *, timeout: float = BUFFER_TIMEOUT) -> Optional[DecodeJob]:
+        """Like :meth:`pop_data`, but leaves decoding to the caller."""
         packet = self._get_next_packet(timeout)
         if packet is None:
             return
 
-        return self._process_packet(packet)
+        return self._make_job(packet)
+
+    def flush_data(self) -> List[VoiceData]:
+        """Stops waiting for missing packets and returns everything buffered, in order."""
+        return [job.run() for job in self.flush_jobs()]
+
+    def flush_jobs(self) -> List[DecodeJob]:
+        """Like :meth:`flush_data`, but leaves decoding to the caller."""
+        return [self._make_job(packet) for packet in self._buffer.flush()]
+
+    def report_jitter(self, jitter: int) -> None:
+        """Passes on the jitter from an rtcp report about this ssrc, if the buffer adapts to it."""
+        if isinstance(self._buffer, AdaptiveJitterBuffer):
+            self._buffer.report_jitter(jitter)
 
     def set_user_id(self, user_id: int) -> None:
         self._cached_id = user_id
@@ -101,6 +187,7 @@ class PacketDecoder:
                 packets = self._buffer.flush()
                 if any(packets[1:]):
                     log.warning("%s packets were lost being flushed in decoder-%s", len(packets) - 1, self.ssrc)
+                    self.stats.discarded += len(packets) - 1
                 return packets[0]
             return
         elif not packet:
@@ -114,9 +201,20 @@ class PacketDecoder:
         return FakePacket(self.ssrc, seq, ts)
 
     def _process_packet(self, packet: AudioPacket) -> VoiceData:
-        pcm = None
+        return self._make_job(packet).run()
+
+    def _make_job(self, packet: AudioPacket) -> DecodeJob:
+        decoder = None
+        opus, fec = None, False
         if not self.sink.wants_opus():
-            packet, pcm = self._decode_packet(packet)
+            decoder = self._decoder
+            opus, fec = self._decode_args(packet)
+
+        if not packet:
+            if fec:
+                self.stats.fec_recovered += 1
+            else:
+                self.stats.concealed += 1
 
         member = self._get_cached_member()
 
@@ -124,35 +222,30 @@ class PacketDecoder:
             self._cached_id = self.sink.voice_client._get_id_from_ssrc(self.ssrc)  # type: ignore
             member = self._get_cached_member()
 
-        data = VoiceData(packet, member, pcm=pcm)
+        pool = self.router.pool
+        data = VoiceData(packet, member) if pool is None else pool.make_data(packet, member)
         self._last_seq = packet.sequence
         self._last_ts = packet.timestamp
 
-        return data
+        return DecodeJob(data, decoder, opus, fec, pool)
 
-    def _decode_packet(self, packet: AudioPacket) -> Tuple[AudioPacket, bytes]:
+    def _decode_args(self, packet: AudioPacket) -> Tuple[Optional[bytes], bool]:
         assert self._decoder is not None
 
         # Decode as per usual
         if packet:
-            pcm = self._decoder.decode(packet.decrypted_data, fec=False)
-            return packet, pcm
+            return packet.decrypted_data, False
 
         # Fake packet, need to check next one to use fec
         next_packet = self._buffer.peek_next()
 
         if next_packet is not None:
-            nextdata: bytes = next_packet.decrypted_data  # type: ignore
-
             log.debug(
                 "Generating fec packet: fake=%s, fec=%s",
                 packet.sequence,
                 next_packet.sequence,
             )
-            pcm = self._decoder.decode(nextdata, fec=True)
+            return next_packet.decrypted_data, True
 
         # Need to drop a packet
-        else:
-            pcm = self._decoder.decode(None, fec=False)
-
-        return packet, pcm
+        return None, False
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import annotations
+
+import ctypes
+import logging
+import threading
+
+from collections import deque
+
+from .opus import VoiceData
+from .rtp import RTPPacket
+
+import discord.opus
+from discord.opus import Decoder
+
+from typing import TYPE_CHECKING, Generic, TypeVar
+
+if TYPE_CHECKING:
+    from typing import Callable, Deque, Dict, Optional
+    from .rtp import AudioPacket
+    from .types import MemberOrUser as User
+
+T = TypeVar('T')
+
+log = logging.getLogger(__name__)
+
+__all__ = [
+    'ObjectPool',
+    'VoicePool',
+]
+
+# The longest opus packet is 120 ms
+MAX_FRAME_SAMPLES = 5760
+
+
+class ObjectPool(Generic[T]):
+    """A bounded free list.  :meth:`acquire` reuses a released object when there is one
+    and only calls ``factory`` otherwise.  Objects that are never released are simply
+    left to the garbage collector.
+    """
+
+    def __init__(self, factory: Callable[[], T], *, maxsize: int = 1024):
+        self.factory: Callable[[], T] = factory
+        self.maxsize: int = maxsize
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.discarded: int = 0
+
+        self._free: Deque[T] = deque()
+        self._lock: threading.Lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._free)
+
+    def acquire(self) -> T:
+        with self._lock:
+            if self._free:
+                self.hits += 1
+                return self._free.pop()
+
+            self.misses += 1
+
+        return self.factory()
+
+    def release(self, obj: T) -> None:
+        with self._lock:
+            if len(self._free) < self.maxsize:
+                self._free.append(obj)
+            else:
+                self.discarded += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'discarded': self.discarded, 'free': len(self._free)}
+
+
+class PCMBuffer:
+    """A reusable buffer big enough for any decoded opus packet."""
+
+    __slots__ = ('buffer', 'array', 'view')
+
+    def __init__(self):
+        samples = MAX_FRAME_SAMPLES * Decoder.CHANNELS
+        self.buffer: bytearray = bytearray(samples * 2)
+        self.array = (ctypes.c_int16 * samples).from_buffer(self.buffer)
+        self.view: Optional[memoryview] = None
+
+    def decode(self, decoder: Decoder, data: Optional[bytes], fec: bool) -> memoryview:
+        """Same as :meth:`discord.opus.Decoder.decode`, but decodes into this buffer."""
+
+        if data is None:
+            frame_size = decoder._get_last_packet_duration() or Decoder.SAMPLES_PER_FRAME
+        else:
+            frame_size = decoder.packet_get_nb_frames(data) * decoder.packet_get_samples_per_frame(data)
+
+        frame_size = min(frame_size, MAX_FRAME_SAMPLES)
+        ret = discord.opus._lib.opus_decode(
+            decoder._state, data, len(data) if data else 0, self.array, frame_size, fec
+        )
+
+        self.view = memoryview(self.buffer)[: ret * Decoder.CHANNELS * 2]
+        return self.view
+
+
+class VoicePool:
+    """Free lists for the objects made for every received packet.
+
+    Used by :class:`AudioReader` when listening with ``pooled=True``.  Packets,
+    :class:`VoiceData` and their pcm buffers are taken from here and given back
+    once the sink's ``write()`` returns, which is why pooled sinks must not keep
+    them (see :meth:`AudioSink.write`).  The pcm of pooled data is a memoryview
+    that is released on return, so a kept reference raises on use instead of
+    reading someone else's audio.  Arrays made from it, like numpy's
+    ``frombuffer``, are not protected that way.
+    """
+
+    def __init__(self, *, maxsize: int = 1024):
+        self.packets: ObjectPool[RTPPacket] = ObjectPool(lambda: RTPPacket.__new__(RTPPacket), maxsize=maxsize)
+        self.voice_data: ObjectPool[VoiceData] = ObjectPool(lambda: VoiceData.__new__(VoiceData), maxsize=maxsize)
+        self.pcm: ObjectPool[PCMBuffer] = ObjectPool(PCMBuffer, maxsize=maxsize)
+
+        # pcm still exported by a sink when the data came back, those buffers are not reused
+        self.retained: int = 0
+
+    def decode_rtp(self, data: bytes) -> RTPPacket:
+        """Pooled version of :func:`rtp.decode_rtp`."""
+
+        if not data[0] >> 6 == 2:
+            raise ValueError(f'Invalid packet header 0b{data[0]:0>8b}')
+
+        packet = self.packets.acquire()
+        packet.__init__(data)
+        return packet
+
+    def make_data(self, packet: AudioPacket, source: Optional[User]) -> VoiceData:
+        data = self.voice_data.acquire()
+        data.__init__(packet, source)
+        return data
+
+    def decode(self, data: VoiceData, decoder: Decoder, opus: Optional[bytes], fec: bool) -> None:
+        """Decodes into a pooled buffer owned by ``data`` until it is released."""
+
+        buffer = self.pcm.acquire()
+        data.pcm = buffer.decode(decoder, opus, fec)
+        data._buffer = buffer
+
+    def release(self, data: VoiceData) -> None:
+        """Takes back ``data`` and everything pooled it refers to.  Call after the sink is done with it."""
+
+        packet = data.packet
+        if type(packet) is RTPPacket:
+            self.packets.release(packet)
+
+        buffer = data._buffer
+        if buffer is not None:
+            try:
+                buffer.view.release()  # type: ignore
+            except BufferError:
+                # Something still holds a buffer export of the pcm, leave the buffer to it
+                self.retained += 1
+            else:
+                buffer.view = None
+                self.pcm.release(buffer)
+
+        data.packet = data.source = data._buffer = None  # type: ignore
+        data.pcm = b''
+        self.voice_data.release(data)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Hit and miss counts for each pool."""
+        return {
+            'packets': self.packets.stats(),
+            'voice_data': self.voice_data.stats(),
+            'pcm': {**self.pcm.stats(), 'retained': self.retained},
+        }
@@ -6,12 +6,15 @@ import time
 import logging
 import threading
 
-from operator import itemgetter
 from typing import TYPE_CHECKING
 
 from . import rtp
 from .sinks import AudioSink
 from .router import PacketRouter, SinkEventRouter
+from .pool import VoicePool
+from .buffer import HeapJitterBuffer
+from .telemetry import ReceiveTelemetry
+from .timers import get_timer_wheel
 
 try:
     import nacl.secret
@@ -26,6 +29,8 @@ if TYPE_CHECKING:
     from discord.types.voice import SupportedModes
     from .voice_client import VoiceRecvClient
     from .rtp import RTPPacket
+    from .buffer import JitterBuffer
+    from .timers import TimerWheel, TimerHandle
 
     DecryptRTP = Callable[[RTPPacket], bytes]
     DecryptRTCP = Callable[[bytes], bytes]
@@ -41,7 +46,16 @@ __all__ = [
 
 
 class AudioReader:
-    def __init__(self, sink: AudioSink, voice_client: VoiceRecvClient, *, after: Optional[AfterCB] = None):
+    def __init__(
+        self,
+        sink: AudioSink,
+        voice_client: VoiceRecvClient,
+        *,
+        after: Optional[AfterCB] = None,
+        decode_workers: int = 0,
+        pooled: bool = False,
+        jitter_buffer: Callable[[], JitterBuffer] = HeapJitterBuffer,
+    ):
         if after is not None and not callable(after):
             raise TypeError('Expected a callable for the "after" parameter.')
 
@@ -54,7 +68,16 @@ class AudioReader:
 
         self.active: bool = False
         self.error: Optional[Exception] = None
-        self.packet_router: PacketRouter = PacketRouter(sink, self)
+        self.pool: Optional[VoicePool] = VoicePool() if pooled else None
+        self.telemetry: ReceiveTelemetry = ReceiveTelemetry()
+        self.packet_router: PacketRouter = PacketRouter(
+            sink,
+            self,
+            decode_workers=decode_workers,
+            pool=self.pool,
+            jitter_buffer=jitter_buffer,
+            telemetry=self.telemetry,
+        )
         self.event_router: SinkEventRouter = SinkEventRouter(sink, self)
         self.decryptor: PacketDecryptor = PacketDecryptor(voice_client.mode, bytes(voice_client.secret_key))
         self.speaking_timer: SpeakingTimer = SpeakingTimer(self)
@@ -66,6 +89,11 @@ class AudioReader:
     def update_secret_key(self, secret_key: bytes) -> None:
         self.decryptor.update_secret_key(secret_key)
 
+    def get_telemetry(self, *, reset: bool = False) -> Dict[str, Any]:
+        """Snapshot of the per-ssrc network counters, see :meth:`ReceiveTelemetry.snapshot`."""
+        with self.packet_router._lock:
+            return self.telemetry.snapshot(reset=reset, user_id=self.voice_client._get_id_from_ssrc)
+
     def start(self) -> None:
         if self.active:
             log.debug('Reader is already started', exc_info=True)
@@ -85,7 +113,6 @@ class AudioReader:
 
         self.voice_client._connection.remove_socket_listener(self.callback)
         self.active = False
-        self.speaking_timer.notify()
 
         threading.Thread(target=self._stop, name=f'audioreader-stopper-{id(self):x}').start()
 
@@ -137,7 +164,10 @@ class AudioReader:
         packet = rtp_packet = rtcp_packet = None
         try:
             if not rtp.is_rtcp(packet_data):
-                packet = rtp_packet = rtp.decode_rtp(packet_data)
+                if self.pool is not None:
+                    packet = rtp_packet = self.pool.decode_rtp(packet_data)
+                else:
+                    packet = rtp_packet = rtp.decode_rtp(packet_data)
                 packet.decrypted_data = self.decryptor.decrypt_rtp(packet)
             else:
                 packet = rtcp_packet = rtp.decode_rtcp(self.decryptor.decrypt_rtcp(packet_data))
@@ -214,9 +244,8 @@ class PacketDecryptor:
         self.box = self._make_box(secret_key)
 
     def _decrypt_rtp_xsalsa20_poly1305(self, packet: RTPPacket) -> bytes:
-        nonce = bytearray(24)
-        nonce[:12] = packet.header
-        result = self.box.decrypt(bytes(packet.data), bytes(nonce))
+        nonce = packet.header[:12] + b'\x00' * 12
+        result = self.box.decrypt(packet.data, nonce)
 
         if packet.extended:
             offset = packet.update_ext_headers(result)
@@ -234,7 +263,7 @@ class PacketDecryptor:
     def _decrypt_rtp_xsalsa20_poly1305_suffix(self, packet: RTPPacket) -> bytes:
         nonce = packet.data[-24:]
         voice_data = packet.data[:-24]
-        result = self.box.decrypt(bytes(voice_data), bytes(nonce))
+        result = self.box.decrypt(voice_data, nonce)
 
         if packet.extended:
             offset = packet.update_ext_headers(result)
@@ -250,10 +279,9 @@ class PacketDecryptor:
         return header + result
 
     def _decrypt_rtp_xsalsa20_poly1305_lite(self, packet: RTPPacket) -> bytes:
-        nonce = bytearray(24)
-        nonce[:4] = packet.data[-4:]
+        nonce = packet.data[-4:] + b'\x00' * 20
         voice_data = packet.data[:-4]
-        result = self.box.decrypt(bytes(voice_data), bytes(nonce))
+        result = self.box.decrypt(voice_data, nonce)
 
         if packet.extended:
             offset = packet.update_ext_headers(result)
@@ -272,13 +300,12 @@ class PacketDecryptor:
     def _decrypt_rtp_aead_xchacha20_poly1305_rtpsize(self, packet: RTPPacket) -> bytes:
         packet.adjust_rtpsize()
 
-        nonce = bytearray(24)
-        nonce[:4] = packet.nonce
+        nonce = packet.nonce + b'\x00' * 20
         voice_data = packet.data
 
         # Blob vomit
         assert isinstance(self.box, nacl.secret.Aead)
-        result = self.box.decrypt(bytes(voice_data), bytes(packet.header), bytes(nonce))
+        result = self.box.decrypt(voice_data, packet.header, nonce)
 
         if packet.extended:
             offset = packet.update_ext_headers(result)
@@ -297,17 +324,26 @@ class PacketDecryptor:
         return header + result
 
 
-class SpeakingTimer(threading.Thread):
-    def __init__(self, reader: AudioReader):
-        super().__init__(daemon=True, name=f'speaking-timer-{id(self):x}')
+class SpeakingTimer:
+    """Dispatches speaking start and stop events.
+
+    A stop is due ``speaking_timeout_delay`` seconds after an ssrc's last
+    packet.  Each speaking ssrc has at most one timer on the process-wide
+    :class:`TimerWheel`, which is moved forward when it fires early instead of
+    being rescheduled for every packet.
+    """
 
+    def __init__(self, reader: AudioReader):
         self.reader: AudioReader = reader
         self.voice_client = reader.voice_client
         self.speaking_timeout_delay: float = 0.2
         self.last_speaking_state: Dict[int, bool] = {}
         self.speaking_cache: Dict[int, float] = {}
-        self.speaking_timer_event: threading.Event = threading.Event()
-        self._end_thread: threading.Event = threading.Event()
+
+        self._wheel: TimerWheel = get_timer_wheel()
+        self._timers: Dict[int, TimerHandle] = {}
+        self._lock: threading.Lock = threading.Lock()
+        self._active: bool = False
 
     def _lookup_member(self, ssrc: int) -> Optional[Member]:
         whoid = self.voice_client._get_id_from_ssrc(ssrc)
@@ -325,98 +361,105 @@ class SpeakingTimer(threading.Thread):
         self.voice_client.dispatch_sink(event, who)
 
     def notify(self, ssrc: Optional[int] = None) -> None:
-        if ssrc is not None:
-            self.last_speaking_state[ssrc] = True
-            self.maybe_dispatch_speaking_start(ssrc)
-            self.speaking_cache[ssrc] = time.perf_counter()
+        if ssrc is None:
+            return
+
+        self.last_speaking_state[ssrc] = True
+        self.maybe_dispatch_speaking_start(ssrc)
+        tnow = self.speaking_cache[ssrc] = time.perf_counter()
+
+        with self._lock:
+            if self._active and ssrc not in self._timers:
+                self._timers[ssrc] = self._wheel.call_at(tnow + self.speaking_timeout_delay, self._timeout, ssrc)
+
+    def _timeout(self, ssrc: int) -> None:
+        with self._lock:
+            self._timers.pop(ssrc, None)
+            tlast = self.speaking_cache.get(ssrc)
+            if not self._active or tlast is None or not self.last_speaking_state.get(ssrc):
+                return
+
+            # Packets came in since the timer was set, wait for the last one to time out
+            deadline = tlast + self.speaking_timeout_delay
+            if time.perf_counter() < deadline:
+                self._timers[ssrc] = self._wheel.call_at(deadline, self._timeout, ssrc)
+                return
+
+            self.last_speaking_state[ssrc] = False
 
-        self.speaking_timer_event.set()
-        self.speaking_timer_event.clear()
+        self.dispatch('voice_member_speaking_stop', ssrc)
 
     def drop_ssrc(self, ssrc: int) -> None:
+        with self._lock:
+            timer = self._timers.pop(ssrc, None)
+            if timer is not None:
+                timer.cancel()
+
         self.speaking_cache.pop(ssrc, None)
         state = self.last_speaking_state.pop(ssrc, None)
         if state:
             self.dispatch('voice_member_speaking_stop', ssrc)
-        self.notify()
 
     def get_speaking(self, ssrc: int) -> Optional[bool]:
         return self.last_speaking_state.get(ssrc)
 
-    def stop(self) -> None:
-        self._end_thread.set()
-        self.notify()
-
-    def run(self) -> None:
-        _i1 = itemgetter(1)
-
-        def get_next_entry():
-            cache = sorted(self.speaking_cache.items(), key=_i1)
-            for ssrc, tlast in cache:
-                # only return pair if speaking
-                if self.last_speaking_state.get(ssrc):
-                    return ssrc, tlast
-
-            return None, None
-
-        self.speaking_timer_event.wait()
-        while not self._end_thread.is_set():
-            if not self.speaking_cache:
-                self.speaking_timer_event.wait()
-
-            tnow = time.perf_counter()
-            ssrc, tlast = get_next_entry()
-
-            # no ssrc has been speaking, nothing to timeout
-            if ssrc is None or tlast is None:
-                self.speaking_timer_event.wait()
-                continue
-
-            self.speaking_timer_event.wait(tlast + self.speaking_timeout_delay - tnow)
+    def start(self) -> None:
+        self._active = True
 
-            if time.perf_counter() < tlast + self.speaking_timeout_delay:
-                continue
+    def stop(self) -> None:
+        with self._lock:
+            self._active = False
+            for timer in self._timers.values():
+                timer.cancel()
+            self._timers.clear()
 
-            self.dispatch('voice_member_speaking_stop', ssrc)
-            self.last_speaking_state[ssrc] = False
 
+class UDPKeepAlive:
+    """Sends a keepalive packet every ``delay`` seconds from the process-wide :class:`TimerWheel`."""
 
-# TODO: unify into a single thread that does all keepalives
-class UDPKeepAlive(threading.Thread):
-    delay: int = 5000
+    delay: float = 5.0
 
     def __init__(self, voice_client: VoiceRecvClient):
-        super().__init__(daemon=True, name=f"voice-udp-keepalive-{id(self):x}")
-
         self.voice_client: VoiceRecvClient = voice_client
 
         self.last_time: float = 0
         self.counter: int = 0
-        self._end_thread: threading.Event = threading.Event()
 
-    def run(self) -> None:
-        self.voice_client.wait_until_connected()
+        self._wheel: TimerWheel = get_timer_wheel()
+        self._timer: Optional[TimerHandle] = None
+        self._lock: threading.Lock = threading.Lock()
+        self._active: bool = False
 
-        while not self._end_thread.is_set():
-            vc = self.voice_client
+    def start(self) -> None:
+        with self._lock:
+            self._active = True
+            self._timer = self._wheel.call_later(0, self._send)
+
+    def _send(self) -> None:
+        vc = self.voice_client
+        # Not connected yet, or reconnecting, try again next time
+        if vc.is_connected():
             try:
                 packet = self.counter.to_bytes(8, 'big')
             except OverflowError:
                 self.counter = 0
-                continue
+                packet = self.counter.to_bytes(8, 'big')
 
             try:
                 vc._connection.socket.sendto(packet, (vc._connection.endpoint_ip, vc._connection.voice_port))
             except Exception as e:
                 log.debug("Error sending keepalive to socket: %s: %s", e.__class__.__name__, e)
-                # TODO: test connection interruptions
-                vc.wait_until_connected()
-                if vc.is_connected():
-                    continue
-                break
             else:
                 self.counter += 1
-                time.sleep(self.delay)
+                self.last_time = time.perf_counter()
+
+        with self._lock:
+            if self._active:
+                self._timer = self._wheel.call_later(self.delay, self._send)
 
     def stop(self) -> None:
-        self._end_thread.set()
+        with self._lock:
+            self._active = False
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
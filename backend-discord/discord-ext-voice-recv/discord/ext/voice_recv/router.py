@@ -2,20 +2,27 @@
 
 from __future__ import annotations
 
+import time
 import queue
 import logging
 import threading
 
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-from .utils import LoopTimer
-from .opus import PacketDecoder
+from . import rtp
+from .opus import PacketDecoder, VoiceData
+from .buffer import HeapJitterBuffer
+from .telemetry import ReceiveTelemetry
 
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
-    from typing import Tuple, Dict, List, Callable, Any, Optional
+    from typing import Tuple, Dict, List, Set, Callable, Any, Optional
     from .rtp import RTPPacket, RTCPPacket
+    from .opus import DecodeJob
+    from .buffer import JitterBuffer
+    from .pool import VoicePool
     from .sinks import AudioSink
     from .voice_client import VoiceRecvClient
     from .reader import AudioReader
@@ -27,18 +34,61 @@ log = logging.getLogger(__name__)
 
 
 class PacketRouter(threading.Thread):
-    def __init__(self, sink: AudioSink, reader: AudioReader):
+    """Routes packets from the reader to per-ssrc decoders and decoded data to the sink.
+
+    Routing is driven by the jitter buffers instead of polling.  When a pushed
+    packet makes a decoder ready it is queued for the router thread, which
+    sleeps until then.  A decoder holding packets it cannot release yet (waiting
+    on a gap, or a lone trailing packet) gets a deadline ``BUFFER_TIMEOUT``
+    seconds out, plus the delay its jitter buffer holds packets for on purpose,
+    after which everything it holds is flushed out in order.  Only ready or
+    expired decoders are ever serviced, so an idle speaker never delays another.
+
+    With ``decode_workers`` set, opus decoding moves to that many worker
+    threads.  Each ssrc is pinned to one worker, which keeps its decoder state
+    and fec handling sequential, while libopus releasing the GIL lets different
+    speakers decode on different cores.  Data still reaches the sink from this
+    thread, in the same order as without workers.
+
+    ``jitter_buffer`` is called with no arguments to make each decoder's buffer.
+    Jitter from rtcp reports is passed on to buffers that adapt to it.
+    """
+
+    def __init__(
+        self,
+        sink: AudioSink,
+        reader: AudioReader,
+        *,
+        decode_workers: int = 0,
+        pool: Optional[VoicePool] = None,
+        jitter_buffer: Callable[[], JitterBuffer] = HeapJitterBuffer,
+        telemetry: Optional[ReceiveTelemetry] = None,
+    ):
         super().__init__(daemon=True, name=f"packet-router-{id(self):x}")
 
         self.sink: AudioSink = sink
         self.decoders: Dict[int, PacketDecoder] = {}
         self.reader: AudioReader = reader
+        self.pool: Optional[VoicePool] = pool
+        self.jitter_buffer: Callable[[], JitterBuffer] = jitter_buffer
+        self.telemetry: ReceiveTelemetry = telemetry if telemetry is not None else ReceiveTelemetry()
+
+        self._workers: List[ThreadPoolExecutor] = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"opus-decode-{id(self):x}-{i}")
+            for i in range(decode_workers)
+        ]
+        self._assigned: Dict[int, ThreadPoolExecutor] = {}
+        self._next_worker: int = 0
 
         self._lock: threading.RLock = threading.RLock()
-        self._has_decoder: threading.Condition = threading.Condition()
         self._end_thread: threading.Event = threading.Event()
         self._dropped_ssrcs: deque[int] = deque(maxlen=16)
 
+        # Guards _ready and _deadlines, always taken after _lock, never before it
+        self._wakeup: threading.Condition = threading.Condition(threading.Lock())
+        self._ready: Set[int] = set()
+        self._deadlines: Dict[int, float] = {}
+
     def feed_rtp(self, packet: RTPPacket) -> None:
         # TODO: stale packet check
 
@@ -50,8 +100,17 @@ class PacketRouter(threading.Thread):
             decoder = self.get_decoder(packet.ssrc)
             if decoder is not None:
                 decoder.push_packet(packet)
+                self._signal(decoder)
 
     def feed_rtcp(self, packet: RTCPPacket) -> None:
+        if isinstance(packet, (rtp.ReceiverReportPacket, rtp.SenderReportPacket)):
+            with self._lock:
+                for report in packet.reports:
+                    decoder = self.decoders.get(report.ssrc)
+                    if decoder is not None:
+                        decoder.report_jitter(report.jitter)
+                        decoder.stats.estimator.report(report.jitter)
+
         guild = self.sink.voice_client.guild if self.sink.voice_client else None
         event_router = self.reader.event_router
         event_router.dispatch('rtcp_packet', packet, guild)
@@ -61,8 +120,9 @@ class PacketRouter(threading.Thread):
             decoder = self.decoders.get(ssrc)
             if decoder is None:
                 decoder = self.decoders.setdefault(ssrc, PacketDecoder(self, ssrc))
-                with self._has_decoder:
-                    self._has_decoder.notify_all()
+                if self._workers:
+                    self._assigned[ssrc] = self._workers[self._next_worker % len(self._workers)]
+                    self._next_worker += 1
 
             return decoder
 
@@ -86,6 +146,12 @@ class PacketRouter(threading.Thread):
             if decoder is not None:
                 self._dropped_ssrcs.append(ssrc)
                 decoder.destroy()
+            self._assigned.pop(ssrc, None)
+            self.telemetry.retire(ssrc, user_id=self.reader.voice_client._get_id_from_ssrc(ssrc))
+
+            with self._wakeup:
+                self._ready.discard(ssrc)
+                self._deadlines.pop(ssrc, None)
 
     def destroy_all_decoders(self) -> None:
         with self._lock:
@@ -94,6 +160,69 @@ class PacketRouter(threading.Thread):
 
     def stop(self) -> None:
         self._end_thread.set()
+        with self._wakeup:
+            self._wakeup.notify()
+
+    def _signal(self, decoder: PacketDecoder) -> None:
+        # Called with _lock held after a packet is pushed
+        with self._wakeup:
+            if decoder.ready:
+                if decoder.ssrc not in self._ready:
+                    self._ready.add(decoder.ssrc)
+                    self._wakeup.notify()
+            elif decoder.pending and decoder.ssrc not in self._deadlines:
+                self._deadlines[decoder.ssrc] = time.monotonic() + decoder.timeout
+                self._wakeup.notify()
+
+    def _wait(self) -> Tuple[Set[int], List[int]]:
+        """Block until a decoder is ready or a deadline passes, returning the ready and expired ssrcs."""
+
+        with self._wakeup:
+            while not self._end_thread.is_set():
+                now = time.monotonic()
+                expired = [ssrc for ssrc, deadline in self._deadlines.items() if deadline <= now]
+
+                if self._ready or expired:
+                    for ssrc in expired:
+                        del self._deadlines[ssrc]
+
+                    ready, self._ready = self._ready, set()
+                    return ready, expired
+
+                timeout = min(self._deadlines.values()) - now if self._deadlines else None
+                self._wakeup.wait(timeout)
+
+        return set(), []
+
+    def _service(self, ssrc: int, *, expired: bool) -> List[DecodeJob]:
+        # Called with _lock held
+        decoder = self.decoders.get(ssrc)
+        if decoder is None:
+            return []
+
+        jobs = []
+        while decoder.ready:
+            job = decoder.pop_job(timeout=0)
+            if job is None:
+                break
+
+            jobs.append(job)
+
+        if expired and not jobs and decoder.pending:
+            # Nothing became ready in time, give up on the missing packets
+            jobs.extend(decoder.flush_jobs())
+
+        popped = bool(jobs)
+
+        with self._wakeup:
+            if decoder.ready:
+                self._ready.add(ssrc)
+            if not decoder.pending:
+                self._deadlines.pop(ssrc, None)
+            elif popped or ssrc not in self._deadlines:
+                self._deadlines[ssrc] = time.monotonic() + decoder.timeout
+
+        return jobs
 
     def run(self) -> None:
         try:
@@ -102,32 +231,42 @@ class PacketRouter(threading.Thread):
             log.exception("Error in %s loop", self)
             self.reader.error = e
         finally:
+            for worker in self._workers:
+                worker.shutdown(wait=False)
             self.reader.voice_client.stop_listening()
 
     def _do_run(self) -> None:
-        timer = LoopTimer(0.01)
-        timer.start()
-
         while not self._end_thread.is_set():
-            if not self.decoders:
-                with self._has_decoder:
-                    has_decoder = self._has_decoder.wait_for(lambda: self.decoders)
-                    if not has_decoder:
-                        continue
+            ready, expired = self._wait()
 
-                    # we have a decoder so reset the timer
-                    timer.start()
+            with self._lock:
+                jobs = []
+                for ssrc in ready:
+                    jobs.extend(self._service(ssrc, expired=False))
+
+                for ssrc in expired:
+                    jobs.extend(self._service(ssrc, expired=True))
+
+                if not self._workers:
+                    for job in jobs:
+                        self._write(job.run())
+                    continue
+
+                results = [
+                    job.data if job.decoder is None else self._assigned[job.ssrc].submit(job.run) for job in jobs
+                ]
+
+            # Decode without holding the lock so packets keep flowing into the buffers meanwhile
+            results = [result if isinstance(result, VoiceData) else result.result() for result in results]
 
             with self._lock:
-                for decoder in self.decoders.values():
-                    data = decoder.pop_data()
-                    if data is not None:
-                        self.sink.write(data.source, data)
-
-            # we can end up in a busy loop if no decoders actually have any data
-            # so we do a sleep that sleeps up to 0.01 seconds per iteration, excluding time passed
-            timer.mark()
-            timer.sleep()
+                for data in results:
+                    self._write(data)
+
+    def _write(self, data: VoiceData) -> None:
+        self.sink.write(data.source, data)
+        if self.pool is not None:
+            self.pool.release(data)
 
 
 class SinkEventRouter(threading.Thread):
@@ -13,7 +13,7 @@ from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from typing import Optional, Literal, Union, Final, Dict, Any, Tuple
 
-    AudioPacket = Union['RTPPacket', 'FakePacket', 'SilencePacket']
+    AudioPacket = Union['RTPPacket', 'FakePacket', 'SilencePacket', 'MixedPacket']
     RealPacket = Union['RTPPacket', 'RTCPPacket']
     Packet = Union[RealPacket, 'FakePacket', 'SilencePacket']
 
@@ -32,6 +32,7 @@ __all__ = [
     'RTCPPacket',
     'FakePacket',
     'SilencePacket',
+    'MixedPacket',
     'ExtensionID',
 ]
 
@@ -140,6 +141,37 @@ class SilencePacket(_PacketCmpMixin):
         return True
 
 
+class MixedPacket(_PacketCmpMixin):
+    """A synthetic packet for audio mixed from multiple sources.  There is no opus data."""
+
+    __slots__ = ('ssrc', 'sequence', 'timestamp')
+    decrypted_data: Final = None
+    extension_data: Final[Dict[int, Any]] = {}
+
+    def __init__(self, sequence: int, timestamp: int):
+        self.ssrc: int = 0
+        self.sequence: int = sequence
+        self.timestamp: int = timestamp
+
+    def __repr__(self) -> str:
+        return '<MixedPacket sequence={0.sequence}, timestamp={0.timestamp}>'.format(self)
+
+
+# One-byte header extension elements (RFC 5285): (id, length) for every possible element header byte
+_BEDE_ELEMENTS: Final = tuple((header >> 4, 1 + (header & 0b0000_1111)) for header in range(256))
+
+_word_structs: Dict[int, struct.Struct] = {}
+
+
+def _word_struct(count: int) -> struct.Struct:
+    """A cached struct for ``count`` big endian 32 bit words (csrcs, extension values)."""
+    try:
+        return _word_structs[count]
+    except KeyError:
+        words = _word_structs[count] = struct.Struct('>%sI' % count)
+        return words
+
+
 class RTPPacket(_PacketCmpMixin):
     __slots__ = (
         'version',
@@ -162,11 +194,14 @@ class RTPPacket(_PacketCmpMixin):
     )
 
     _hstruct = struct.Struct('>xxHII')
+    _ext_struct = struct.Struct('>2sH')
     _ext_header = namedtuple("Extension", 'profile length values')
     _ext_magic = b'\xbe\xde'
 
     def __init__(self, data: bytes):
-        data = bytearray(data)  # type: ignore
+        # The datagram is immutable, so header and data are sliced straight out of it.
+        # (memoryview slices measured slower than copying for packets this small)
+        data = bytes(data)
 
         # fmt: off
         self.version: int   =      data[0] >> 6
@@ -187,19 +222,18 @@ class RTPPacket(_PacketCmpMixin):
         self.extension = None
         self.extension_data: Dict[int, bytes] = {}
 
-        self.header = data[:12]
-        self.data = data[12:]
+        offset = 12
+        if self.cc:
+            self.csrcs = _word_struct(self.cc).unpack_from(data, 12)
+            offset += self.cc * 4
+
+        self.header: bytes = data[:offset]
+        self.data: bytes = data[offset:]
         self.decrypted_data: Optional[bytes] = None
 
         self.nonce: bytes = b''
         self._rtpsize: bool = False
 
-        if self.cc:
-            fmt = '>%sI' % self.cc
-            offset = struct.calcsize(fmt) + 12
-            self.csrcs = struct.unpack(fmt, data[12:offset])
-            self.data = data[offset:]
-
         # TODO?: impl padding calculations (though discord doesn't seem to use that bit)
 
     def adjust_rtpsize(self):
@@ -225,43 +259,38 @@ class RTPPacket(_PacketCmpMixin):
 
         # rtpsize formats have the extension header in the rtp header instead of payload
         if self._rtpsize:
-            data = self.header[-4:] + data
-
-        # data is the decrypted packet payload containing the extension header and opus data
-        profile, length = struct.unpack_from('>2sH', data)
+            profile, length = self._ext_struct.unpack_from(self.header, len(self.header) - 4)
+            start = 0
+        else:
+            # data is the decrypted packet payload containing the extension header and opus data
+            profile, length = self._ext_struct.unpack_from(data)
+            start = 4
 
         if profile == self._ext_magic:
-            self._parse_bede_header(data, length)
+            self._parse_bede_header(data, start, length)
 
-        values = struct.unpack('>%sI' % length, data[4 : 4 + length * 4])
+        values = _word_struct(length).unpack_from(data, start)
         self.extension = self._ext_header(profile, length, values)
 
-        offset = 4 + length * 4
-        if self._rtpsize:
-            # remove the extra offset from adding the header in
-            offset -= 4
-
-        return offset
+        return start + length * 4
 
     # https://www.rfcreader.com/#rfc5285_line186
-    def _parse_bede_header(self, data: bytes, length: int) -> None:
-        offset = 4
+    def _parse_bede_header(self, data: bytes, offset: int, length: int) -> None:
+        elements = _BEDE_ELEMENTS
+        end = len(data)
         n = 0
 
-        while n < length:
-            next_byte = data[offset : offset + 1]
+        while n < length and offset < end:
+            header = data[offset]
+            offset += 1
 
-            if next_byte == b'\x00':
-                offset += 1
+            # padding
+            if header == 0:
                 continue
 
-            header = struct.unpack('>B', next_byte)[0]
-
-            element_id = header >> 4
-            element_len = 1 + (header & 0b0000_1111)
-
-            self.extension_data[element_id] = data[offset + 1 : offset + 1 + element_len]
-            offset += 1 + element_len
+            element_id, element_len = elements[header]
+            self.extension_data[element_id] = data[offset : offset + element_len]
+            offset += element_len
             n += 1
 
     def _dump_info(self) -> str:
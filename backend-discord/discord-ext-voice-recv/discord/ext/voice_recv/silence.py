@@ -3,11 +3,15 @@
 from __future__ import annotations
 
 import time
+import queue
 import logging
 import threading
 
+from collections import deque
+
 from .opus import VoiceData
 from .rtp import SilencePacket
+from .timers import get_timer_wheel
 
 from discord.utils import MISSING
 from discord.opus import Decoder
@@ -15,12 +19,13 @@ from discord.opus import Decoder
 from typing import TYPE_CHECKING, Tuple
 
 if TYPE_CHECKING:
-    from typing import Callable, Any, Dict, Optional, Final, Union
+    from typing import Callable, Any, Deque, Dict, List, Optional, Final, Union
     from .rtp import AudioPacket
     from .types import MemberOrUser as User
+    from .timers import TimerWheel, TimerHandle
 
     SilenceGenFN = Callable[[Optional[User], VoiceData], Any]
-    SSRCData = Tuple[float, Optional[User], AudioPacket]
+    SSRCData = Tuple[float, Optional[User], int]
 
 log = logging.getLogger(__name__)
 
@@ -30,40 +35,147 @@ __all__ = [
 
 SILENCE_PCM: Final = b'\0' * Decoder.FRAME_SIZE
 PACKET_INTERVAL: Final = 0.02
+# Threads shared by every SilenceGenerator of the process to run callbacks
+WRITER_THREADS: Final = 4
+# Frames a writer thread hands to one generator's callback before moving on to the next generator
+WRITER_BATCH: Final = 16
+
+
+class _SilenceWriters:
+    """A few threads running the callbacks of every :class:`SilenceGenerator`.
+
+    Generators with frames waiting queue up here, and a thread drains one
+    generator at a time, so each generator's frames keep their order while a
+    slow callback only ties up one thread.
+    """
+
+    def __init__(self, threads: int = WRITER_THREADS):
+        self._ready: queue.SimpleQueue[SilenceGenerator] = queue.SimpleQueue()
+        self._threads: List[threading.Thread] = [
+            threading.Thread(target=self._run, daemon=True, name=f'silencegen-writer-{index}') for index in range(threads)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, generator: SilenceGenerator) -> None:
+        self._ready.put(generator)
+
+    def _run(self) -> None:
+        while True:
+            generator = self._ready.get()
+            try:
+                generator._write_frames()
+            except Exception:
+                log.exception("Error in silence writer for %s", generator)
+
+
+_writers: Optional[_SilenceWriters] = None
+_writers_lock: threading.Lock = threading.Lock()
+
+
+def _get_silence_writers() -> _SilenceWriters:
+    global _writers
+    with _writers_lock:
+        if _writers is None:
+            _writers = _SilenceWriters()
+        return _writers
 
 
-class SilenceGenerator(threading.Thread):
-    """Generates and sends silence packets."""
+class SilenceGenerator:
+    """Generates and sends silence packets.
+
+    Each ssrc has one timer on the process-wide :class:`TimerWheel`, due a
+    frame and ``grace_period`` after its last packet.  When it fires after a
+    newer packet it is simply moved forward, otherwise it queues a frame of
+    silence and comes back a frame later.  ``callback`` runs on one of a few
+    writer threads shared by every generator, in order for each generator, so
+    a slow destination only delays its own silence and never the timers of
+    other connections.
+    """
 
     def __init__(self, callback: SilenceGenFN, *, grace_period: float = 0.015):
-        super().__init__(daemon=True, name=f'silencegen-{id(self):x}')
         self.callback: SilenceGenFN = callback
         self.grace_period: float = grace_period
 
         self._ssrc_data: Dict[int, SSRCData] = {}  # {ssrc: (time, _, _)}
         self._last_timestamp: Dict[int, int] = {}  # {ssrc: timestamp}
         self._user_map_backup: Dict[int, int] = {}  # {id: ssrc}
-        self._end: threading.Event = threading.Event()
-        self._has_data: threading.Event = threading.Event()
+        self._timers: Dict[int, TimerHandle] = {}  # {ssrc: timer}
+        self._wheel: TimerWheel = get_timer_wheel()
+        self._active: bool = False
         self._lock: threading.Lock = threading.Lock()
 
+        self._frames: Deque[Tuple[Optional[User], VoiceData]] = deque()
+        self._writing: bool = False  # queued on or being drained by a writer thread
+        self._writers: _SilenceWriters = _get_silence_writers()
+
     def push(self, user: Optional[User], packet: AudioPacket) -> None:
         """Updates the last time a packet was received and from whom.
         Calling this function will start generating silence packets for `packet.ssrc`
         until `drop(ssrc)` or `stop()` is called.
         """
 
+        # Only the ssrc and timestamp are kept, packets may be pooled and reused after write()
         with self._lock:
-            self._ssrc_data[packet.ssrc] = (time.perf_counter(), user, packet)
+            tnow = time.perf_counter()
+            self._ssrc_data[packet.ssrc] = (tnow, user, packet.ssrc)
             self._last_timestamp[packet.ssrc] = packet.timestamp
 
             if user:
                 self._user_map_backup[user.id] = packet.ssrc
 
-            self._has_data.set()
+            if self._active and packet.ssrc not in self._timers:
+                self._schedule(packet.ssrc, tnow)
+
+    def _schedule(self, ssrc: int, tlast: float) -> None:
+        # Called with _lock held
+        # wait a little bit longer than when the next one should be
+        # so we don't have to race with the next packet
+        self._timers[ssrc] = self._wheel.call_at(tlast + PACKET_INTERVAL + self.grace_period, self._emit, ssrc)
+
+    def _emit(self, ssrc: int) -> None:
+        with self._lock:
+            self._timers.pop(ssrc, None)
+            if not self._active or ssrc not in self._ssrc_data:
+                return
+
+            tlast, user, _ = self._ssrc_data[ssrc]
+            if time.perf_counter() < tlast + PACKET_INTERVAL + self.grace_period:
+                self._schedule(ssrc, tlast)  # another packet came in and bumped up the time
+                return
+
+            # update the existing packet time for the next window
+            timestamp = self._last_timestamp[ssrc] + Decoder.SAMPLES_PER_FRAME
+            self._ssrc_data[ssrc] = (tlast + PACKET_INTERVAL, user, ssrc)
+            self._last_timestamp[ssrc] = timestamp
+            self._schedule(ssrc, tlast + PACKET_INTERVAL)
+
+            # TODO: check if destination wants opus or not
+            self._frames.append((user, VoiceData(SilencePacket(ssrc, timestamp), user, pcm=SILENCE_PCM)))
+            submit = not self._writing
+            self._writing = True
 
-    def _get_next_info(self) -> SSRCData:
-        return min(self._ssrc_data.values())
+        if submit:
+            self._writers.submit(self)
+
+    def _write_frames(self) -> None:
+        # Runs on a writer thread, which no other writer thread does for this generator at the same time
+        for _ in range(WRITER_BATCH):
+            with self._lock:
+                if not self._active or not self._frames:
+                    self._frames.clear()
+                    self._writing = False
+                    return
+
+                user, data = self._frames.popleft()
+
+            try:
+                self.callback(user, data)
+            except Exception:
+                log.exception("Error writing silence in %s", self)
+
+        # Give the other generators a turn, this one goes to the back of the line
+        self._writers.submit(self)
 
     def drop(self, *, ssrc: Optional[int] = None, user: User = MISSING) -> None:
         """Stop generating silence packets for `ssrc`, or whatever is cached for `user`
@@ -82,71 +194,24 @@ class SilenceGenerator(threading.Thread):
                 ssrc = self._user_map_backup.pop(user.id)
                 self._ssrc_data.pop(ssrc, None)
 
-            if not self._ssrc_data:
-                self._has_data.clear()
+            timer = self._timers.pop(ssrc, None)  # type: ignore
+            if timer is not None:
+                timer.cancel()
 
     def stop(self) -> None:
         """Stops generating silence for everything and clears the cache."""
 
-        self._end.set()
-        self._has_data.set()
-
         with self._lock:
+            self._active = False
+            for timer in self._timers.values():
+                timer.cancel()
+
+            self._timers.clear()
             self._ssrc_data.clear()
             self._user_map_backup.clear()
             self._last_timestamp.clear()
-            self._has_data.clear()
-
-        self.join(1)
+            self._frames.clear()
 
     def start(self) -> None:
-        self._end.clear()
-        super().start()
-
-    def run(self) -> None:
-        try:
-            self._do_run()
-        except Exception as e:
-            log.exception("Error in %s", self)
-
-    def _do_run(self) -> None:
-        while not self._end.is_set():
-            self._has_data.wait()
-            if self._end.is_set():
-                return
-
-            with self._lock:
-                tlast, user, packet = self._get_next_info()
-                ssrc = packet.ssrc
-
-                # prepare the object before the sleep as a little micro optimization
-                next_packet = SilencePacket(
-                    ssrc, self._last_timestamp.get(ssrc, packet.timestamp) + Decoder.SAMPLES_PER_FRAME
-                )
-                # TODO: check if destination wants opus or not
-                next_data = VoiceData(next_packet, user, pcm=SILENCE_PCM)
-
-                tnext = tlast + PACKET_INTERVAL
-                tnow = time.perf_counter()
-                # wait a little bit longer than when the next one should be
-                # so we don't have to race with the next packet
-                delay = tnext + self.grace_period - tnow
-
-            if delay > 0:
-                time.sleep(delay)
-
-            with self._lock:
-                tlast2, luser, lpacket = self._ssrc_data.get(ssrc, (-1, None, packet))
-
-            if next_packet.ssrc != lpacket.ssrc or tlast != tlast2 or self._end.is_set():
-                continue  # another packet came in and bumped up the time
-
-            next_data.source = luser  # is there any point in doing this?
-            self.callback(luser, next_data)
-
-            with self._lock:
-                # If there was no packet update during the sleep...
-                if tlast == tlast2 and ssrc in self._ssrc_data:
-                    # update the existing packet time for the next window
-                    self._ssrc_data[ssrc] = (tlast + PACKET_INTERVAL, user, packet)
-                    self._last_timestamp[ssrc] += Decoder.SAMPLES_PER_FRAME
+        with self._lock:
+            self._active = True
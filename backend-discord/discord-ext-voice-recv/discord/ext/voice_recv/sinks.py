@@ -3,10 +3,14 @@
 from __future__ import annotations
 
 import io
+import os
+import array
 import abc
 import time
 import wave
 import shlex
+import queue
+import struct
 import inspect
 import audioop
 import logging
@@ -14,6 +18,8 @@ import threading
 import subprocess
 
 from .opus import VoiceData
+from .ogg import OggOpusWriter, opus_packet_samples
+from .rtp import MixedPacket, OPUS_SILENCE
 from .silence import SilenceGenerator
 
 import discord
@@ -23,6 +29,11 @@ from discord.opus import Decoder as OpusDecoder
 
 from typing import TYPE_CHECKING, overload
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 if TYPE_CHECKING:
     from typing import Callable, Optional, Any, IO, Sequence, Tuple, Generator, Union, Dict, List
 
@@ -44,12 +55,16 @@ __all__ = [
     'MultiAudioSink',
     'BasicSink',
     'WaveSink',
+    'MultiTrackSink',
+    'OggOpusSink',
+    'OpusMemorySink',
     'FFmpegSink',
     'PCMVolumeTransformer',
     'ConditionalFilter',
     'TimedFilter',
     'UserFilter',
     'SilenceGeneratorSink',
+    'MixerSink',
 ]
 
 
@@ -129,7 +144,16 @@ class SinkABC(metaclass=SinkMeta):
 
     @abc.abstractmethod
     def write(self, user: Optional[User], data: VoiceData):
-        """Callback for when the sink receives data"""
+        """Callback for when the sink receives data.
+
+        Ownership: ``data``, its packet and its pcm belong to the caller and are
+        only valid until this method returns.  When listening with
+        ``pooled=True`` they are reused for later packets, and the pcm is a
+        memoryview that is released afterwards.  A sink that needs anything
+        later must copy it, e.g. ``bytes(data.pcm)`` or the packet's
+        ``timestamp``, rather than keeping references to the objects.
+        Replacing ``data.pcm`` (like :class:`PCMVolumeTransformer` does) is fine.
+        """
         raise NotImplementedError
 
     @abc.abstractmethod
@@ -235,19 +259,35 @@ class AudioSink(SinkABC):
 
 
 class MultiAudioSink(AudioSink):
+    """AudioSink that writes the same data to several destinations."""
+
     def __init__(self, destinations: Sequence[AudioSink], /):
         # Intentionally not calling super().__init__ here
+        self._children: List[AudioSink] = []
+
         if destinations is not None:
             for dest in destinations:
                 self._register_child(dest)
 
-        self._children: List[AudioSink] = list(destinations)
+        if len({dest.wants_opus() for dest in self._children}) > 1:
+            raise VoiceRecvException('All destination AudioSinks must want the same type of data.')
 
     def _register_child(self, child: AudioSink) -> None:
         if child in self.root.walk_children():
             raise RuntimeError('Sink is already registered.')
 
         child._parent = self
+        self._children.append(child)
+
+    def wants_opus(self) -> bool:
+        return any(child.wants_opus() for child in self._children)
+
+    def write(self, user: Optional[User], data: VoiceData) -> None:
+        for child in self._children:
+            child.write(user, data)
+
+    def cleanup(self) -> None:
+        pass
 
     @property
     def child(self) -> Optional[AudioSink]:
@@ -320,6 +360,512 @@ class WaveSink(AudioSink):
             log.warning("WaveSink got error closing file on cleanup", exc_info=True)
 
 
+def _wav_header(data_size: int) -> bytes:
+    channels, width, rate = WaveSink.CHANNELS, WaveSink.SAMPLE_WIDTH, WaveSink.SAMPLING_RATE
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data_size, b'WAVE',
+        b'fmt ', 16, 1, channels, rate, rate * channels * width, channels * width, width * 8,
+        b'data', data_size,
+    )
+
+
+class WaveTrack:
+    """A single ssrc's wav file written by :class:`MultiTrackSink`.
+
+    :meth:`write` only works out where the audio goes on the track and queues
+    it, the sink's writer thread does the file I/O.  Silence is skipped over
+    with a seek instead of written out, and the header is filled in on close.
+    """
+
+    __slots__ = (
+        'ssrc',
+        'user_id',
+        'path',
+        'start_offset',
+        'frames',
+        '_queue',
+        '_closed',
+        '_file',
+        '_data_size',
+        '_finished',
+        '_last_timestamp',
+        '_next_time',
+    )
+
+    def __init__(self, ssrc: int, path: str, start_offset: float, writer_queue: queue.Queue):
+        self.ssrc: int = ssrc
+        self.user_id: Optional[int] = None
+        self.path: str = path
+        # seconds between the first packet received by the sink and the first packet of this track
+        self.start_offset: float = start_offset
+        self.frames: int = 0  # frames queued so far, silence included
+
+        self._queue: queue.Queue = writer_queue
+        self._closed: bool = False
+
+        # only touched by the writer thread
+        self._file: Optional[IO[bytes]] = None
+        self._data_size: int = 0
+        self._finished: bool = False
+
+        self._last_timestamp: Optional[int] = None
+        self._next_time: float = 0  # when the next packet is due if there is no gap
+
+    def __repr__(self) -> str:
+        return f'<WaveTrack ssrc={self.ssrc} user_id={self.user_id} start_offset={self.start_offset:.3f} frames={self.frames}>'
+
+    @property
+    def duration(self) -> float:
+        return self.frames / WaveSink.SAMPLING_RATE
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def write(self, timestamp: int, pcm: bytes, now: float, *, max_gap: float) -> None:
+        if self._closed:
+            return
+
+        frame_width = WaveSink.CHANNELS * WaveSink.SAMPLE_WIDTH
+        gap = 0
+
+        if self._last_timestamp is not None:
+            gap = (timestamp - self._last_timestamp) & 0xFFFFFFFF
+            if gap >= 0x80000000:
+                gap = 0  # overlapping or out of order, nothing to fill
+
+            # the timestamp jumped further than is believable, fall back to the wall clock.
+            # the whole gap is filled, however long, so later audio stays on the session timeline
+            if gap > max_gap * WaveSink.SAMPLING_RATE:
+                gap = max(0, int((now - self._next_time) * WaveSink.SAMPLING_RATE))
+
+        nframes = len(pcm) // frame_width
+        self.frames += gap + nframes
+
+        # blocks the caller if the writer is behind, which keeps memory bounded
+        self._queue.put((self, gap, bytes(pcm)))
+
+        # the timestamp the next packet should have if there is no gap
+        self._last_timestamp = (timestamp + nframes) & 0xFFFFFFFF
+        self._next_time = now + nframes / WaveSink.SAMPLING_RATE
+
+    def close(self) -> None:
+        if self._closed:
+            return
+
+        self._closed = True
+        self._queue.put((self, 0, None))
+
+    def _write(self, silence: int, pcm: bytes) -> None:
+        # writer thread only
+        if self._finished:
+            return
+
+        if self._file is None:
+            self._file = open(self.path, 'wb')
+            self._file.write(_wav_header(0))
+
+        if silence:
+            # leaves a hole that reads back as zeros, the pcm after it gives the file its length
+            offset = silence * WaveSink.CHANNELS * WaveSink.SAMPLE_WIDTH
+            self._file.seek(offset, os.SEEK_CUR)
+            self._data_size += offset
+
+        self._file.write(pcm)
+        self._data_size += len(pcm)
+
+    def _finish(self) -> None:
+        # writer thread only
+        if self._finished:
+            return
+
+        self._finished = True
+        if self._file is None:
+            return
+
+        try:
+            self._file.seek(0)
+            self._file.write(_wav_header(self._data_size))
+        finally:
+            self._file.close()
+            self._file = None
+
+
+class MultiTrackSink(AudioSink):
+    """Endpoint AudioSink that writes a separate wav file for each ssrc.
+
+    Each :class:`WaveTrack` records its start offset relative to the first packet
+    received by the sink, and silence between packets is filled in using rtp
+    timestamps, so tracks can be lined up on a common timeline afterwards.
+    Timestamp jumps longer than `max_gap` seconds are not trusted, the wall
+    clock time between the packets is filled in instead.
+
+    Files are written by a background thread, so the packet router never waits
+    on the disk unless the writer falls `max_pending` packets behind.  The
+    files are complete once :meth:`cleanup` returns.
+    """
+
+    def __init__(self, directory: Union[str, os.PathLike], *, max_gap: float = 300.0, max_pending: int = 500):
+        super().__init__()
+
+        self.directory: str = os.fspath(directory)
+        self.max_gap: float = max_gap
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._tracks: Dict[int, WaveTrack] = {}
+        self._start: Optional[float] = None
+        self._closed: bool = False
+        self._lock: threading.Lock = threading.Lock()
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._writer: threading.Thread = threading.Thread(
+            target=self._run, daemon=True, name=f'multitrack-writer-{id(self):x}'
+        )
+        self._writer.start()
+
+    @property
+    def tracks(self) -> List[WaveTrack]:
+        """All tracks written so far, in the order they were started."""
+        with self._lock:
+            return list(self._tracks.values())
+
+    def wants_opus(self) -> bool:
+        return False
+
+    def write(self, user: Optional[User], data: VoiceData) -> None:
+        packet = data.packet
+        now = time.perf_counter()
+
+        with self._lock:
+            if self._closed:
+                return
+
+            if self._start is None:
+                self._start = now
+
+            track = self._tracks.get(packet.ssrc)
+            if track is None:
+                path = os.path.join(self.directory, f'{packet.ssrc}.wav')
+                track = self._tracks[packet.ssrc] = WaveTrack(packet.ssrc, path, now - self._start, self._queue)
+
+            if user is not None:
+                track.user_id = user.id
+
+            track.write(packet.timestamp, data.pcm, now, max_gap=self.max_gap)
+
+    @AudioSink.listener()
+    def on_voice_member_disconnect(self, member: discord.Member, ssrc: Optional[int]) -> None:
+        with self._lock:
+            track = self._tracks.get(ssrc) if ssrc is not None else None
+            if track is not None:
+                track.close()
+
+    def cleanup(self) -> None:
+        # this function gets called in __del__ so instance attributes might not even exist
+        lock: Optional[threading.Lock] = getattr(self, '_lock', None)
+        if lock is None:
+            return
+
+        with lock:
+            if self._closed:
+                return
+
+            self._closed = True
+            for track in self._tracks.values():
+                track.close()
+            self._queue.put(None)
+
+        if threading.current_thread() is not self._writer:
+            self._writer.join()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            track, silence, pcm = item
+            try:
+                if pcm is None:
+                    track._finish()
+                else:
+                    track._write(silence, pcm)
+            except Exception:
+                log.exception("MultiTrackSink got error writing %s", track)
+                try:
+                    track._finish()
+                except Exception:
+                    pass
+
+
+class OggOpusTrack:
+    """A single ssrc's Ogg Opus stream written by :class:`OggOpusSink` or :meth:`OpusMemorySink.export`.
+
+    Granule positions follow the rtp timestamps, and gaps between packets are
+    filled with opus silence frames so players keep the original timing.
+    """
+
+    __slots__ = (
+        'ssrc',
+        'user_id',
+        'path',
+        'start_offset',
+        'packets',
+        '_file',
+        '_owns_file',
+        '_writer',
+        '_next_timestamp',
+        '_next_time',
+    )
+
+    def __init__(self, ssrc: int, file: Union[str, IO[bytes]], start_offset: float = 0.0):
+        self.ssrc: int = ssrc
+        self.user_id: Optional[int] = None
+        # seconds between the first packet received by the sink and the first packet of this track
+        self.start_offset: float = start_offset
+        self.packets: int = 0
+
+        if isinstance(file, str):
+            self.path: Optional[str] = file
+            self._file: Optional[IO[bytes]] = open(file, 'wb')
+            self._owns_file: bool = True
+        else:
+            self.path = None
+            self._file = file
+            self._owns_file = False
+
+        self._writer: OggOpusWriter = OggOpusWriter(self._file)
+        self._next_timestamp: Optional[int] = None
+        self._next_time: Optional[float] = None  # when the next packet is due if there is no gap
+
+    def __repr__(self) -> str:
+        return f'<OggOpusTrack ssrc={self.ssrc} user_id={self.user_id} start_offset={self.start_offset:.3f} packets={self.packets}>'
+
+    @property
+    def duration(self) -> float:
+        return self._writer.granule / OpusDecoder.SAMPLING_RATE
+
+    @property
+    def closed(self) -> bool:
+        return self._file is None
+
+    def write(self, timestamp: int, opus: bytes, now: Optional[float], *, max_gap: float) -> None:
+        if self._file is None or not opus:
+            return
+
+        if self._next_timestamp is not None:
+            gap = (timestamp - self._next_timestamp) & 0xFFFFFFFF
+            if gap >= 0x80000000:
+                gap = 0  # overlapping or out of order, nothing to fill
+
+            # the timestamp jumped further than is believable, fall back to the wall clock if there is one.
+            # the whole gap is filled, however long, so later packets keep their place on the timeline
+            if gap > max_gap * OpusDecoder.SAMPLING_RATE and now is not None and self._next_time is not None:
+                gap = max(0, int((now - self._next_time) * OpusDecoder.SAMPLING_RATE))
+
+            granule = self._writer.granule
+            for _ in range(gap // OpusDecoder.SAMPLES_PER_FRAME):
+                granule += OpusDecoder.SAMPLES_PER_FRAME
+                self._writer.write(OPUS_SILENCE, granule)
+
+        samples = opus_packet_samples(opus)
+        self._writer.write(bytes(opus), self._writer.granule + samples)
+        self.packets += 1
+
+        # the timestamp the next packet should have if there is no gap
+        self._next_timestamp = (timestamp + samples) & 0xFFFFFFFF
+        self._next_time = None if now is None else now + samples / OpusDecoder.SAMPLING_RATE
+
+    def close(self) -> None:
+        if self._file is None:
+            return
+
+        try:
+            self._writer.close()
+            if self._owns_file:
+                self._file.close()
+        finally:
+            self._file = None
+
+
+class OggOpusSink(AudioSink):
+    """Endpoint AudioSink that stores the received opus packets of each ssrc in an .ogg file.
+
+    Nothing is decoded or re-encoded, so this is the cheapest way to archive a
+    session.  Like :class:`MultiTrackSink`, each :class:`OggOpusTrack` records
+    its start offset relative to the first packet received by the sink.
+    """
+
+    def __init__(self, directory: Union[str, os.PathLike], *, max_gap: float = 300.0):
+        super().__init__()
+
+        self.directory: str = os.fspath(directory)
+        self.max_gap: float = max_gap
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._tracks: Dict[int, OggOpusTrack] = {}
+        self._start: Optional[float] = None
+        self._closed: bool = False
+        self._lock: threading.Lock = threading.Lock()
+
+    @property
+    def tracks(self) -> List[OggOpusTrack]:
+        """All tracks written so far, in the order they were started."""
+        with self._lock:
+            return list(self._tracks.values())
+
+    def wants_opus(self) -> bool:
+        return True
+
+    def write(self, user: Optional[User], data: VoiceData) -> None:
+        packet = data.packet
+        now = time.perf_counter()
+
+        with self._lock:
+            if self._closed:
+                return
+
+            if self._start is None:
+                self._start = now
+
+            track = self._tracks.get(packet.ssrc)
+            if track is None:
+                path = os.path.join(self.directory, f'{packet.ssrc}.ogg')
+                track = self._tracks[packet.ssrc] = OggOpusTrack(packet.ssrc, path, now - self._start)
+
+            if user is not None:
+                track.user_id = user.id
+
+            track.write(packet.timestamp, data.opus, now, max_gap=self.max_gap)
+
+    @AudioSink.listener()
+    def on_voice_member_disconnect(self, member: discord.Member, ssrc: Optional[int]) -> None:
+        with self._lock:
+            track = self._tracks.get(ssrc) if ssrc is not None else None
+            if track is not None:
+                track.close()
+
+    def cleanup(self) -> None:
+        # this function gets called in __del__ so instance attributes might not even exist
+        lock: Optional[threading.Lock] = getattr(self, '_lock', None)
+        if lock is None:
+            return
+
+        with lock:
+            self._closed = True
+            for track in self._tracks.values():
+                try:
+                    track.close()
+                except Exception:
+                    log.warning("OggOpusSink got error closing %s on cleanup", track, exc_info=True)
+
+
+class _OpusBuffer:
+    __slots__ = ('user_id', 'data', 'offsets', 'timestamps', 'times')
+
+    def __init__(self):
+        self.user_id: Optional[int] = None
+        self.data: bytearray = bytearray()
+        self.offsets: array.array = array.array('L', [0])  # packet i is data[offsets[i]:offsets[i + 1]]
+        self.timestamps: array.array = array.array('I')
+        self.times: array.array = array.array('d')  # time.perf_counter() when each packet arrived
+
+
+class OpusMemorySink(AudioSink):
+    """Endpoint AudioSink that keeps every received opus packet in memory, per ssrc.
+
+    Packets are stored back to back in one bytearray per ssrc with compact
+    offset, timestamp and arrival time arrays.  At Discord's 64 kbps that is
+    roughly 480 KB per speaker per minute of speech, instead of the 11 MB that
+    decoded pcm would take.  Use :meth:`export` to write a speaker out as an
+    Ogg Opus stream.
+    """
+
+    def __init__(self):
+        super().__init__()
+
+        self._buffers: Dict[int, _OpusBuffer] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def wants_opus(self) -> bool:
+        return True
+
+    def write(self, user: Optional[User], data: VoiceData) -> None:
+        opus = data.opus
+        if not opus:
+            return
+
+        now = time.perf_counter()
+        with self._lock:
+            buffer = self._buffers.get(data.packet.ssrc)
+            if buffer is None:
+                buffer = self._buffers[data.packet.ssrc] = _OpusBuffer()
+
+            if user is not None:
+                buffer.user_id = user.id
+
+            buffer.data += opus
+            buffer.offsets.append(len(buffer.data))
+            buffer.timestamps.append(data.packet.timestamp)
+            buffer.times.append(now)
+
+    @property
+    def ssrcs(self) -> List[int]:
+        with self._lock:
+            return list(self._buffers)
+
+    def user_id(self, ssrc: int) -> Optional[int]:
+        with self._lock:
+            buffer = self._buffers.get(ssrc)
+            return buffer.user_id if buffer else None
+
+    def packets(self, ssrc: int) -> List[Tuple[int, bytes]]:
+        """Returns the (rtp timestamp, opus packet) pairs stored for an ssrc."""
+        return [(timestamp, opus) for timestamp, _, opus in self._packets(ssrc)]
+
+    def _packets(self, ssrc: int) -> List[Tuple[int, float, bytes]]:
+        with self._lock:
+            buffer = self._buffers.get(ssrc)
+            if buffer is None:
+                return []
+
+            data = bytes(buffer.data)
+            offsets = buffer.offsets.tolist()
+            timestamps = buffer.timestamps.tolist()
+            times = buffer.times.tolist()
+
+        return [(ts, times[i], data[offsets[i] : offsets[i + 1]]) for i, ts in enumerate(timestamps)]
+
+    def export(self, ssrc: int, destination: Union[str, IO[bytes]], *, max_gap: float = 300.0) -> OggOpusTrack:
+        """Writes an ssrc's packets as an Ogg Opus stream to a path or binary file object.
+
+        Timestamp jumps longer than ``max_gap`` seconds are replaced by the time
+        that passed between the packets' arrivals.
+        """
+        track = OggOpusTrack(ssrc, destination)
+        track.user_id = self.user_id(ssrc)
+        try:
+            for timestamp, arrived, opus in self._packets(ssrc):
+                track.write(timestamp, opus, arrived, max_gap=max_gap)
+        finally:
+            track.close()
+        return track
+
+    def clear(self, ssrc: Optional[int] = None) -> None:
+        """Drops the stored packets of one ssrc, or of all of them."""
+        with self._lock:
+            if ssrc is None:
+                self._buffers.clear()
+            else:
+                self._buffers.pop(ssrc, None)
+
+    def cleanup(self) -> None:
+        pass
+
+
 class FFmpegSink(AudioSink):
     @overload
     def __init__(
@@ -631,3 +1177,175 @@ class SilenceGeneratorSink(AudioSink):
 
     def cleanup(self) -> None:
         self.silencegen.stop()
+
+
+class _MixerTrack:
+    __slots__ = ('timestamp', 'frame', 'next_frame')
+
+    def __init__(self, timestamp: int, frame: int):
+        self.timestamp: int = timestamp  # rtp timestamp of the last placed packet
+        self.frame: int = frame  # timeline frame the last placed packet started at
+        self.next_frame: int = frame  # first timeline frame this track has not written to
+
+
+class MixerSink(AudioSink):
+    """Mixes audio from all members into a single, correctly timed stream.
+
+    Each ssrc is placed on a shared timeline using its rtp timestamps, anchored to
+    when its first packet arrived.  Overlapping frames are summed and gaps are filled
+    with silence from a :class:`SilenceGenerator`.  A frame is written to the destination
+    once every active ssrc has advanced past it, or when the window of `max_delay`
+    seconds is full and a newer packet needs its row.  There is no timer, so an ssrc
+    that stops advancing (silence normally keeps them going) holds the output back
+    until then; :meth:`flush` and :meth:`cleanup` write out whatever is left.
+    Mixed data is written with no user and a :class:`MixedPacket`.
+
+    Requires numpy.
+    """
+
+    FRAME_SAMPLES = OpusDecoder.SAMPLES_PER_FRAME
+    FRAME_DURATION = OpusDecoder.FRAME_LENGTH / 1000
+
+    def __init__(self, destination: AudioSink, *, max_delay: float = 1.0):
+        if np is None:
+            raise RuntimeError('numpy is required to use MixerSink.')
+
+        if not isinstance(destination, AudioSink):
+            raise TypeError(f'expected AudioSink not {type(destination).__name__}')
+
+        if destination.wants_opus():
+            raise VoiceRecvException('AudioSink must not request Opus encoding.')
+
+        super().__init__(destination)
+
+        self.destination: AudioSink = destination
+        self.max_delay: float = max_delay
+
+        self._window_size: int = max(2, int(max_delay / self.FRAME_DURATION))
+        # one row of summed int16 samples per frame, int32 so sums don't overflow before clipping
+        self._window = np.zeros((self._window_size, OpusDecoder.FRAME_SIZE // 2), dtype=np.int32)
+        self._tracks: Dict[int, _MixerTrack] = {}
+        self._user_ssrcs: Dict[int, int] = {}  # {user_id: ssrc}
+        self._cursor: int = 0  # next timeline frame to write to the destination
+        self._start: Optional[float] = None
+        self._lock: threading.Lock = threading.Lock()
+
+        self.silencegen: SilenceGenerator = SilenceGenerator(self._place)
+        self.silencegen.start()
+
+    def wants_opus(self) -> bool:
+        return False
+
+    def write(self, user: Optional[User], data: VoiceData) -> None:
+        self.silencegen.push(user, data.packet)
+        self._place(user, data)
+
+    def _wall_frame(self, now: float) -> int:
+        assert self._start is not None
+        return int((now - self._start) / self.FRAME_DURATION)
+
+    def _place(self, user: Optional[User], data: VoiceData) -> None:
+        samples = np.frombuffer(data.pcm, dtype=np.int16)
+        row_size = self._window.shape[1]
+        nframes = min(len(samples) // row_size, self._window_size)
+        if not nframes:
+            return
+
+        packet = data.packet
+        ssrc = packet.ssrc
+
+        with self._lock:
+            track = self._tracks.get(ssrc)
+
+            if track is None:
+                now = time.perf_counter()
+                if self._start is None:
+                    self._start = now
+
+                frame = max(self._cursor, self._wall_frame(now))
+                track = self._tracks[ssrc] = _MixerTrack(packet.timestamp, frame)
+            else:
+                delta = (packet.timestamp - track.timestamp) & 0xFFFFFFFF
+                if delta >= 0x80000000:
+                    delta -= 0x100000000
+
+                frame = track.frame + round(delta / self.FRAME_SAMPLES)
+
+                # Too late to be mixed, or the timestamps jumped further than we can buffer
+                if frame < self._cursor or frame > track.next_frame + self._window_size:
+                    log.debug("Re-anchoring ssrc %s in mixer (frame=%s, cursor=%s)", ssrc, frame, self._cursor)
+                    frame = max(self._cursor, track.next_frame)
+
+            if user is not None:
+                self._user_ssrcs[user.id] = ssrc
+
+            # Make room in the window, anything lagging behind gets mixed as silence
+            while frame + nframes > self._cursor + self._window_size:
+                self._write_frame()
+
+            rows = np.arange(frame, frame + nframes) % self._window_size
+            self._window[rows] += samples[: nframes * row_size].reshape(nframes, row_size)
+
+            track.timestamp = packet.timestamp
+            track.frame = frame
+            track.next_frame = max(track.next_frame, frame + nframes)
+
+            self._write_ready()
+
+    def _write_ready(self) -> None:
+        if not self._tracks:
+            return
+
+        ready = min(track.next_frame for track in self._tracks.values())
+        while self._cursor < ready:
+            self._write_frame()
+
+    def _write_frame(self) -> None:
+        row = self._window[self._cursor % self._window_size]
+        pcm = np.clip(row, -32768, 32767).astype(np.int16).tobytes()
+        row.fill(0)
+
+        packet = MixedPacket(self._cursor & 0xFFFF, (self._cursor * self.FRAME_SAMPLES) & 0xFFFFFFFF)
+        self._cursor += 1
+
+        self.destination.write(None, VoiceData(packet, None, pcm=pcm))
+
+    @AudioSink.listener()
+    def on_voice_member_disconnect(self, member: discord.Member, ssrc: Optional[int]) -> None:
+        self.silencegen.drop(ssrc=ssrc, user=member)
+
+        with self._lock:
+            if ssrc is None:
+                ssrc = self._user_ssrcs.pop(member.id, None)
+            else:
+                self._user_ssrcs.pop(member.id, None)
+
+            if ssrc is not None:
+                self._tracks.pop(ssrc, None)
+                self._write_ready()
+
+    def cleanup(self) -> None:
+        # this function gets called in __del__ so instance attributes might not even exist
+        silencegen: Optional[SilenceGenerator] = getattr(self, 'silencegen', None)
+        if silencegen is None:
+            return
+
+        silencegen.stop()
+
+        with self._lock:
+            self._flush()
+            self._tracks.clear()
+
+    def flush(self) -> None:
+        """Writes every buffered frame to the destination now, without waiting out ``max_delay``.
+
+        Call this before the destination stops taking audio, otherwise up to
+        ``max_delay`` seconds at the end are only written by :meth:`cleanup`.
+        """
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        end = max((track.next_frame for track in self._tracks.values()), default=self._cursor)
+        while self._cursor < end:
+            self._write_frame()
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import annotations
+
+import time
+import bisect
+import threading
+
+from .buffer import JitterEstimator
+
+from typing import TYPE_CHECKING, Final
+
+if TYPE_CHECKING:
+    from typing import Any, Callable, Dict, List, Optional
+    from .rtp import RTPPacket
+
+__all__ = [
+    'StreamStats',
+    'ReceiveTelemetry',
+]
+
+# Upper bounds of the jitter histogram buckets in seconds, the last bucket has no bound
+JITTER_BUCKETS: Final = (0.005, 0.01, 0.02, 0.04, 0.08)
+# Buffer depths from this up share the last histogram bucket
+MAX_DEPTH: Final = 32
+
+
+def _bucket_names() -> List[str]:
+    names = [f'<{bound * 1000:g}ms' for bound in JITTER_BUCKETS]
+    names.append(f'>={JITTER_BUCKETS[-1] * 1000:g}ms')
+    return names
+
+
+def _trim(counts: List[int]) -> List[int]:
+    end = len(counts)
+    while end and not counts[end - 1]:
+        end -= 1
+    return counts[:end]
+
+
+class StreamStats:
+    """Counters for one ssrc.
+
+    Updated by the :class:`PacketRouter` and its decoders while they hold the
+    router's lock, and read the same way by :meth:`AudioReader.get_telemetry`.
+    """
+
+    __slots__ = (
+        'ssrc',
+        'received',
+        'reordered',
+        'late',
+        'discarded',
+        'fec_recovered',
+        'concealed',
+        'depth',
+        'jitter_histogram',
+        'depth_histogram',
+        'estimator',
+        'user_id',
+        '_base',
+        '_highest',
+    )
+
+    def __init__(self, ssrc: int):
+        self.ssrc: int = ssrc
+        self.estimator: JitterEstimator = JitterEstimator()
+        self.depth: int = 0
+        self.user_id: Optional[int] = None  # only kept once the stream is retired
+        # Unwrapped sequence numbers: the first one expected this interval, and the highest one seen
+        self._base: Optional[int] = None
+        self._highest: Optional[int] = None
+        self.clear()
+
+    def clear(self) -> None:
+        """Zeroes the counters and histograms, leaving the jitter estimate and loss tracking going."""
+
+        self.received: int = 0  # packets that arrived, including late and duplicated ones
+        self.reordered: int = 0  # packets that arrived after a higher sequence number
+        self.late: int = 0  # packets the jitter buffer refused, too late or duplicated
+        self.discarded: int = 0  # packets lost flushing the jitter buffer
+        self.fec_recovered: int = 0  # missing packets rebuilt from the next packet's fec data
+        self.concealed: int = 0  # missing packets filled in without fec
+        self.jitter_histogram: List[int] = [0] * (len(JITTER_BUCKETS) + 1)
+        self.depth_histogram: List[int] = [0] * (MAX_DEPTH + 1)
+
+        if self._highest is not None:
+            self._base = self._highest + 1
+
+    @property
+    def expected(self) -> int:
+        """Packets the sender sent since the counters were cleared, judging by sequence numbers."""
+        if self._highest is None:
+            return 0
+        return self._highest - self._base + 1  # type: ignore
+
+    @property
+    def lost(self) -> int:
+        """Packets that never arrived, as in RFC 3550 (duplicates can hide losses)."""
+        return max(0, self.expected - self.received)
+
+    def packet_received(self, packet: RTPPacket, *, accepted: bool, depth: int) -> None:
+        """Records a packet pushed into the jitter buffer, and the buffer's depth after it."""
+
+        self.received += 1
+
+        sequence = packet.sequence
+        if self._highest is None:
+            self._base = self._highest = sequence
+        else:
+            delta = (sequence - self._highest) & 0xFFFF
+            if delta >= 0x8000:
+                delta -= 0x10000
+
+            if delta > 0:
+                self._highest += delta
+            elif delta < 0:
+                self.reordered += 1
+
+        if not accepted:
+            self.late += 1
+
+        jitter = self.estimator.update(packet.timestamp, time.monotonic())
+        self.jitter_histogram[bisect.bisect(JITTER_BUCKETS, jitter)] += 1
+
+        self.depth = depth
+        self.depth_histogram[min(depth, MAX_DEPTH)] += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'received': self.received,
+            'expected': self.expected,
+            'lost': self.lost,
+            'loss_rate': self.lost / self.expected if self.expected else 0.0,
+            'reordered': self.reordered,
+            'late': self.late,
+            'discarded': self.discarded,
+            'fec_recovered': self.fec_recovered,
+            'concealed': self.concealed,
+            'jitter_ms': round(self.estimator.estimate * 1000, 2),
+            'reported_jitter_ms': round(self.estimator.reported * 1000, 2),
+            'jitter_histogram': dict(zip(_bucket_names(), self.jitter_histogram)),
+            'depth': self.depth,
+            'depth_histogram': _trim(self.depth_histogram),
+        }
+
+
+class ReceiveTelemetry:
+    """Network quality counters for every ssrc a reader has received from.
+
+    Always on: each packet costs a few integer updates and one jitter
+    estimate.  Use :meth:`snapshot` (through :meth:`VoiceRecvClient.get_telemetry`)
+    to export them, with ``reset=True`` for per interval numbers.  Streams
+    whose member left are retired, and stay in snapshots until the next reset.
+    """
+
+    def __init__(self):
+        self.streams: Dict[int, StreamStats] = {}
+        self.retired: Dict[int, StreamStats] = {}  # streams that ended since the last reset
+        self.started: float = time.time()
+        self._lock: threading.Lock = threading.Lock()
+
+    def stream(self, ssrc: int) -> StreamStats:
+        stats = self.streams.get(ssrc)
+        if stats is None:
+            with self._lock:
+                stats = self.streams.get(ssrc)
+                if stats is None:
+                    # Back before its counters were exported, carry on with them
+                    stats = self.retired.pop(ssrc, None) or StreamStats(ssrc)
+                    self.streams[ssrc] = stats
+        return stats
+
+    def retire(self, ssrc: int, *, user_id: Optional[int] = None) -> None:
+        """Stops tracking an ssrc once its decoder is gone.
+
+        Its counters are kept for the next snapshot, with ``user_id`` since the
+        ssrc may no longer map to a user by then, and dropped after a reset.
+        """
+        with self._lock:
+            stats = self.streams.pop(ssrc, None)
+            if stats is not None:
+                stats.user_id = user_id
+                self.retired[ssrc] = stats
+
+    def snapshot(
+        self, *, reset: bool = False, user_id: Optional[Callable[[int], Optional[int]]] = None
+    ) -> Dict[str, Any]:
+        """Returns the counters of every ssrc, keyed by ssrc.
+
+        ``user_id`` maps an ssrc to a user id to include in each entry.  With
+        ``reset`` the counters start over, so the next snapshot only covers
+        what happened after this one.
+        """
+
+        now = time.time()
+        streams = {}
+        with self._lock:
+            for ssrc, stats in self.streams.items():
+                entry = stats.to_dict()
+                if user_id is not None:
+                    entry['user_id'] = user_id(ssrc)
+                streams[ssrc] = entry
+
+                if reset:
+                    stats.clear()
+
+            for ssrc, stats in self.retired.items():
+                entry = stats.to_dict()
+                if user_id is not None:
+                    entry['user_id'] = stats.user_id
+                entry['retired'] = True
+                streams[ssrc] = entry
+
+            snapshot = {'start': self.started, 'end': now, 'streams': streams}
+            if reset:
+                self.retired.clear()
+                self.started = now
+
+        return snapshot
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import annotations
+
+import time
+import math
+import logging
+import threading
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, Callable, List, Optional, Set
+
+log = logging.getLogger(__name__)
+
+__all__ = [
+    'TimerHandle',
+    'TimerWheel',
+    'get_timer_wheel',
+]
+
+
+class TimerHandle:
+    """A scheduled call, returned by :meth:`TimerWheel.call_at`."""
+
+    __slots__ = ('when', 'callback', 'args', 'cancelled', '_tick', '_slot', '_wheel')
+
+    def __init__(self, wheel: TimerWheel, when: float, tick: int, callback: Callable[..., Any], args: tuple):
+        self.when: float = when
+        self.callback: Callable[..., Any] = callback
+        self.args: tuple = args
+        self.cancelled: bool = False
+
+        self._tick: int = tick
+        self._slot: Optional[Set[TimerHandle]] = None
+        self._wheel: TimerWheel = wheel
+
+    def cancel(self) -> None:
+        """Stops the call from happening, if it has not started yet."""
+        self._wheel._cancel(self)
+
+
+class TimerWheel(threading.Thread):
+    """Runs timers for every voice connection of the process on one thread.
+
+    Timers live in a hierarchical timing wheel: ``levels`` rings of ``slots``
+    buckets, where a bucket of the first ring spans one ``tick`` and a bucket
+    of each next ring spans a whole turn of the previous one.  Scheduling and
+    cancelling are O(1), and a timer moves down a ring at most ``levels``
+    times before it fires.  The thread sleeps until the next occupied tick, or
+    the next time a higher ring has to be spread out, and not at all while
+    nothing is scheduled.
+
+    Callbacks run on the wheel's thread and must not block, anything slow
+    holds up every other connection's timers.
+    """
+
+    def __init__(self, *, tick: float = 0.005, slots: int = 256, levels: int = 4):
+        super().__init__(daemon=True, name=f'voice-timer-wheel-{id(self):x}')
+
+        if slots & (slots - 1) or slots < 2:
+            raise ValueError(f'slots ({slots}) must be a power of 2')
+
+        self.tick: float = tick
+        self.slots: int = slots
+        self.levels: int = levels
+
+        self._bits: int = slots.bit_length() - 1
+        self._mask: int = slots - 1
+        self._wheels: List[List[Set[TimerHandle]]] = [[set() for _ in range(slots)] for _ in range(levels)]
+        self._overflow: Set[TimerHandle] = set()
+        self._count: int = 0
+
+        self._start: float = time.perf_counter()
+        self._current: int = 0  # the next tick to run
+
+        self._lock: threading.Lock = threading.Lock()
+        self._wakeup: threading.Condition = threading.Condition(self._lock)
+        self._end_thread: threading.Event = threading.Event()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def call_at(self, when: float, callback: Callable[..., Any], *args: Any) -> TimerHandle:
+        """Calls ``callback(*args)`` once ``time.perf_counter()`` reaches ``when``."""
+
+        tick = max(0, math.ceil((when - self._start) / self.tick))
+        handle = TimerHandle(self, when, tick, callback, args)
+
+        with self._lock:
+            if not self._count:
+                # Nothing to catch up on, jump straight to now
+                self._current = max(self._current, self._tick_of(time.perf_counter()))
+
+            self._insert(handle)
+            self._count += 1
+
+            # Only wake the thread if it is idle or this timer may come before what it is sleeping for
+            if self._count == 1 or handle._tick <= (self._current | self._mask) + 1:
+                self._wakeup.notify()
+
+        return handle
+
+    def call_later(self, delay: float, callback: Callable[..., Any], *args: Any) -> TimerHandle:
+        """Calls ``callback(*args)`` after ``delay`` seconds."""
+        return self.call_at(time.perf_counter() + delay, callback, *args)
+
+    def stop(self) -> None:
+        self._end_thread.set()
+        with self._wakeup:
+            self._wakeup.notify()
+
+    def _tick_of(self, when: float) -> int:
+        return int((when - self._start) / self.tick)
+
+    def _insert(self, handle: TimerHandle) -> None:
+        # Called with _lock held
+        tick = max(handle._tick, self._current)
+        delta = tick - self._current
+
+        for level in range(self.levels):
+            if delta < 1 << (self._bits * (level + 1)):
+                slot = self._wheels[level][(tick >> (self._bits * level)) & self._mask]
+                break
+        else:
+            slot = self._overflow
+
+        slot.add(handle)
+        handle._slot = slot
+
+    def _cancel(self, handle: TimerHandle) -> None:
+        with self._lock:
+            handle.cancelled = True
+            if handle._slot is not None:
+                handle._slot.discard(handle)
+                handle._slot = None
+                self._count -= 1
+
+    def _cascade(self, level: int) -> None:
+        # Spreads the current bucket of `level` over the rings below it
+        slot = self._wheels[level][(self._current >> (self._bits * level)) & self._mask]
+        handles = list(slot)
+        slot.clear()
+        for handle in handles:
+            self._insert(handle)
+
+    def _advance(self) -> List[TimerHandle]:
+        """Runs the bookkeeping for the current tick and returns the timers due in it."""
+
+        for level in range(1, self.levels):
+            if self._current & ((1 << (self._bits * level)) - 1):
+                break
+            self._cascade(level)
+        else:
+            if self._overflow and not self._current & ((1 << (self._bits * self.levels)) - 1):
+                handles = list(self._overflow)
+                self._overflow.clear()
+                for handle in handles:
+                    self._insert(handle)
+
+        slot = self._wheels[0][self._current & self._mask]
+        due = list(slot)
+        slot.clear()
+        for handle in due:
+            handle._slot = None
+        self._count -= len(due)
+
+        self._current += 1
+        return due
+
+    def _next_wakeup(self) -> Optional[int]:
+        """The next tick that has timers in it, or has a higher ring to spread out."""
+
+        if not self._count:
+            return None
+
+        if not self._current & self._mask:
+            # The higher rings are spread out when this tick runs, only then is the first ring complete
+            return self._current
+
+        first = self._wheels[0]
+        end = (self._current | self._mask) + 1
+        for tick in range(self._current, end):
+            if first[tick & self._mask]:
+                return tick
+
+        return end
+
+    def run(self) -> None:
+        try:
+            self._do_run()
+        except Exception:
+            log.exception("Error in %s", self)
+
+    def _do_run(self) -> None:
+        while not self._end_thread.is_set():
+            with self._wakeup:
+                now = self._tick_of(time.perf_counter())
+                due = []
+                while self._current <= now and self._count:
+                    due.extend(self._advance())
+
+                if not due:
+                    tick = self._next_wakeup()
+                    if tick is None:
+                        self._wakeup.wait()
+                    else:
+                        self._wakeup.wait(max(0.0, self._start + tick * self.tick - time.perf_counter()))
+                    continue
+
+            for handle in due:
+                if handle.cancelled:
+                    continue
+                try:
+                    handle.callback(*handle.args)
+                except Exception:
+                    log.exception("Error in timer callback %s", handle.callback)
+
+
+_wheel: Optional[TimerWheel] = None
+_wheel_lock: threading.Lock = threading.Lock()
+
+
+def get_timer_wheel() -> TimerWheel:
+    """Returns the process-wide :class:`TimerWheel`, starting it the first time."""
+
+    global _wheel
+    with _wheel_lock:
+        if _wheel is None:
+            _wheel = TimerWheel()
+            _wheel.start()
+        return _wheel
@@ -15,11 +15,13 @@ from typing import TYPE_CHECKING
 from .gateway import hook
 from .reader import AudioReader
 from .sinks import AudioSink
+from .buffer import HeapJitterBuffer
 
 if TYPE_CHECKING:
-    from typing import Optional, Dict, Any, Union
+    from typing import Optional, Dict, Any, Union, Callable
     from discord.ext.commands._types import CoroFunc
     from .reader import AfterCB
+    from .buffer import JitterBuffer
 
 from pprint import pformat
 
@@ -131,8 +133,32 @@ class VoiceRecvClient(discord.VoiceClient):
     def _get_id_from_ssrc(self, ssrc: int) -> Optional[int]:
         return self._ssrc_to_id.get(ssrc)
 
-    def listen(self, sink: AudioSink, *, after: Optional[AfterCB] = None) -> None:
-        """Receives audio into a :class:`AudioSink`."""
+    def listen(
+        self,
+        sink: AudioSink,
+        *,
+        after: Optional[AfterCB] = None,
+        decode_workers: int = 0,
+        pooled: bool = False,
+        jitter_buffer: Callable[[], JitterBuffer] = HeapJitterBuffer,
+    ) -> None:
+        """Receives audio into a :class:`AudioSink`.
+
+        ``decode_workers`` moves opus decoding onto that many threads, with each
+        speaker pinned to one of them.  Worth it for channels with many active
+        speakers, where serial decoding would saturate a single core.
+
+        ``pooled`` reuses packets, :class:`VoiceData` and pcm buffers instead of
+        allocating them for every packet.  Only use it when every sink follows
+        the ownership rules in :meth:`AudioSink.write`.
+
+        ``jitter_buffer`` makes the jitter buffer of each speaker, for example
+        :class:`RingJitterBuffer` or a ``functools.partial`` of one with another
+        ``maxsize``.  :class:`RingJitterBuffer` keeps reordered packets and
+        conceals lost ones instead of skipping them.  :meth:`AdaptiveJitterBuffer.live`
+        and :meth:`AdaptiveJitterBuffer.archival` also size the delay from the
+        measured jitter, for the lowest latency or the fewest concealed frames.
+        """
         # TODO: more info
 
         if not self.is_connected():
@@ -144,13 +170,30 @@ class VoiceRecvClient(discord.VoiceClient):
         if self.is_listening():
             raise discord.ClientException('Already receiving audio.')
 
-        self._reader = AudioReader(sink, self, after=after)
+        self._reader = AudioReader(
+            sink, self, after=after, decode_workers=decode_workers, pooled=pooled, jitter_buffer=jitter_buffer
+        )
         self._reader.start()
 
     def is_listening(self) -> bool:
         """Indicates if we're currently receiving audio."""
         return self._reader and self._reader.is_listening()
 
+    def get_pool_stats(self) -> Optional[Dict[str, Dict[str, int]]]:
+        """Returns the hit and miss counters of the object pools, if listening with ``pooled=True``."""
+        if self._reader and self._reader.pool is not None:
+            return self._reader.pool.stats()
+
+    def get_telemetry(self, *, reset: bool = False) -> Optional[Dict[str, Any]]:
+        """Returns per-ssrc loss, jitter and buffer counters, if listening.
+
+        With ``reset`` the counters start over, for exporting one snapshot per interval.
+        This briefly holds the packet router's lock, so call it from a thread
+        (e.g. :meth:`asyncio.to_thread`) rather than the event loop.
+        """
+        if self._reader:
+            return self._reader.get_telemetry(reset=reset)
+
     def stop_listening(self) -> None:
         """Stops receiving audio."""
         if self._reader:
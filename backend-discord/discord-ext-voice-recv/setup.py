@@ -27,6 +27,7 @@ with open('README.md') as f:
 extras_require = {
     'extras': [
         'SpeechRecognition',
+        'numpy',
     ]
 }
 
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+import time
+import random
+import threading
+import unittest
+
+from discord.ext.voice_recv.timers import TimerWheel
+
+
+class TimerWheelBookkeepingTest(unittest.TestCase):
+    """Drives the wheel by hand, one wakeup at a time, without its thread or the clock."""
+
+    def setUp(self):
+        # A tick of a second keeps the real clock at tick 0 for the whole test.
+        # Rings of 8 and 64 ticks, anything later waits in the overflow.
+        self.wheel = TimerWheel(tick=1.0, slots=8, levels=2)
+
+    def schedule(self, tick):
+        return self.wheel.call_at(self.wheel._start + tick * self.wheel.tick, lambda: None)
+
+    def run_wheel(self):
+        """Returns {handle: tick it fired on}, waking only where the thread would."""
+        fired = {}
+        while len(self.wheel):
+            tick = self.wheel._next_wakeup()
+            self.assertIsNotNone(tick)
+            while self.wheel._current <= tick:
+                for handle in self.wheel._advance():
+                    fired[handle] = tick
+        return fired
+
+    def test_fires_on_its_tick_across_ring_turns(self):
+        rng = random.Random(0)
+        handles = [self.schedule(rng.randrange(1000)) for _ in range(500)]
+
+        fired = self.run_wheel()
+
+        self.assertEqual(len(fired), len(handles))
+        for handle in handles:
+            self.assertEqual(fired[handle], handle._tick)
+
+    def test_wakes_on_ring_boundary(self):
+        # Once the timer on tick 7 fires the wheel stands on a boundary with tick 11
+        # still in the second ring, it has to wake on tick 8 to spread it out.
+        first = self.schedule(7)
+        second = self.schedule(11)
+
+        fired = self.run_wheel()
+
+        self.assertEqual(fired, {first: 7, second: 11})
+
+    def test_cancel(self):
+        rng = random.Random(1)
+        handles = [self.schedule(rng.randrange(200)) for _ in range(200)]
+        cancelled = set(handles[::2])
+        for handle in cancelled:
+            handle.cancel()
+            handle.cancel()  # twice is harmless
+
+        self.assertEqual(len(self.wheel), len(handles) - len(cancelled))
+
+        fired = self.run_wheel()
+
+        self.assertEqual(set(fired), set(handles) - cancelled)
+        self.assertEqual(len(self.wheel), 0)
+
+
+class TimerWheelThreadTest(unittest.TestCase):
+    def setUp(self):
+        # Rings of 16, 256 and 4096 ticks of 2 ms, so half a second covers many turns
+        self.wheel = TimerWheel(tick=0.002, slots=16, levels=3)
+        self.wheel.start()
+
+    def tearDown(self):
+        self.wheel.stop()
+        self.wheel.join(1)
+
+    def test_fire_times(self):
+        rng = random.Random(2)
+        lock = threading.Lock()
+        fired = {}
+
+        def callback(index):
+            with lock:
+                fired[index] = time.perf_counter()
+
+        due = {}
+        cancelled = []
+        for index in range(300):
+            due[index] = time.perf_counter() + rng.uniform(0, 0.5)
+            handle = self.wheel.call_at(due[index], callback, index)
+            if index % 5 == 0:
+                handle.cancel()
+                cancelled.append(index)
+
+        time.sleep(0.7)
+
+        with lock:
+            self.assertEqual(set(fired), set(due) - set(cancelled))
+            for index, when in fired.items():
+                self.assertGreaterEqual(when, due[index])
+                self.assertLess(when - due[index], 0.1)
+        self.assertEqual(len(self.wheel), 0)
+
+    def test_callback_error_does_not_stop_the_wheel(self):
+        done = threading.Event()
+
+        def fail():
+            raise RuntimeError('expected')
+
+        self.wheel.call_later(0.01, fail)
+        self.wheel.call_later(0.02, done.set)
+
+        with self.assertLogs('discord.ext.voice_recv.timers', 'ERROR'):
+            self.assertTrue(done.wait(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import threading
+
+import numpy as np
+from discord.opus import Decoder as OpusDecoder
+from discord.ext.voice_recv import AudioSink
+
+# Seconds of audio kept per speaker, should cover at least one status update interval
+RING_SECONDS = 3.0
+_FRAME_SAMPLES = OpusDecoder.FRAME_SIZE // 2  # int16 samples per 20 ms stereo frame
+
+
+class _SpeakerRing:
+    """Preallocated ring of PCM frames for one ssrc"""
+
+    __slots__ = ('user_id', 'frames', 'raw', 'pos', 'count')
+
+    def __init__(self, capacity: int):
+        self.user_id = None
+        self.frames = np.zeros((capacity, _FRAME_SAMPLES), dtype=np.int16)
+        # Byte view over the same memory, so writes are a plain memcpy with no numpy call
+        self.raw = memoryview(self.frames).cast('B')
+        self.pos = 0  # Next slot to write
+        self.count = 0  # Frames written since the last snapshot
+
+
+class LevelMeter(AudioSink):
+    """Measures per-speaker RMS and peak levels in batches.
+
+    `write()` runs on the packet router thread and only copies the frame into a
+    preallocated ring buffer. The numpy work happens in `snapshot()`, which is
+    meant to be called once per status update. After `stop()` frames are
+    dropped, so the levels go quiet when recording ends.
+    """
+
+    def __init__(self, ring_seconds: float = RING_SECONDS):
+        super().__init__()
+        self.capacity = max(1, int(ring_seconds * 1000 / OpusDecoder.FRAME_LENGTH))
+        self._rings = {}  # {ssrc: _SpeakerRing}
+        self._lock = threading.Lock()
+        self.is_recording = True
+
+    def wants_opus(self) -> bool:
+        return False
+
+    def write(self, user, data):
+        if not self.is_recording:
+            return
+
+        pcm = data.pcm
+        if len(pcm) != OpusDecoder.FRAME_SIZE:
+            return
+
+        ssrc = data.packet.ssrc
+        ring = self._rings.get(ssrc)
+        if ring is None:
+            with self._lock:
+                ring = self._rings.setdefault(ssrc, _SpeakerRing(self.capacity))
+
+        if user is not None:
+            ring.user_id = user.id
+
+        start = ring.pos * OpusDecoder.FRAME_SIZE
+        ring.raw[start:start + OpusDecoder.FRAME_SIZE] = pcm
+        ring.pos = (ring.pos + 1) % self.capacity
+        ring.count += 1
+
+    def snapshot(self):
+        """Compute levels for the frames received since the last snapshot.
+
+        Returns None if nothing was received, otherwise a dict with the combined
+        'level' and 'peak' (0-1) and per-speaker 'speakers': {user_id: (rms, peak)}.
+        """
+        with self._lock:
+            rings = list(self._rings.items())
+
+        speakers = {}
+        total_power = 0.0
+        peak = 0.0
+
+        for ssrc, ring in rings:
+            count, pos = ring.count, ring.pos
+            if not count:
+                continue
+            ring.count = 0
+
+            # If the writer lapped us we only look at the newest frames
+            n = min(count, self.capacity)
+            frames = ring.frames.take(np.arange(pos - n, pos), axis=0, mode='wrap')
+
+            samples = frames.astype(np.float32) / 32768.0
+            power = float(np.mean(samples * samples))
+            speaker_peak = float(np.max(np.abs(samples)))
+
+            speakers[ring.user_id or ssrc] = (power ** 0.5, speaker_peak)
+            total_power += power
+            peak = max(peak, speaker_peak)
+
+        if not speakers:
+            return None
+
+        # Speakers are roughly uncorrelated, so the mix's power is about the sum of theirs
+        return {'level': min(total_power ** 0.5, 1.0), 'peak': peak, 'speakers': speakers}
+
+    def stop_recording(self):
+        """Stop measuring and drop what was buffered since the last snapshot"""
+        self.is_recording = False
+        with self._lock:
+            self._rings.clear()
+
+    @AudioSink.listener()
+    def on_voice_member_disconnect(self, member, ssrc):
+        if ssrc is not None:
+            with self._lock:
+                self._rings.pop(ssrc, None)
+
+    def cleanup(self):
+        self._rings.clear()
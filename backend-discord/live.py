@@ -0,0 +1,165 @@
+import time
+import asyncio
+import threading
+
+from discord.opus import Decoder as OpusDecoder
+from discord.ext.voice_recv import AudioSink
+
+from storage import run_io
+from tracks import get_executor, prepare_chunk, transcribe_prepared
+
+# Utterances shorter than this keep accumulating when the speaker pauses
+MIN_UTTERANCE = 1.5
+# Utterances are cut at this length even if the speaker keeps going
+MAX_UTTERANCE = 30.0
+# A pause longer than this always ends an utterance
+MAX_PAUSE = 2.0
+# Leftover fragments shorter than this are dropped instead of transcribed
+MIN_CHUNK = 0.5
+
+FRAME_DURATION = OpusDecoder.FRAME_LENGTH / 1000
+_BYTES_PER_SECOND = OpusDecoder.SAMPLING_RATE * OpusDecoder.SAMPLE_SIZE
+
+
+class _Utterance:
+    __slots__ = ('ssrc', 'user_id', 'start', 'pcm', 'last_time')
+
+    def __init__(self, ssrc, user_id, start, now):
+        self.ssrc = ssrc
+        self.user_id = user_id
+        self.start = start  # Offset on the meeting timeline in seconds
+        self.pcm = bytearray()
+        self.last_time = now  # When the last frame was received
+
+    @property
+    def duration(self) -> float:
+        return len(self.pcm) / _BYTES_PER_SECOND
+
+
+class LiveTranscriber(AudioSink):
+    """Transcribes each speaker's audio in utterance-sized chunks while the meeting runs.
+
+    Utterances are cut on speaking stop events (once they are long enough), on
+    long pauses and at MAX_UTTERANCE, encoded on the track process pool and
+    transcribed through the shared TranscriptionService.
+    Results are appended to `results` and to a live transcript file as they
+    arrive, so `flush()` at the end only has to wait for the last chunks.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, service, transcript_path):
+        super().__init__()
+        self.loop = loop
+        self.service = service
+        self.transcript_path = transcript_path
+
+        self.results = []  # Chunk results in the format returned by tracks.transcribe_prepared
+        self.failed = 0  # Chunks that could not be transcribed
+
+        self._utterances = {}  # {user id or ssrc: _Utterance}
+        self._pending = set()  # Futures for chunks being transcribed
+        self._start = None
+        self._closed = False
+        self._lock = threading.RLock()
+
+    def wants_opus(self) -> bool:
+        return False
+
+    def write(self, user, data):
+        now = time.perf_counter()
+        ssrc = data.packet.ssrc
+        key = user.id if user else ssrc
+
+        with self._lock:
+            if self._closed:
+                return
+
+            if self._start is None:
+                self._start = now
+
+            utterance = self._utterances.get(key)
+            if utterance is not None:
+                pause = now - utterance.last_time - FRAME_DURATION
+                if pause > MAX_PAUSE:
+                    self._cut(key)
+                    utterance = None
+                elif pause >= 5 * FRAME_DURATION:
+                    # Keep short pauses inside the utterance so Whisper's timestamps stay right
+                    utterance.pcm += bytes(int(pause / FRAME_DURATION) * OpusDecoder.FRAME_SIZE)
+
+            if utterance is None:
+                start = now - self._start
+                utterance = self._utterances[key] = _Utterance(ssrc, user.id if user else None, start, now)
+
+            utterance.pcm += data.pcm
+            utterance.last_time = now
+
+            if utterance.duration >= MAX_UTTERANCE:
+                self._cut(key)
+
+    @AudioSink.listener()
+    def on_voice_member_speaking_stop(self, member):
+        with self._lock:
+            utterance = self._utterances.get(member.id)
+            if utterance is not None and utterance.duration >= MIN_UTTERANCE:
+                self._cut(member.id)
+
+    @AudioSink.listener()
+    def on_voice_member_disconnect(self, member, ssrc):
+        with self._lock:
+            self._cut(member.id)
+
+    def _speaker_name(self, utterance: _Utterance) -> str:
+        vc = self.voice_client
+        member = vc.guild.get_member(utterance.user_id) if vc and utterance.user_id else None
+        return member.display_name if member else f"Speaker {utterance.ssrc}"
+
+    def _cut(self, key):
+        # Must be called with the lock held
+        utterance = self._utterances.pop(key, None)
+        if utterance is None or utterance.duration < MIN_CHUNK:
+            return
+
+        job = {'pcm': bytes(utterance.pcm), 'offset': utterance.start, 'speaker': self._speaker_name(utterance)}
+        future = asyncio.run_coroutine_threadsafe(self._transcribe(job), self.loop)
+        self._pending.add(future)
+        future.add_done_callback(self._chunk_done)
+
+    def _chunk_done(self, future):
+        with self._lock:
+            self._pending.discard(future)
+
+    async def _transcribe(self, job):
+        try:
+            prepared = await self.loop.run_in_executor(get_executor(), prepare_chunk, job)
+            result = await transcribe_prepared(prepared, self.service, job['speaker'])
+        except Exception as e:
+            print(f"Error transcribing live chunk at {job['offset']:.2f}s: {e!r}")
+            self.failed += 1
+            return
+
+        self.results.append(result)
+        if result['segments']:
+            lines = "".join(
+                f"[{s['start']:.2f}s - {s['end']:.2f}s] {s['speaker']}: {s['text']}\n" for s in result['segments']
+            )
+            await run_io(_append_text, self.transcript_path, lines)
+
+    async def flush(self):
+        """Stop accepting audio, cut every open utterance and wait for all chunks"""
+        with self._lock:
+            self._closed = True
+            for key in list(self._utterances):
+                self._cut(key)
+            pending = list(self._pending)
+
+        await asyncio.gather(*(asyncio.wrap_future(f) for f in pending), return_exceptions=True)
+
+    def cleanup(self):
+        with self._lock:
+            self._closed = True
+            self._utterances.clear()
+
+
+def _append_text(path, text: str):
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(text)
@@ -1,24 +1,33 @@
 import os
 import discord
 from discord.ext import commands, tasks
-from discord.ext.voice_recv import VoiceRecvClient, AudioSink, WaveSink
+from discord.ext.voice_recv import VoiceRecvClient, AudioSink, WaveSink, MixerSink, MultiAudioSink, MultiTrackSink
+from discord.ext.voice_recv import HeapJitterBuffer, RingJitterBuffer, AdaptiveJitterBuffer
 from dotenv import load_dotenv
 import asyncio
-import wave
 import io
 import tempfile
-from datetime import datetime
-import numpy as np
-from collections import deque
+from datetime import datetime, timedelta
 import time
 import copy
 import pathlib
-import groq
 import base64
+import shutil
 import json
 from supabase import create_client, Client
 from urllib.parse import urlencode
 import aiohttp
+from recorder import SegmentedRecorder, JOURNAL_SUFFIX, read_recording, find_unfinished_journals, recover_journal
+from tracks import get_executor, process_tracks, transcribe_upload
+from transcript import Transcript
+from asr import prepare_recording
+from levels import LevelMeter
+from storage import run_io, write_metadata, append_json_line, ProgressMessage
+from live import LiveTranscriber
+from transcription import TranscriptionService
+from status import StatusScheduler
+from catalog import RecordingCatalog, TRANSCRIPT_PENDING, TRANSCRIPT_DONE, TRANSCRIPT_FAILED
+from archive import Archiver
 
 # Load environment variables
 load_dotenv()
@@ -29,8 +38,11 @@ supabase: Client = create_client(
     os.getenv('SUPABASE_ANON_KEY')
 )
 
-# Initialize Groq client
-groq_client = groq.Groq(api_key=os.getenv('GROQ_API_KEY'))
+# Index of every recording, kept up to date as recordings are saved
+catalog = RecordingCatalog()
+
+# Initialize the Whisper transcription service shared by all guilds
+transcription_service = TranscriptionService(api_key=os.getenv('GROQ_API_KEY'))
 
 # Discord OAuth2 settings
 DISCORD_CLIENT_ID = os.getenv('DISCORD_CLIENT_ID')
@@ -44,7 +56,16 @@ RECORDINGS_DIR.mkdir(exist_ok=True)
 # Bot setup
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix='!', intents=intents)
+if os.getenv('SHARD_COUNT'):
+    # Running as one worker of shards.py: only connect the shards this process owns
+    bot = commands.AutoShardedBot(
+        command_prefix='!',
+        intents=intents,
+        shard_count=int(os.getenv('SHARD_COUNT')),
+        shard_ids=[int(shard_id) for shard_id in os.getenv('SHARD_IDS').split(',')]
+    )
+else:
+    bot = commands.Bot(command_prefix='!', intents=intents)
 
 # Voice client setup
 bot.voice_client_class = VoiceRecvClient
@@ -58,6 +79,24 @@ PROCESSING_EMOJI = "🎙️"
 IDLE_EMOJI = "⏸️"
 SPEAKING_EMOJI = "🗣️"
 
+# Threads decoding opus per voice connection, 0 decodes on the packet router thread
+DECODE_WORKERS = int(os.getenv('DECODE_WORKERS', 0))
+
+# 'ring' keeps reordered packets and conceals lost ones, 'heap' is the original jitter buffer.
+# 'live' and 'archival' adapt the delay to the network's jitter, favouring latency or complete audio
+JITTER_BUFFER = {
+    'heap': HeapJitterBuffer,
+    'ring': RingJitterBuffer,
+    'live': AdaptiveJitterBuffer.live,
+    'archival': AdaptiveJitterBuffer.archival,
+}[os.getenv('JITTER_BUFFER', 'heap')]
+
+# Seconds between network telemetry snapshots written next to each recording, 0 to disable
+TELEMETRY_INTERVAL = float(os.getenv('TELEMETRY_INTERVAL', 30))
+
+# Minutes between archiving batches of old recordings, 0 to leave it to `python archive.py`
+ARCHIVE_INTERVAL = float(os.getenv('ARCHIVE_INTERVAL', 60))
+
 # Update interval in seconds (increased to avoid rate limiting)
 UPDATE_INTERVAL = 2.0
 
@@ -67,11 +106,10 @@ class VoiceTranscriptionSink(AudioSink):
         self.guild_id = guild_id
         self.speaking_users = set()
         self.last_status_update = {}  # Track last status update per user
-        self.audio_buffer = []  # Buffer for raw audio data
         self.is_recording = True  # Flag to track recording state
         
     def wants_opus(self) -> bool:
-        """We want PCM data for calculating audio levels"""
+        """We want PCM data for recording"""
         return False
         
     def write(self, user: discord.User, data):
@@ -79,17 +117,8 @@ class VoiceTranscriptionSink(AudioSink):
         if self.guild_id in active_connections and self.is_recording:
             conn = active_connections[self.guild_id]
             try:
-                # Store raw audio data
-                conn['audio_data'].append(data.pcm)
-                conn['last_audio_time'] = datetime.now()
-                
-                # Calculate audio level from the PCM data
-                audio_array = np.frombuffer(data.pcm, dtype=np.int16)
-                audio_level = np.abs(audio_array).mean() / 32768.0  # Normalize to 0-1
-                conn['audio_buffer'].append(audio_level)
-                
-                # Keep track of the last audio time
-                conn['last_audio_time'] = datetime.now()
+                # Spool raw audio data to disk, levels are measured by the LevelMeter
+                conn['recorder'].write(data.pcm)
             except Exception as e:
                 print(f"Error in write method: {e}")
 
@@ -108,6 +137,7 @@ class VoiceTranscriptionSink(AudioSink):
                 self.speaking_users.add(member.id)
                 active_connections[self.guild_id]['speaking_users'] = self.speaking_users.copy()
                 self.last_status_update[member.id] = current_time
+                bot.loop.call_soon_threadsafe(refresh_status, self.guild_id, True)
     
     @AudioSink.listener()
     def on_voice_member_speaking_stop(self, member):
@@ -120,6 +150,7 @@ class VoiceTranscriptionSink(AudioSink):
                 self.speaking_users.discard(member.id)
                 active_connections[self.guild_id]['speaking_users'] = self.speaking_users.copy()
                 self.last_status_update[member.id] = current_time
+                bot.loop.call_soon_threadsafe(refresh_status, self.guild_id, True)
     
     @AudioSink.listener()
     def on_voice_member_disconnect(self, member, ssrc):
@@ -128,17 +159,104 @@ class VoiceTranscriptionSink(AudioSink):
             self.speaking_users.discard(member.id)
             active_connections[self.guild_id]['speaking_users'] = self.speaking_users.copy()
             self.last_status_update.pop(member.id, None)
+            bot.loop.call_soon_threadsafe(refresh_status, self.guild_id, True)
     
     def cleanup(self):
         """Clean up resources"""
         self.speaking_users.clear()
         self.last_status_update.clear()
 
+def recording_paths(guild: discord.Guild):
+    """Return the (journal, metadata) paths for a new recording in this guild"""
+    # Create guild-specific directory
+    guild_dir = RECORDINGS_DIR / str(guild.id)
+    guild_dir.mkdir(exist_ok=True)
+
+    # Generate filename with timestamp and guild name
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    safe_guild_name = "".join(c for c in guild.name if c.isalnum() or c in (' ', '-', '_')).strip()
+    filepath = guild_dir / f"{timestamp}_{safe_guild_name}{JOURNAL_SUFFIX}"
+    metadata_file = guild_dir / f"{timestamp}_{safe_guild_name}_metadata.txt"
+    return filepath, metadata_file
+
+def owns_guild(guild_id: int) -> bool:
+    """Whether this process runs the shard that guild belongs to"""
+    if bot.shard_count is None or bot.shard_count <= 1:
+        return True
+    shard_id = (guild_id >> 22) % bot.shard_count
+    return shard_id in (bot.shard_ids or [bot.shard_id])
+
+# Compresses this process's old recordings in the background
+archiver = Archiver(catalog, owns=owns_guild)
+
+def recover_recordings() -> list:
+    """Finish the journals of sessions that were cut off by a crash or restart.
+
+    Only this process's guilds are recovered, so shard workers never race each
+    other. Each recovered recording gets its metadata file and catalog entry.
+    """
+    recovered = []
+    for path in find_unfinished_journals(RECORDINGS_DIR):
+        # Journals live in a folder per guild, see recording_paths
+        if path.parent.name.isdigit() and not owns_guild(int(path.parent.name)):
+            continue
+        try:
+            session = recover_journal(path)
+        except (OSError, ValueError) as e:
+            print(f"Error recovering {path}: {e}")
+            continue
+        if session is None:
+            continue
+        
+        metadata = session['metadata']
+        if not session['data_size']:
+            shutil.rmtree(path, ignore_errors=True)
+            continue
+        
+        start_time = datetime.fromisoformat(metadata['start_time'])
+        end_time = start_time + timedelta(seconds=session['duration'])
+        write_metadata(metadata['metadata_file'], {
+            'guild_name': metadata['guild_name'],
+            'guild_id': metadata['guild_id'],
+            'channel_name': metadata['channel_name'],
+            'start_time': start_time.isoformat(),
+            'end_time': end_time.isoformat(),
+            'duration': str(end_time - start_time),
+            'file_path': str(path),
+            'recovered': True
+        })
+        catalog.upsert(
+            file_path=path,
+            metadata_path=metadata['metadata_file'],
+            guild_id=metadata['guild_id'],
+            guild_name=metadata['guild_name'],
+            channel_id=metadata['channel_id'],
+            channel_name=metadata['channel_name'],
+            start_time=start_time.isoformat(),
+            end_time=end_time.isoformat(),
+            duration=session['duration'],
+            file_size=session['file_size']
+        )
+        recovered.append(path)
+    return recovered
+
+async def setup_hook():
+    # Runs once before connecting, so no new session can be mistaken for an unfinished one
+    recovered = await run_io(recover_recordings)
+    for path in recovered:
+        print(f"Recovered unfinished recording {path}")
+
+bot.setup_hook = setup_hook
+
 @bot.event
 async def on_ready():
     print(f'{bot.user} has connected to Discord!')
     await bot.change_presence(activity=discord.Game(name="!join to start recording"))
     update_status_loop.start()
+    if ARCHIVE_INTERVAL > 0 and not archive_loop.is_running():
+        archive_loop.start()
+    if TELEMETRY_INTERVAL > 0 and not telemetry_loop.is_running():
+        telemetry_loop.start()
 
 @bot.command(name='join')
 async def join(ctx):
@@ -152,22 +270,46 @@ async def join(ctx):
         await ctx.voice_client.move_to(channel)
     else:
         vc = await channel.connect(cls=VoiceRecvClient)
+        filepath, metadata_file = recording_paths(ctx.guild)
+        start_time = datetime.now()
+        # Streams audio to a crash-safe journal in the background, with enough
+        # metadata to finish the recording if the bot dies before !leave
+        recorder = SegmentedRecorder(filepath, metadata={
+            'guild_name': ctx.guild.name,
+            'guild_id': ctx.guild.id,
+            'channel_id': channel.id,
+            'channel_name': channel.name,
+            'start_time': start_time.isoformat(),
+            'metadata_file': str(metadata_file)
+        })
+        status_scheduler.add(ctx.guild.id)  # In case an earlier session was left with !leave
         active_connections[ctx.guild.id] = {
             'vc': vc,
-            'audio_data': [],
-            'start_time': datetime.now(),
+            'recorder': recorder,
+            'metadata_file': metadata_file,
+            'telemetry_file': filepath.parent / f"{filepath.stem}_network.jsonl",
+            'start_time': start_time,
             'last_audio_time': datetime.now(),
             'status_message': None,
-            'audio_buffer': deque(maxlen=50),  # Buffer for audio levels
-            'last_update': 0,  # Last update timestamp
-            'current_level': 0,  # Current smoothed audio level
-            'speaking_users': set(),  # Set of currently speaking users
-            'last_status_text': ""  # Track last status text to avoid unnecessary updates
+            'stopping': False,  # Set by !leave once the status message is being removed
+            'meter': LevelMeter(),  # Per-speaker audio levels, sampled once per status update
+            'current_level': 0,  # Current audio level
+            'speaking_users': set()  # Set of currently speaking users
         }
         
-        # Create and set up the audio sink
+        # Create and set up the audio sinks: all speakers mixed onto one timeline,
+        # a separate track per speaker, and live transcription of each utterance
         sink = VoiceTranscriptionSink(ctx.guild.id)
-        vc.listen(sink)
+        track_sink = MultiTrackSink(filepath.parent / f"{filepath.stem}_tracks")
+        live = LiveTranscriber(asyncio.get_running_loop(), transcription_service, filepath.parent / f"{filepath.stem}_live.txt")
+        active_connections[ctx.guild.id]['sink'] = sink
+        active_connections[ctx.guild.id]['track_sink'] = track_sink
+        active_connections[ctx.guild.id]['live'] = live
+        mixer = MixerSink(sink)
+        active_connections[ctx.guild.id]['mixer'] = mixer
+        meter = active_connections[ctx.guild.id]['meter']
+        vc.listen(MultiAudioSink([mixer, track_sink, meter, live]), decode_workers=DECODE_WORKERS,
+                  jitter_buffer=JITTER_BUFFER)
         
         await ctx.send(f"{LISTENING_EMOJI} Joined {channel.name} and started listening!")
         # Create and pin a status message
@@ -175,96 +317,95 @@ async def join(ctx):
         await status_msg.pin()
         active_connections[ctx.guild.id]['status_message'] = status_msg
 
-@tasks.loop(seconds=UPDATE_INTERVAL)
-async def update_status_loop():
-    """Background task to update status messages"""
-    current_time = time.time()
+def status_text(guild_id: int, conn: dict) -> str:
+    """Render the status message for a guild from its latest level and speakers"""
+    audio_level = conn['current_level']
     
-    # Create a copy of the keys to avoid RuntimeError
-    guild_ids = list(active_connections.keys())
+    # Create visual bar
+    bar_length = 20
+    filled = int(audio_level * bar_length)
+    bar = "█" * filled + "░" * (bar_length - filled)
     
-    for guild_id in guild_ids:
-        if guild_id not in active_connections:
-            continue
-            
-        conn = active_connections[guild_id]
-        
-        # Check if status message exists and is valid
-        if not conn['status_message']:
-            try:
-                # Get the channel from the voice client
-                channel = conn['vc'].channel
-                if channel:
-                    # Create new status message
-                    status_msg = await channel.send(f"{LISTENING_EMOJI} Listening... (Audio levels: 0%)\nNo one is speaking")
-                    await status_msg.pin()
-                    conn['status_message'] = status_msg
-            except Exception as e:
-                print(f"Error creating new status message: {e}")
-                continue
-        
-        # Only update if we have new audio data and enough time has passed
-        if conn['audio_buffer'] and current_time - conn['last_update'] >= UPDATE_INTERVAL:
-            try:
-                # Calculate smoothed audio level
-                audio_level = sum(conn['audio_buffer']) / len(conn['audio_buffer'])
-                conn['current_level'] = audio_level
-                
-                # Create visual bar
-                bar_length = 20
-                filled = int(audio_level * bar_length)
-                bar = "█" * filled + "░" * (bar_length - filled)
-                
-                # Get speaking users
-                speaking_users = conn['speaking_users']
-                speaking_text = "No one is speaking"
-                if speaking_users:
-                    # Get member objects for each speaking user
-                    guild = bot.get_guild(guild_id)
-                    speaking_members = []
-                    for user_id in speaking_users:
-                        member = guild.get_member(user_id)
-                        if member:
-                            speaking_members.append(member.display_name)
-                    speaking_text = f"{SPEAKING_EMOJI} Speaking: {', '.join(speaking_members)}"
-                
-                # Create new status text
-                status_text = f"{LISTENING_EMOJI} Listening... (Audio levels: {audio_level:.1%})\n{bar}\n{speaking_text}"
-                
-                # Only update if the text has changed
-                if status_text != conn['last_status_text']:
-                    try:
-                        await conn['status_message'].edit(content=status_text)
-                        conn['last_status_text'] = status_text
-                    except discord.NotFound:
-                        # Message was deleted, create a new one
-                        channel = conn['vc'].channel
-                        if channel:
-                            status_msg = await channel.send(status_text)
-                            await status_msg.pin()
-                            conn['status_message'] = status_msg
-                            conn['last_status_text'] = status_text
-                    except discord.HTTPException as e:
-                        if e.code == 429:  # Rate limit error
-                            print(f"Rate limited, waiting {e.retry_after} seconds")
-                            await asyncio.sleep(e.retry_after)
-                        else:
-                            print(f"Error updating status message: {e}")
-                
-                # Clear buffer and update timestamp
-                conn['audio_buffer'].clear()
-                conn['last_update'] = current_time
-            except Exception as e:
-                print(f"Error updating status: {e}")
-                # If there's an error, try to recreate the status message
-                try:
-                    channel = conn['vc'].channel
-                    if channel:
-                        status_msg = await channel.send(f"{LISTENING_EMOJI} Listening... (Audio levels: 0%)\nNo one is speaking")
-                        await status_msg.pin()
-                        conn['status_message'] = status_msg
-                except Exception as e2:
-                    print(f"Error recreating status message: {e2}")
+    # Get speaking users
+    speaking_users = conn['speaking_users']
+    speaking_text = "No one is speaking"
+    if speaking_users:
+        # Get member objects for each speaking user
+        guild = bot.get_guild(guild_id)
+        speaking_members = []
+        for user_id in speaking_users:
+            member = guild.get_member(user_id) if guild else None
+            if member:
+                speaking_members.append(member.display_name)
+        speaking_text = f"{SPEAKING_EMOJI} Speaking: {', '.join(speaking_members)}"
+    
+    return f"{LISTENING_EMOJI} Listening... (Audio levels: {audio_level:.1%})\n{bar}\n{speaking_text}"
+
+def refresh_status(guild_id: int, urgent: bool = False):
+    """Queue a status update for a guild, the scheduler decides when it is sent"""
+    conn = active_connections.get(guild_id)
+    if conn is not None and not conn['stopping']:
+        status_scheduler.submit(guild_id, status_text(guild_id, conn), urgent=urgent)
+
+async def push_status(guild_id: int, text: str):
+    """Show `text` in the guild's status message, recreating the message if needed"""
+    conn = active_connections.get(guild_id)
+    if conn is None:
+        return
+    
+    if conn['status_message']:
+        try:
+            await conn['status_message'].edit(content=text)
+            return
+        except discord.NotFound:
+            # Message was deleted, create a new one below
+            conn['status_message'] = None
+    
+    channel = conn['vc'].channel
+    if channel:
+        status_msg = await channel.send(text)
+        await status_msg.pin()
+        conn['status_message'] = status_msg
+
+# Pushes status edits per guild, with its own rate limiting so one guild never waits on another
+status_scheduler = StatusScheduler(push_status, interval=UPDATE_INTERVAL)
+
+@tasks.loop(minutes=max(ARCHIVE_INTERVAL, 1))
+async def archive_loop():
+    """Background task compressing one batch of old recordings at a time"""
+    stats = await archiver.run_batch()
+    if stats['compressed'] or stats['failed']:
+        print(f"Archived {stats['compressed']} recordings ({stats['saved'] / 1024 / 1024:.1f} MB saved), "
+              f"{stats['failed']} failed, {stats['remaining']} left")
+
+async def export_telemetry(conn: dict):
+    """Append the network counters since the last export to the recording's telemetry file"""
+    # Taking the snapshot waits on the packet router's lock, so keep it off the event loop too
+    snapshot = await run_io(conn['vc'].get_telemetry, reset=True)
+    if snapshot and snapshot['streams']:
+        try:
+            await run_io(append_json_line, conn['telemetry_file'], snapshot)
+        except OSError as e:
+            print(f"Error writing telemetry to {conn['telemetry_file']}: {e}")
+
+@tasks.loop(seconds=max(TELEMETRY_INTERVAL, 1))
+async def telemetry_loop():
+    """Background task exporting per-speaker loss and jitter, to match against bad transcripts"""
+    for conn in list(active_connections.values()):
+        await export_telemetry(conn)
+
+@tasks.loop(seconds=UPDATE_INTERVAL)
+async def update_status_loop():
+    """Background task to sample audio levels, sending is left to the status scheduler"""
+    for guild_id, conn in list(active_connections.items()):
+        if conn['stopping']:
+            continue  # The status message is gone, !leave is saving the recording
+        levels = conn['meter'].snapshot()
+        if levels:
+            # Audio level over everything received since the last update
+            conn['current_level'] = levels['level']
+            conn['last_audio_time'] = datetime.now()
+            refresh_status(guild_id)
 
 @bot.command(name='transcript')
 async def transcript(ctx):
@@ -283,9 +424,14 @@ async def leave(ctx):
     if ctx.voice_client:
         if ctx.guild.id in active_connections:
             conn = active_connections[ctx.guild.id]
-            # Stop recording before processing
-            if hasattr(conn['vc'].sink, 'stop_recording'):
-                conn['vc'].sink.stop_recording()
+            # Write out the audio the mixer is still holding back, then stop recording before processing
+            await run_io(conn['mixer'].flush)
+            conn['sink'].stop_recording()
+            conn['meter'].stop_recording()
+            if TELEMETRY_INTERVAL > 0:
+                await export_telemetry(conn)
+            conn['stopping'] = True
+            status_scheduler.remove(ctx.guild.id)
             
             if conn['status_message']:
                 try:
@@ -308,29 +454,15 @@ async def save_audio(ctx):
         return
     
     conn = active_connections[ctx.guild.id]
-    audio_data = conn['audio_data']
+    recorder = conn['recorder']
     
-    if not audio_data:
+    if not recorder.has_audio:
         return
     
-    # Create guild-specific directory
-    guild_dir = RECORDINGS_DIR / str(ctx.guild.id)
-    guild_dir.mkdir(exist_ok=True)
-    
-    # Generate filename with timestamp and guild name
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    safe_guild_name = "".join(c for c in ctx.guild.name if c.isalnum() or c in (' ', '-', '_')).strip()
-    filename = f"{timestamp}_{safe_guild_name}.wav"
-    filepath = guild_dir / filename
-    
-    # Create a WAV file from the audio data
-    with wave.open(str(filepath), 'wb') as wav_file:
-        wav_file.setnchannels(2)  # Stereo
-        wav_file.setsampwidth(2)  # 16-bit
-        wav_file.setframerate(48000)  # Discord's sample rate
-        
-        for audio in audio_data:
-            wav_file.writeframes(audio)
+    # Frames are already journaled, just flush the tail and patch the current segment's header
+    file_size = await run_io(recorder.checkpoint)
+    filepath = recorder.filepath
+    end_time = datetime.now()
     
     # Create metadata file with recording information
     metadata = {
@@ -338,31 +470,62 @@ async def save_audio(ctx):
         'guild_id': ctx.guild.id,
         'channel_name': ctx.voice_client.channel.name,
         'start_time': conn['start_time'].isoformat(),
-        'end_time': datetime.now().isoformat(),
-        'duration': str(datetime.now() - conn['start_time']),
+        'end_time': end_time.isoformat(),
+        'duration': str(end_time - conn['start_time']),
         'file_path': str(filepath)
     }
     
-    metadata_file = guild_dir / f"{timestamp}_{safe_guild_name}_metadata.txt"
-    with open(metadata_file, 'w', encoding='utf-8') as f:
-        # Write metadata
-        for key, value in metadata.items():
-            f.write(f"{key}: {value}\n")
+    metadata_file = conn['metadata_file']
+    entry = catalog_entry(ctx, conn, metadata_file, end_time, file_size)
+    await run_io(save_recording_info, metadata_file, metadata, entry)
     
     print(f"Saved audio to {filepath}")
     print(f"Saved metadata to {metadata_file}")
     
     return filepath, metadata_file
 
+def catalog_entry(ctx, conn, metadata_file, end_time: datetime, file_size: int, status: str = None) -> dict:
+    """Build the catalog fields for the guild's current recording"""
+    entry = {
+        'file_path': conn['recorder'].filepath,
+        'metadata_path': metadata_file,
+        'guild_id': ctx.guild.id,
+        'guild_name': ctx.guild.name,
+        'channel_id': ctx.voice_client.channel.id,
+        'channel_name': ctx.voice_client.channel.name,
+        'start_time': conn['start_time'].isoformat(),
+        'end_time': end_time.isoformat(),
+        'duration': (end_time - conn['start_time']).total_seconds(),
+        'file_size': file_size
+    }
+    if status is not None:
+        entry['transcript_status'] = status
+    return entry
+
+def save_recording_info(metadata_file, metadata: dict, entry: dict, transcription: Transcript = None):
+    """Write the metadata file and structured transcript and update the catalog in one I/O job"""
+    if transcription is not None:
+        transcription.save(transcript_path(entry['file_path']))
+    write_metadata(metadata_file, metadata, transcription.plain_text if transcription is not None else None)
+    catalog.upsert(**entry)
+
+def transcript_path(filepath) -> pathlib.Path:
+    """Where the structured transcript of a recording is stored"""
+    filepath = pathlib.Path(filepath)
+    return filepath.with_name(f"{filepath.stem}_transcript.jsonl")
+
+def read_file_base64(path) -> str:
+    """Read a recording as a single WAV file and return it base64 encoded"""
+    return base64.b64encode(read_recording(path)).decode('utf-8')
+
 async def store_transcription_in_supabase(guild_id: int, guild_name: str, channel_name: str, 
                                         start_time: datetime, end_time: datetime, 
                                         transcription: str, audio_file_path: str,
                                         user_id: int, user_name: str):
     """Store transcription data in Supabase"""
     try:
-        # Convert file to base64
-        with open(audio_file_path, 'rb') as file:
-            audio_base64 = base64.b64encode(file.read()).decode('utf-8')
+        # Convert file to base64 on the I/O executor
+        audio_base64 = await run_io(read_file_base64, audio_file_path)
         
         # Prepare data for Supabase
         data = {
@@ -378,8 +541,8 @@ async def store_transcription_in_supabase(guild_id: int, guild_name: str, channe
             'user_name': user_name
         }
         
-        # Insert data into Supabase
-        result = supabase.table('transcriptions').insert(data).execute()
+        # Insert data into Supabase, the client is blocking so keep it off the event loop
+        result = await run_io(supabase.table('transcriptions').insert(data).execute)
         return result.data[0] if result.data else None
         
     except Exception as e:
@@ -392,45 +555,69 @@ async def save_transcript(ctx):
         return
     
     conn = active_connections[ctx.guild.id]
-    audio_data = conn['audio_data']
+    recorder = conn['recorder']
     
-    if not audio_data:
+    if not recorder.has_audio:
+        await run_io(recorder.discard)
         await ctx.send("No audio data to transcribe!")
         return
     
-    await ctx.send(f"{PROCESSING_EMOJI} Processing audio...")
-    
-    # Create guild-specific directory
-    guild_dir = RECORDINGS_DIR / str(ctx.guild.id)
-    guild_dir.mkdir(exist_ok=True)
+    progress = ProgressMessage(ctx.channel, PROCESSING_EMOJI)
+    await progress.update("Processing audio...")
     
-    # Generate filename with timestamp and guild name
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    safe_guild_name = "".join(c for c in ctx.guild.name if c.isalnum() or c in (' ', '-', '_')).strip()
-    filename = f"{timestamp}_{safe_guild_name}.wav"
-    filepath = guild_dir / filename
+    filepath = recorder.filepath
     
     try:
-        # Create a WAV file from the audio data
-        with wave.open(str(filepath), 'wb') as wav_file:
-            wav_file.setnchannels(2)  # Stereo
-            wav_file.setsampwidth(2)  # 16-bit
-            wav_file.setframerate(48000)  # Discord's sample rate
-            
-            # Write all audio data
-            for audio in audio_data:
-                wav_file.writeframes(audio)
+        # Finish the recording journal and speaker tracks on the I/O executor
+        file_size = await run_io(recorder.close)
+        await progress.update("Finalizing speaker tracks...")
+        track_sink = conn['track_sink']
+        await run_io(track_sink.cleanup)
         
         # Print file size for debugging
-        file_size = os.path.getsize(filepath)
         print(f"Audio file size: {file_size / 1024:.2f} KB")
         
-        await ctx.send(f"{PROCESSING_EMOJI} Transcribing audio...")
+        # List the recording in the catalog while it is being transcribed
+        entry = catalog_entry(ctx, conn, conn['metadata_file'], datetime.now(), file_size, TRANSCRIPT_PENDING)
+        await run_io(catalog.upsert, **entry)
+        
+        # Most of the meeting was transcribed live, only the last utterances are left
+        await progress.update("Transcribing the last utterances...")
+        live = conn['live']
+        await live.flush()
+        
+        transcription = None
+        if live.results and not live.failed:
+            transcription = Transcript.from_results(live.results)
+        
+        # Otherwise transcribe every speaker's track in parallel on the process pool
+        jobs = []
+        for track in track_sink.tracks:
+            if not track.frames:
+                continue
+            member = ctx.guild.get_member(track.user_id) if track.user_id else None
+            jobs.append({
+                'path': track.path,
+                'offset': track.start_offset,
+                'speaker': member.display_name if member else f"Speaker {track.ssrc}"
+            })
+        
+        async def report_tracks(done, total):
+            await progress.update(f"Transcribing audio... ({done}/{total} speakers done)")
+        
+        if not transcription and jobs:
+            await report_tracks(0, len(jobs))
+            results = await process_tracks(jobs, transcription_service, progress=report_tracks)
+            if results:
+                transcription = Transcript.from_results(results)
         
-        # Transcribe the audio using the generated WAV file
-        transcription = await transcribe_audio(str(filepath))
+        # Fall back to transcribing the mixed WAV file
+        if not transcription:
+            await progress.update("Transcribing audio...")
+            transcription = await transcribe_audio(str(filepath))
         
         if not transcription:
+            await run_io(catalog.set_status, filepath, TRANSCRIPT_FAILED)
             await ctx.send("❌ Failed to transcribe audio!")
             return
         
@@ -441,7 +628,7 @@ async def save_transcript(ctx):
             channel_name=ctx.voice_client.channel.name,
             start_time=conn['start_time'],
             end_time=datetime.now(),
-            transcription=transcription,
+            transcription=transcription.plain_text,
             audio_file_path=str(filepath),
             user_id=ctx.author.id,
             user_name=ctx.author.name
@@ -455,27 +642,24 @@ async def save_transcript(ctx):
             await ctx.send("⚠️ Failed to save transcription to database.")
         
         # Create metadata file with recording information
+        end_time = datetime.now()
         metadata = {
             'guild_name': ctx.guild.name,
             'guild_id': ctx.guild.id,
             'channel_name': ctx.voice_client.channel.name,
             'start_time': conn['start_time'].isoformat(),
-            'end_time': datetime.now().isoformat(),
-            'duration': str(datetime.now() - conn['start_time']),
+            'end_time': end_time.isoformat(),
+            'duration': str(end_time - conn['start_time']),
             'file_path': str(filepath),
             'file_size': f"{file_size / 1024:.2f} KB",
             'user_id': ctx.author.id,
             'user_name': ctx.author.name
         }
         
-        metadata_file = guild_dir / f"{timestamp}_{safe_guild_name}_metadata.txt"
-        with open(metadata_file, 'w', encoding='utf-8') as f:
-            # Write metadata
-            for key, value in metadata.items():
-                f.write(f"{key}: {value}\n")
-            
-            # Write transcription
-            f.write(f"\n{transcription}\n")
+        # Write metadata followed by the transcription, and mark it done in the catalog
+        metadata_file = conn['metadata_file']
+        entry = catalog_entry(ctx, conn, metadata_file, end_time, file_size, TRANSCRIPT_DONE)
+        await run_io(save_recording_info, metadata_file, metadata, entry, transcription)
         
         print(f"Saved audio to {filepath}")
         print(f"Saved metadata to {metadata_file}")
@@ -485,6 +669,10 @@ async def save_transcript(ctx):
         
     except Exception as e:
         print(f"Error in save_transcript: {e}")
+        try:
+            await run_io(catalog.set_status, filepath, TRANSCRIPT_FAILED)
+        except Exception as e2:
+            print(f"Error updating catalog: {e2}")
         await ctx.send(f"❌ Error saving transcript: {str(e)}")
         return None
 
@@ -495,47 +683,20 @@ async def transcribe_audio(filepath):
         absolute_path = os.path.abspath(filepath)
         print(f"Transcribing audio file: {absolute_path}")
         
-        # Open the audio file
-        with open(absolute_path, "rb") as file:
-            # Create a transcription of the audio file
-            transcription = groq_client.audio.transcriptions.create(
-                file=(absolute_path, file.read()),
-                model="whisper-large-v3-turbo",
-                response_format="verbose_json"
-            )
-            
-            # Convert the transcription to a formatted string
-            formatted_transcript = "=== TRANSCRIPTION ===\n\n"
-            
-            # Add the full text if available
-            if hasattr(transcription, 'text'):
-                formatted_transcript += f"Full Text:\n{transcription.text}\n\n"
-            
-            # Add segments with timestamps if available
-            if hasattr(transcription, 'segments'):
-                formatted_transcript += "Segments:\n"
-                for segment in transcription.segments:
-                    if hasattr(segment, 'start') and hasattr(segment, 'end') and hasattr(segment, 'text'):
-                        start_time = segment.start
-                        end_time = segment.end
-                        text = segment.text
-                        formatted_transcript += f"[{start_time:.2f}s - {end_time:.2f}s] {text}\n"
-            
-            # Add word-level timestamps if available
-            if hasattr(transcription, 'words'):
-                formatted_transcript += "\nWord-level Timestamps:\n"
-                for word in transcription.words:
-                    if hasattr(word, 'start') and hasattr(word, 'end') and hasattr(word, 'text'):
-                        start_time = word.start
-                        end_time = word.end
-                        text = word.text
-                        formatted_transcript += f"[{start_time:.2f}s - {end_time:.2f}s] {text}\n"
-            
-            return formatted_transcript
+        # Downmix to 16 kHz mono, cut long silences and split into chunks on the process pool
+        loop = asyncio.get_running_loop()
+        prepared = await loop.run_in_executor(get_executor(), prepare_recording, absolute_path)
+        
+        # Transcribe the chunks concurrently and stitch them back onto the recording's timeline
+        transcription = await transcribe_upload(prepared, transcription_service)
+        
+        # Keep the result structured, text is rendered when it is stored
+        return Transcript.from_transcription(transcription)
             
     except Exception as e:
-        print(f"Error during transcription: {e}")
+        print(f"Error during transcription: {e!r}")
         return None
 
-# Run the bot
-bot.run(os.getenv('DISCORD_TOKEN')) 
\ No newline at end of file
+# Run the bot (guarded so process pool workers can import this module safely)
+if __name__ == '__main__':
+    bot.run(os.getenv('DISCORD_TOKEN'))
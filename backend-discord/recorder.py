@@ -0,0 +1,414 @@
+import os
+import json
+import queue
+import shutil
+import struct
+import threading
+import pathlib
+from datetime import datetime
+
+# Discord's PCM format: 48 kHz, stereo, 16-bit
+CHANNELS = 2
+SAMPLE_WIDTH = 2
+SAMPLE_RATE = 48000
+
+# Frames are batched in memory until this many bytes are pending (~5.5 s of audio)
+FLUSH_SIZE = 1024 * 1024
+# Maximum number of full batches waiting for the writer thread
+MAX_PENDING_BATCHES = 8
+# Seconds of audio per journal segment file
+SEGMENT_SECONDS = float(os.getenv('SEGMENT_SECONDS', 60))
+# When journal data is fsynced: 'always' (every batch), 'segment' (every finished segment
+# and checkpoint) or 'never' (left to the OS)
+FSYNC_POLICY = os.getenv('FSYNC_POLICY', 'segment')
+
+JOURNAL_SUFFIX = '.journal'
+MANIFEST_NAME = 'manifest.jsonl'
+JOURNAL_VERSION = 1
+
+WAV_HEADER_SIZE = 44
+_wav_header = struct.Struct('<4sI4s4sIHHIIHH4sI')
+_BLOCK_ALIGN = CHANNELS * SAMPLE_WIDTH
+
+
+def wav_header(data_size: int, channels: int = CHANNELS, sample_width: int = SAMPLE_WIDTH,
+               sample_rate: int = SAMPLE_RATE) -> bytes:
+    """Build a canonical 44 byte PCM WAV header for `data_size` bytes of audio"""
+    block_align = channels * sample_width
+    return _wav_header.pack(
+        b'RIFF', 36 + data_size, b'WAVE',
+        b'fmt ', 16, 1, channels, sample_rate, sample_rate * block_align, block_align, sample_width * 8,
+        b'data', data_size
+    )
+
+
+def _fsync_dir(path: pathlib.Path):
+    # Makes new directory entries durable, not supported everywhere
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class _Segment:
+    __slots__ = ('index', 'path', 'file', 'data_size')
+
+    def __init__(self, index: int, path: pathlib.Path):
+        self.index = index
+        self.path = path
+        self.file = open(path, 'wb')
+        self.file.write(wav_header(0))
+        self.data_size = 0
+
+    def patch_header(self):
+        self.file.seek(0)
+        self.file.write(wav_header(self.data_size))
+        self.file.seek(0, os.SEEK_END)
+        self.file.flush()
+
+
+class SegmentedRecorder:
+    """Streams PCM frames into a crash-safe journal of fixed-length WAV segments.
+
+    The recording is a `<name>.journal` directory holding numbered segment
+    files of SEGMENT_SECONDS each and an append-only manifest. `write()` is
+    called from the packet router thread and only appends to an in-memory
+    batch; a background writer thread writes batches out, finishes segments
+    and appends them to the manifest, fsyncing according to `fsync`.
+
+    If the process dies mid-meeting at most the unflushed batches are lost,
+    and `recover_journal()` finishes the journal on the next start.
+    `close()` only completes the last segment and appends a close record.
+    """
+
+    def __init__(self, filepath, *, metadata: dict = None, segment_seconds: float = SEGMENT_SECONDS,
+                 fsync: str = FSYNC_POLICY, flush_size: int = FLUSH_SIZE, max_pending: int = MAX_PENDING_BATCHES):
+        if fsync not in ('always', 'segment', 'never'):
+            raise ValueError(f"Unknown fsync policy {fsync!r}")
+
+        self.filepath = pathlib.Path(filepath)
+        self.flush_size = flush_size
+        self.fsync = fsync
+        self.segment_size = int(segment_seconds * SAMPLE_RATE) * _BLOCK_ALIGN
+
+        self.frames = 0  # Frames accepted by write(), including ones not yet on disk
+        self.data_size = 0  # PCM bytes written to disk by the writer thread
+        self.segments = 0  # Segments finished and listed in the manifest
+        self.error = None  # Last error raised by the writer thread
+        self.closed = False
+
+        self._batch = bytearray()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_pending)
+
+        self.filepath.mkdir(parents=True)
+        self._manifest = open(self.filepath / MANIFEST_NAME, 'a', encoding='utf-8')
+        self._append_manifest({
+            'type': 'session',
+            'version': JOURNAL_VERSION,
+            'sample_rate': SAMPLE_RATE,
+            'channels': CHANNELS,
+            'sample_width': SAMPLE_WIDTH,
+            'created': datetime.now().isoformat(),
+            'metadata': metadata or {}
+        }, sync=fsync != 'never')
+        if fsync != 'never':
+            _fsync_dir(self.filepath.parent)
+
+        self._segment = None
+
+        self._writer = threading.Thread(
+            target=self._run, daemon=True, name=f'recorder-writer-{id(self):x}'
+        )
+        self._writer.start()
+
+    @property
+    def has_audio(self) -> bool:
+        return self.frames > 0
+
+    @property
+    def file_size(self) -> int:
+        """Size of the recording as a single WAV file"""
+        return WAV_HEADER_SIZE + self.data_size
+
+    @property
+    def duration(self) -> float:
+        """Seconds of audio written to disk"""
+        return self.data_size / (_BLOCK_ALIGN * SAMPLE_RATE)
+
+    def write(self, pcm: bytes):
+        """Queue a PCM frame for writing"""
+        with self._lock:
+            if self.closed:
+                return
+
+            self._batch += pcm
+            self.frames += 1
+
+            if len(self._batch) >= self.flush_size:
+                # Blocks the caller if the writer is behind, which keeps memory bounded
+                self._queue.put(bytes(self._batch))
+                self._batch.clear()
+
+    def checkpoint(self) -> int:
+        """Flush pending frames to disk and make the current segment a valid WAV. Blocks until done.
+
+        Returns the size of the recording in bytes.
+        """
+        if self.closed:
+            return self.file_size
+
+        done = threading.Event()
+        with self._lock:
+            self._flush_batch()
+            self._queue.put(done)
+        done.wait()
+
+        if self.error:
+            raise self.error
+
+        return self.file_size
+
+    def close(self) -> int:
+        """Flush pending frames, finish the last segment and close the manifest.
+
+        Returns the size of the recording in bytes.
+        """
+        if self.closed:
+            return self.file_size
+
+        with self._lock:
+            self.closed = True
+            self._flush_batch()
+            self._queue.put(None)
+
+        self._writer.join()
+
+        if self.error:
+            raise self.error
+
+        return self.file_size
+
+    def discard(self):
+        """Close the recorder and delete its journal"""
+        try:
+            self.close()
+        finally:
+            shutil.rmtree(self.filepath, ignore_errors=True)
+
+    def _flush_batch(self):
+        # Must be called with the lock held
+        if self._batch:
+            self._queue.put(bytes(self._batch))
+            self._batch.clear()
+
+    def _append_manifest(self, record: dict, sync: bool):
+        self._manifest.write(json.dumps(record) + "\n")
+        self._manifest.flush()
+        if sync:
+            os.fsync(self._manifest.fileno())
+
+    def _write_data(self, data: bytes):
+        view = memoryview(data)
+        while view:
+            if self._segment is None:
+                path = self.filepath / f"{self.segments:06d}.wav"
+                self._segment = _Segment(self.segments, path)
+
+            n = min(len(view), self.segment_size - self._segment.data_size)
+            self._segment.file.write(view[:n])
+            self._segment.data_size += n
+            self.data_size += n
+            view = view[n:]
+
+            if self._segment.data_size >= self.segment_size:
+                self._finish_segment()
+
+        if self.fsync == 'always' and self._segment is not None:
+            self._segment.file.flush()
+            os.fsync(self._segment.file.fileno())
+
+    def _finish_segment(self):
+        segment, self._segment = self._segment, None
+        try:
+            segment.patch_header()
+            if self.fsync != 'never':
+                os.fsync(segment.file.fileno())
+        finally:
+            segment.file.close()
+
+        self._append_manifest({
+            'type': 'segment', 'index': segment.index, 'file': segment.path.name, 'data_size': segment.data_size
+        }, sync=self.fsync != 'never')
+        self.segments += 1
+
+    def _checkpoint_segment(self):
+        if self._segment is not None:
+            self._segment.patch_header()
+            if self.fsync != 'never':
+                os.fsync(self._segment.file.fileno())
+
+    def _run(self):
+        try:
+            while True:
+                item = self._queue.get()
+
+                if item is None:
+                    if self._segment is not None:
+                        self._finish_segment()
+                    self._append_manifest({
+                        'type': 'close', 'segments': self.segments, 'data_size': self.data_size,
+                        'closed': datetime.now().isoformat()
+                    }, sync=self.fsync != 'never')
+                    return
+
+                if isinstance(item, threading.Event):
+                    try:
+                        self._checkpoint_segment()
+                    finally:
+                        item.set()
+                    continue
+
+                self._write_data(item)
+        except Exception as e:
+            print(f"Error in recorder writer for {self.filepath}: {e}")
+            self.error = e
+            # Keep draining so writers and checkpoints never block forever
+            while True:
+                item = self._queue.get()
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif item is None:
+                    return
+        finally:
+            if self._segment is not None:
+                self._segment.file.close()
+            self._manifest.close()
+
+
+def _read_manifest(path):
+    records = []
+    valid = 0  # Bytes of complete, parseable lines
+    with open(pathlib.Path(path) / MANIFEST_NAME, 'rb') as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+            valid += len(line)
+    return records, valid
+
+
+def read_manifest(path) -> list:
+    """Read a journal's manifest records, ignoring a torn last line"""
+    return _read_manifest(path)[0]
+
+
+def segment_paths(path) -> list:
+    """The WAV files that make up a recording, in order.
+
+    Accepts a journal directory or a plain WAV file from before journals existed.
+    """
+    path = pathlib.Path(path)
+    if not path.is_dir():
+        return [path]
+    return sorted(p for p in path.iterdir() if p.suffix == '.wav' and p.stem.isdigit())
+
+
+def recording_size(path) -> int:
+    """Size of a recording as a single WAV file"""
+    return WAV_HEADER_SIZE + sum(p.stat().st_size - WAV_HEADER_SIZE for p in segment_paths(path))
+
+
+def iter_pcm(path, block_size: int = FLUSH_SIZE):
+    """Yield the raw PCM of a recording in blocks, across all of its segments"""
+    for segment in segment_paths(path):
+        with open(segment, 'rb') as f:
+            f.seek(WAV_HEADER_SIZE)
+            while True:
+                block = f.read(block_size)
+                if not block:
+                    break
+                yield block
+
+
+def read_recording(path) -> bytes:
+    """Return a recording as the bytes of one WAV file"""
+    data = b"".join(iter_pcm(path))
+    return wav_header(len(data)) + data
+
+
+def recover_journal(path):
+    """Finish a journal left open by a crash.
+
+    Trailing segments are given correct WAV headers and added to the
+    manifest, followed by a close record. Returns the session record with the
+    recovered duration and size, or None if the journal was already closed.
+    """
+    path = pathlib.Path(path)
+    records, valid = _read_manifest(path)
+    if not records or records[0].get('type') != 'session':
+        raise ValueError(f"{path} has no session record")
+    if any(record['type'] == 'close' for record in records):
+        return None
+
+    listed = {record['file'] for record in records if record['type'] == 'segment'}
+    segments = segment_paths(path)
+    data_size = 0
+
+    with open(path / MANIFEST_NAME, 'r+b') as manifest:
+        # Drop a torn last line before appending
+        manifest.truncate(valid)
+        manifest.seek(valid)
+
+        for index, segment in enumerate(segments):
+            size = max(0, segment.stat().st_size - WAV_HEADER_SIZE) // _BLOCK_ALIGN * _BLOCK_ALIGN
+            data_size += size
+            if segment.name in listed:
+                continue
+
+            with open(segment, 'r+b') as f:
+                f.truncate(WAV_HEADER_SIZE + size)
+                f.seek(0)
+                f.write(wav_header(size))
+                f.flush()
+                os.fsync(f.fileno())
+            record = {'type': 'segment', 'index': index, 'file': segment.name, 'data_size': size}
+            manifest.write((json.dumps(record) + "\n").encode())
+
+        record = {
+            'type': 'close', 'segments': len(segments), 'data_size': data_size,
+            'closed': datetime.now().isoformat(), 'recovered': True
+        }
+        manifest.write((json.dumps(record) + "\n").encode())
+        manifest.flush()
+        os.fsync(manifest.fileno())
+
+    return {
+        **records[0],
+        'path': path,
+        'data_size': data_size,
+        'file_size': WAV_HEADER_SIZE + data_size,
+        'duration': data_size / (_BLOCK_ALIGN * SAMPLE_RATE)
+    }
+
+
+def find_unfinished_journals(directory) -> list:
+    """Journals under `directory` (one level of guild folders) whose manifest was never closed"""
+    unfinished = []
+    for path in sorted(pathlib.Path(directory).glob(f'*/*{JOURNAL_SUFFIX}')):
+        try:
+            records = read_manifest(path)
+        except OSError:
+            continue
+        if not any(record.get('type') == 'close' for record in records):
+            unfinished.append(path)
+    return unfinished
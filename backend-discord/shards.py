@@ -0,0 +1,175 @@
+"""Run the bot as several processes, each owning a subset of the gateway shards.
+
+Discord routes every guild's events to one shard, (guild_id >> 22) % shard_count,
+so each recording session lives entirely inside the process that owns its
+guild's shard, together with that process's recorder threads, process pool and
+transcription slots. Nothing about a session crosses processes.
+
+The supervisor keeps one pipe per worker as a control channel. Workers report
+their load every STATS_INTERVAL seconds, the supervisor restarts workers that
+die and asks all of them to shut down cleanly on SIGINT/SIGTERM.
+
+    SHARD_PROCESSES=4 SHARD_COUNT=16 python shards.py
+"""
+import os
+import time
+import asyncio
+import signal
+import threading
+import multiprocessing
+from multiprocessing.connection import wait
+
+# Worker processes to run, each gets every SHARD_PROCESSES-th shard
+SHARD_PROCESSES = int(os.getenv('SHARD_PROCESSES', os.cpu_count() or 1))
+# Total shards, defaults to one per process
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', SHARD_PROCESSES))
+# Seconds between worker load reports
+STATS_INTERVAL = 30.0
+# Seconds to wait before restarting a worker that died
+RESTART_DELAY = 5.0
+# Seconds a worker gets to close its voice connections when asked to stop
+STOP_TIMEOUT = 30.0
+
+
+def _control_thread(conn, bot, active_connections, transcription_service):
+    """Answer the supervisor from inside a worker process"""
+    shard_ids = os.getenv('SHARD_IDS')
+    while True:
+        try:
+            if conn.poll(STATS_INTERVAL):
+                message = conn.recv()
+                if message['type'] == 'stop':
+                    asyncio.run_coroutine_threadsafe(bot.close(), bot.loop)
+                    return
+                continue
+
+            conn.send({
+                'type': 'stats',
+                'shards': shard_ids,
+                'guilds': len(bot.guilds),
+                'sessions': len(active_connections),
+                'transcriptions_active': transcription_service.active,
+                'transcriptions_queued': transcription_service.queued
+            })
+        except (EOFError, OSError):
+            # The supervisor is gone, keep serving on our own
+            return
+
+
+def _worker(shard_ids: list, shard_count: int, conn):
+    # main reads the shard configuration when it creates the bot
+    os.environ['SHARD_COUNT'] = str(shard_count)
+    os.environ['SHARD_IDS'] = ",".join(str(shard_id) for shard_id in shard_ids)
+
+    # The supervisor decides when workers stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    import main
+
+    def terminate(signum, frame):
+        # Killed directly (systemd, docker stop): close the bot the same way the supervisor's stop does
+        if not isinstance(main.bot.loop, asyncio.AbstractEventLoop):
+            raise SystemExit(0)  # The bot hasn't started yet, there is nothing to close
+        asyncio.run_coroutine_threadsafe(main.bot.close(), main.bot.loop)
+
+    signal.signal(signal.SIGTERM, terminate)
+
+    @main.bot.listen('on_ready')
+    async def start_control_channel():
+        if not any(t.name == 'shard-control' for t in threading.enumerate()):
+            threading.Thread(
+                target=_control_thread,
+                args=(conn, main.bot, main.active_connections, main.transcription_service),
+                name='shard-control',
+                daemon=True
+            ).start()
+
+    main.bot.run(os.getenv('DISCORD_TOKEN'))
+
+
+class Supervisor:
+    """Starts the shard workers, restarts the ones that die and stops them all on request"""
+
+    def __init__(self, processes: int = SHARD_PROCESSES, shard_count: int = SHARD_COUNT):
+        if shard_count < processes:
+            raise ValueError(f"{processes} processes need at least as many shards, got {shard_count}")
+
+        self.assignments = [list(range(i, shard_count, processes)) for i in range(processes)]
+        self.shard_count = shard_count
+        self._context = multiprocessing.get_context('spawn')
+        self._workers = {}  # {index: (process, conn)}
+        self._stopping = False
+
+    def _start(self, index: int):
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker,
+            args=(self.assignments[index], self.shard_count, child_conn),
+            name=f"shard-worker-{index}"
+        )
+        process.start()
+        child_conn.close()
+        self._workers[index] = (process, parent_conn)
+        print(f"Started worker {index} (pid {process.pid}) for shards {self.assignments[index]}")
+
+    def stop(self, *args):
+        self._stopping = True
+        for process, conn in self._workers.values():
+            try:
+                conn.send({'type': 'stop'})
+            except OSError:
+                pass
+
+    def run(self):
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+        for index in range(len(self.assignments)):
+            self._start(index)
+
+        restart_at = {}  # {index: monotonic time}
+        stop_deadline = None
+        while self._workers or (restart_at and not self._stopping):
+            if self._stopping and stop_deadline is None:
+                stop_deadline = time.monotonic() + STOP_TIMEOUT
+            if stop_deadline is not None and time.monotonic() > stop_deadline:
+                for process, conn in self._workers.values():
+                    process.terminate()
+
+            handles = {}
+            for index, (process, conn) in self._workers.items():
+                handles[process.sentinel] = index
+                handles[conn] = index
+
+            for handle in wait(list(handles), timeout=1.0):
+                index = handles[handle]
+                if index not in self._workers:
+                    continue
+                process, conn = self._workers[index]
+
+                if handle is conn:
+                    try:
+                        message = conn.recv()
+                    except (EOFError, OSError):
+                        continue
+                    if message['type'] == 'stats':
+                        print(f"Worker {index}: {message}")
+                    continue
+
+                process.join()
+                conn.close()
+                del self._workers[index]
+                if not self._stopping:
+                    print(f"Worker {index} exited with code {process.exitcode}, restarting in {RESTART_DELAY} seconds")
+                    restart_at[index] = time.monotonic() + RESTART_DELAY
+
+            for index, when in list(restart_at.items()):
+                if self._stopping:
+                    restart_at.clear()
+                elif time.monotonic() >= when:
+                    del restart_at[index]
+                    self._start(index)
+
+
+if __name__ == '__main__':
+    Supervisor().run()
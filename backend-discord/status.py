@@ -0,0 +1,150 @@
+import os
+import time
+import asyncio
+
+import discord
+
+# Status message edits allowed per second per guild in the long run
+STATUS_RATE = float(os.getenv('STATUS_RATE', 0.5))
+# Edits a guild may make back to back after being idle
+STATUS_BURST = int(os.getenv('STATUS_BURST', 3))
+
+
+class TokenBucket:
+    """Classic token bucket, refilled continuously at `rate` tokens per second"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def delay(self) -> float:
+        """Seconds until a token is available, 0 if one is available now"""
+        now = time.monotonic()
+        self._refill(now)
+        if self.updated > now:
+            return self.updated - now
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    def take(self):
+        self._refill(time.monotonic())
+        self.tokens -= 1
+
+    def block(self, seconds: float):
+        """Empty the bucket and stop refilling for `seconds`, e.g. after a 429"""
+        self.tokens = 0.0
+        self.updated = max(self.updated, time.monotonic() + seconds)
+
+
+class _GuildStatus:
+    __slots__ = ('bucket', 'pending', 'urgent', 'sent', 'last_sent', 'wake', 'task')
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self.pending = None  # Latest text not yet sent
+        self.urgent = False  # Whether the pending text should skip the update interval
+        self.sent = None  # Text currently shown
+        self.last_sent = 0.0
+        self.wake = asyncio.Event()
+        self.task = None
+
+
+class StatusScheduler:
+    """Pushes each guild's latest status text to Discord without one guild stalling another.
+
+    Every guild has its own worker task and token bucket. `submit()` only
+    replaces the guild's pending text, so a burst of changes turns into a single
+    edit. Level updates are sent at most every `interval` seconds, urgent ones
+    (someone started or stopped speaking) as soon as the bucket allows. A 429
+    only pauses the guild that hit it.
+
+    `send` is a coroutine function called with (guild_id, text) that performs
+    the edit and raises discord.HTTPException on failure.
+    """
+
+    def __init__(self, send, *, interval: float, rate: float = STATUS_RATE, burst: int = STATUS_BURST):
+        self.send = send
+        self.interval = interval
+        self.rate = rate
+        self.burst = burst
+        self._guilds = {}  # {guild_id: _GuildStatus}
+        self._removed = set()  # Guilds whose status is gone, ignored until added again
+
+    def submit(self, guild_id: int, text: str, *, urgent: bool = False):
+        """Queue `text` as the guild's status, replacing anything not yet sent. Call on the event loop
+
+        Does nothing for a guild that was removed and not added again, so late
+        updates cannot bring back a status message that was deleted.
+        """
+        if guild_id in self._removed:
+            return
+
+        state = self._guilds.get(guild_id)
+        if state is None:
+            state = self._guilds[guild_id] = _GuildStatus(TokenBucket(self.rate, self.burst))
+            state.task = asyncio.create_task(self._run(guild_id, state))
+
+        if text == state.sent:
+            state.pending = None
+            return
+        state.pending = text
+        state.urgent = state.urgent or urgent
+        state.wake.set()
+
+    def add(self, guild_id: int):
+        """Accept status updates for a guild again after `remove`"""
+        self._removed.discard(guild_id)
+
+    def remove(self, guild_id: int):
+        """Stop updating a guild's status, dropping anything not yet sent and ignoring later submissions"""
+        self._removed.add(guild_id)
+        state = self._guilds.pop(guild_id, None)
+        if state is not None:
+            state.task.cancel()
+
+    async def _run(self, guild_id: int, state: _GuildStatus):
+        while True:
+            await state.wake.wait()
+            state.wake.clear()
+
+            # Wait for a token, and for the update interval unless the change is urgent.
+            # Newer submissions replace the pending text and may make it urgent meanwhile.
+            while state.pending is not None:
+                delay = state.bucket.delay()
+                if not state.urgent:
+                    delay = max(delay, state.last_sent + self.interval - time.monotonic())
+                if delay <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(state.wake.wait(), delay)
+                    state.wake.clear()
+                except asyncio.TimeoutError:
+                    pass
+
+            if state.pending is None:
+                continue
+
+            text, state.pending, state.urgent = state.pending, None, False
+            state.bucket.take()
+            state.last_sent = time.monotonic()
+            try:
+                await self.send(guild_id, text)
+                state.sent = text
+            except discord.HTTPException as e:
+                if e.status != 429:
+                    print(f"Error updating status message: {e}")
+                    continue
+                retry_after = getattr(e, 'retry_after', None) or self.interval
+                print(f"Status updates for guild {guild_id} rate limited, retrying in {retry_after} seconds")
+                state.bucket.block(retry_after)
+                if state.pending is None:
+                    state.pending = text
+                state.wake.set()
+            except Exception as e:
+                print(f"Error updating status: {e}")
@@ -0,0 +1,58 @@
+import os
+import json
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import discord
+
+# Threads dedicated to recording finalization and other disk I/O
+IO_WORKERS = int(os.getenv('IO_WORKERS', 2))
+
+_io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix='recording-io')
+
+
+async def run_io(func, *args, **kwargs):
+    """Run a blocking disk operation on the recording I/O executor.
+
+    Keeps WAV finalization, metadata writes and file reads off the event loop
+    so heartbeats and other guilds' commands are never stalled by the disk.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_executor, functools.partial(func, *args, **kwargs))
+
+
+def write_metadata(path, metadata: dict, transcription: str = None):
+    """Write a recording's `key: value` metadata file, optionally followed by its transcript"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for key, value in metadata.items():
+            f.write(f"{key}: {value}\n")
+
+        if transcription is not None:
+            f.write(f"\n{transcription}\n")
+
+
+def append_json_line(path, record: dict):
+    """Append `record` to a JSON Lines file"""
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record) + "\n")
+
+
+class ProgressMessage:
+    """Reports finalization progress by editing a single channel message"""
+
+    def __init__(self, channel: discord.abc.Messageable, emoji: str = ""):
+        self.channel = channel
+        self.emoji = emoji
+        self.message = None
+
+    async def update(self, text: str):
+        content = f"{self.emoji} {text}" if self.emoji else text
+        try:
+            if self.message is None:
+                self.message = await self.channel.send(content)
+            else:
+                await self.message.edit(content=content)
+        except discord.HTTPException as e:
+            # Progress is best effort, never fail the recording because of it
+            print(f"Error reporting progress: {e}")
@@ -0,0 +1,179 @@
+import os
+import wave
+import asyncio
+import tempfile
+import pathlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from asr import BLOCK_FRAMES, write_asr_audio, write_asr_blocks, remap_transcription, stitch_chunks
+
+# Number of speaker tracks processed at the same time
+TRACK_WORKERS = int(os.getenv('TRACK_WORKERS', min(4, os.cpu_count() or 1)))
+# Samples quieter than this (on the int16 scale) count as silence when trimming
+SILENCE_THRESHOLD = 500
+
+_executor = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Return the process pool shared by all guilds, creating it on first use"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=TRACK_WORKERS)
+    return _executor
+
+
+def find_loud_span(wav_file: wave.Wave_read, threshold: int = SILENCE_THRESHOLD):
+    """Scan an open 16-bit WAV file block by block for audio louder than `threshold`.
+
+    Returns the (first, end) frame indices around it, or None if the audio is silent.
+    """
+    channels = wav_file.getnchannels()
+    first = end = None
+    position = 0
+    while True:
+        block = wav_file.readframes(BLOCK_FRAMES)
+        if not block:
+            break
+        frames = np.frombuffer(block, dtype=np.int16).reshape(-1, channels)
+        # Widen first, the absolute value of -32768 doesn't fit in int16
+        loud = np.flatnonzero(np.abs(frames.astype(np.int32)).max(axis=1) > threshold)
+        if len(loud):
+            if first is None:
+                first = position + int(loud[0])
+            end = position + int(loud[-1]) + 1
+        position += len(frames)
+
+    return None if first is None else (first, end)
+
+
+def _read_span(wav_file: wave.Wave_read, first: int, end: int):
+    """Yield frames `first` to `end` of an open WAV file as int16 blocks"""
+    frame_size = wav_file.getsampwidth() * wav_file.getnchannels()
+    wav_file.setpos(first)
+    remaining = end - first
+    while remaining > 0:
+        block = wav_file.readframes(min(BLOCK_FRAMES, remaining))
+        if not block:
+            break
+        remaining -= len(block) // frame_size
+        yield np.frombuffer(block, dtype=np.int16)
+
+
+def prepare_track(job: dict):
+    """Trim one speaker's track and convert it to 16 kHz mono for upload. Runs in a worker process.
+
+    `job` holds the track 'path' and its 'offset' on the meeting timeline in
+    seconds. The track is read in blocks twice, once to find where the speech
+    starts and ends and once to convert that span. Returns the 'chunks' to
+    upload, the 'offsets' that map their timestamps back across removed
+    silences and the 'shift' to add afterwards, or None if the track is silent.
+    """
+    path = pathlib.Path(job['path'])
+    with wave.open(str(path), 'rb') as wav_file:
+        params = wav_file.getparams()
+        span = find_loud_span(wav_file)
+        if span is None:
+            return None
+
+        first, end = span
+        prepared = write_asr_blocks(
+            _read_span(wav_file, first, end), params.framerate, params.nchannels, path.with_name(f"{path.stem}_asr")
+        )
+
+    return {**prepared, 'shift': job['offset'] + first / params.framerate}
+
+
+def prepare_chunk(job: dict):
+    """Convert one utterance of raw PCM to 16 kHz mono for upload. Runs in a worker process.
+
+    `job` holds the 'pcm' bytes (48 kHz stereo 16-bit) and their 'offset' on the
+    meeting timeline in seconds. Returns the same shape as `prepare_track`.
+    """
+    fd, name = tempfile.mkstemp(prefix='utterance_')
+    os.close(fd)
+    base = pathlib.Path(name)
+
+    samples = np.frombuffer(job['pcm'], dtype=np.int16)
+    try:
+        prepared = write_asr_audio(samples, 48000, 2, base)
+    finally:
+        base.unlink(missing_ok=True)
+
+    return {**prepared, 'shift': job['offset']}
+
+
+async def transcribe_upload(prepared: dict, service) -> dict:
+    """Transcribe every chunk of a prepared upload concurrently and delete the files.
+
+    The chunks are stitched back together and their timestamps remapped onto
+    the timeline of the audio before silence removal.
+    """
+    chunks = prepared['chunks']
+    try:
+        results = await asyncio.gather(
+            *(service.transcribe(chunk['path']) for chunk in chunks), return_exceptions=True
+        )
+    finally:
+        for chunk in chunks:
+            pathlib.Path(chunk['path']).unlink(missing_ok=True)
+
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+    return remap_transcription(stitch_chunks(chunks, results), prepared['offsets'])
+
+
+async def transcribe_prepared(prepared, service, speaker: str) -> dict:
+    """Transcribe a prepared track or utterance and place it on the meeting timeline"""
+    if prepared is None:
+        return {'speaker': speaker, 'text': "", 'segments': [], 'words': []}
+
+    transcription = await transcribe_upload(prepared, service)
+    return place_on_timeline(transcription, prepared['shift'], speaker)
+
+
+def place_on_timeline(transcription: dict, shift: float, speaker: str) -> dict:
+    result = {'speaker': speaker, 'text': transcription['text']}
+    for key in ('segments', 'words'):
+        result[key] = [
+            {'start': item['start'] + shift, 'end': item['end'] + shift, 'text': item['text'], 'speaker': speaker}
+            for item in transcription[key]
+        ]
+    return result
+
+
+async def process_tracks(jobs: list, service, progress=None) -> list:
+    """Process every speaker's track concurrently.
+
+    Trimming and encoding run in the process pool, uploads go through the shared
+    TranscriptionService. `progress` is an optional coroutine function called
+    with (done, total) as tracks finish. Tracks that fail are reported and left
+    out of the results.
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    done = 0
+
+    async def run(job):
+        nonlocal done
+        try:
+            prepared = await loop.run_in_executor(executor, prepare_track, job)
+            return await transcribe_prepared(prepared, service, job['speaker'])
+        finally:
+            done += 1
+            if progress is not None:
+                await progress(done, len(jobs))
+
+    results = await asyncio.gather(*(run(job) for job in jobs), return_exceptions=True)
+
+    processed = []
+    for job, result in zip(jobs, results):
+        if isinstance(result, BaseException):
+            print(f"Error processing track {job['path']}: {result!r}")
+        else:
+            processed.append(result)
+    return processed
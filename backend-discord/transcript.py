@@ -0,0 +1,197 @@
+import json
+import functools
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+
+class TimedItems:
+    """Columns of timed text items, segments or words, kept sorted by start time"""
+
+    __slots__ = ('start', 'end', 'text', 'speaker')
+
+    def __init__(self, start=(), end=(), text=(), speaker=()):
+        self.start = np.asarray(start, dtype=np.float64)
+        self.end = np.asarray(end, dtype=np.float64)
+        self.text = list(text)
+        self.speaker = np.asarray(speaker, dtype=np.int32)  # Index into Transcript.speakers, -1 for none
+
+    @classmethod
+    def from_items(cls, items: list, speaker_index=None) -> 'TimedItems':
+        """Build columns from dicts with 'start', 'end', 'text' and optionally 'speaker'"""
+        speaker_index = speaker_index or (lambda name: -1)
+        items = sorted(items, key=lambda item: item['start'])
+        return cls(
+            [item['start'] for item in items],
+            [item['end'] for item in items],
+            [item['text'] for item in items],
+            [speaker_index(item.get('speaker')) for item in items]
+        )
+
+    def __len__(self):
+        return len(self.text)
+
+    def to_columns(self) -> dict:
+        return {
+            'start': self.start.round(3).tolist(),
+            'end': self.end.round(3).tolist(),
+            'text': self.text,
+            'speaker': self.speaker.tolist()
+        }
+
+
+class Transcript:
+    """A meeting transcript stored as columns instead of formatted text.
+
+    Segments and words keep start/end times, text and a speaker index in
+    parallel arrays, so searching, speaker statistics and every output format
+    work on the data directly. Text, SRT and VTT are rendered on first use.
+    """
+
+    def __init__(self, segments: TimedItems = None, words: TimedItems = None, speakers=(), text: str = None):
+        self.segments = segments if segments is not None else TimedItems()
+        self.words = words if words is not None else TimedItems()
+        self.speakers = list(speakers)
+        self.text = text  # Whisper's own full text for single-speaker transcripts
+
+    @classmethod
+    def from_results(cls, results: list) -> 'Transcript':
+        """Merge per-speaker results (see tracks.place_on_timeline) onto one timeline"""
+        speakers = []
+        indices = {}
+
+        def speaker_index(name):
+            if name is None:
+                return -1
+            if name not in indices:
+                indices[name] = len(speakers)
+                speakers.append(name)
+            return indices[name]
+
+        return cls(
+            TimedItems.from_items([s for r in results for s in r['segments']], speaker_index),
+            TimedItems.from_items([w for r in results for w in r['words']], speaker_index),
+            speakers
+        )
+
+    @classmethod
+    def from_transcription(cls, transcription: dict) -> 'Transcript':
+        """Wrap a parsed Whisper transcription of the mixed recording, which has no speakers"""
+        return cls(
+            TimedItems.from_items(transcription['segments']),
+            TimedItems.from_items(transcription['words']),
+            text=transcription['text']
+        )
+
+    def __bool__(self):
+        return bool(len(self.segments) or self.text)
+
+    def speaker_name(self, index: int):
+        return self.speakers[index] if index >= 0 else None
+
+    def speaker_times(self) -> dict:
+        """Seconds of transcribed speech per speaker"""
+        durations = self.segments.end - self.segments.start
+        totals = np.bincount(self.segments.speaker[self.segments.speaker >= 0],
+                             weights=durations[self.segments.speaker >= 0], minlength=len(self.speakers))
+        return dict(zip(self.speakers, totals.tolist()))
+
+    def search(self, query: str) -> list:
+        """Segments containing `query`, case-insensitively, as (start, end, speaker, text)"""
+        query = query.lower()
+        return [
+            (float(self.segments.start[i]), float(self.segments.end[i]),
+             self.speaker_name(int(self.segments.speaker[i])), text)
+            for i, text in enumerate(self.segments.text) if query in text.lower()
+        ]
+
+    def _label(self, items: TimedItems, i: int) -> str:
+        speaker = self.speaker_name(int(items.speaker[i]))
+        return f"{speaker}: {items.text[i]}" if speaker else items.text[i]
+
+    @functools.cached_property
+    def plain_text(self) -> str:
+        """The transcript as the text block stored with recordings"""
+        lines = ["=== TRANSCRIPTION ===", ""]
+
+        lines.append("Full Text:")
+        if self.speakers or self.text is None:
+            lines.extend(self._label(self.segments, i) for i in range(len(self.segments)))
+        else:
+            lines.append(self.text)
+        lines.append("")
+
+        lines.append("Segments:")
+        lines.extend(
+            f"[{self.segments.start[i]:.2f}s - {self.segments.end[i]:.2f}s] {self._label(self.segments, i)}"
+            for i in range(len(self.segments))
+        )
+
+        if len(self.words):
+            lines.append("")
+            lines.append("Word-level Timestamps:")
+            lines.extend(
+                f"[{self.words.start[i]:.2f}s - {self.words.end[i]:.2f}s] {self._label(self.words, i)}"
+                for i in range(len(self.words))
+            )
+
+        return "\n".join(lines) + "\n"
+
+    @functools.cached_property
+    def srt(self) -> str:
+        cues = (
+            f"{i + 1}\n{_timestamp(self.segments.start[i], ',')} --> {_timestamp(self.segments.end[i], ',')}\n"
+            f"{self._label(self.segments, i)}\n"
+            for i in range(len(self.segments))
+        )
+        return "\n".join(cues)
+
+    @functools.cached_property
+    def vtt(self) -> str:
+        cues = []
+        for i in range(len(self.segments)):
+            speaker = self.speaker_name(int(self.segments.speaker[i]))
+            text = f"<v {speaker}>{self.segments.text[i]}" if speaker else self.segments.text[i]
+            cues.append(f"{_timestamp(self.segments.start[i], '.')} --> {_timestamp(self.segments.end[i], '.')}\n{text}\n")
+        return "WEBVTT\n\n" + "\n".join(cues)
+
+    def __str__(self):
+        return self.plain_text
+
+    def dumps(self) -> str:
+        """Serialize as JSON lines: a header, then one line of columns each for segments and words"""
+        header = {'version': FORMAT_VERSION, 'speakers': self.speakers, 'text': self.text}
+        return "\n".join((
+            json.dumps(header, ensure_ascii=False),
+            json.dumps({'segments': self.segments.to_columns()}, ensure_ascii=False),
+            json.dumps({'words': self.words.to_columns()}, ensure_ascii=False)
+        )) + "\n"
+
+    @classmethod
+    def loads(cls, data: str) -> 'Transcript':
+        lines = [json.loads(line) for line in data.splitlines() if line.strip()]
+        header, tables = lines[0], {}
+        if header.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported transcript format version {header.get('version')}")
+        for line in lines[1:]:
+            for name, columns in line.items():
+                tables[name] = TimedItems(columns['start'], columns['end'], columns['text'], columns['speaker'])
+        return cls(tables.get('segments'), tables.get('words'), header['speakers'], header['text'])
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.dumps())
+
+    @classmethod
+    def load(cls, path) -> 'Transcript':
+        with open(path, encoding='utf-8') as f:
+            return cls.loads(f.read())
+
+
+def _timestamp(seconds: float, separator: str) -> str:
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
@@ -0,0 +1,95 @@
+import os
+import asyncio
+import pathlib
+
+import groq
+
+from storage import run_io
+
+WHISPER_MODEL = "whisper-large-v3-turbo"
+
+# Uploads in flight at once, shared by every guild
+TRANSCRIBE_CONCURRENCY = int(os.getenv('TRANSCRIBE_CONCURRENCY', 4))
+# Seconds a single transcription request may take, including the client's retries
+TRANSCRIBE_TIMEOUT = float(os.getenv('TRANSCRIBE_TIMEOUT', 300))
+
+
+def _field(obj, *names):
+    """Read a field from a Whisper response item, which may be a dict or an object"""
+    for name in names:
+        value = obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+        if value is not None:
+            return value
+    return None
+
+
+def parse_transcription(transcription) -> dict:
+    """Convert a verbose_json Whisper response into plain text/segments/words data"""
+    segments = []
+    for segment in _field(transcription, 'segments') or []:
+        start, end, text = _field(segment, 'start'), _field(segment, 'end'), _field(segment, 'text')
+        if start is not None and end is not None and text is not None:
+            segments.append({'start': start, 'end': end, 'text': text.strip()})
+
+    words = []
+    for word in _field(transcription, 'words') or []:
+        start, end, text = _field(word, 'start'), _field(word, 'end'), _field(word, 'word', 'text')
+        if start is not None and end is not None and text is not None:
+            words.append({'start': start, 'end': end, 'text': text.strip()})
+
+    return {'text': _field(transcription, 'text') or "", 'segments': segments, 'words': words}
+
+
+def _read_file(path) -> bytes:
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+class TranscriptionService:
+    """Async Whisper client shared by every guild.
+
+    At most `max_concurrency` uploads run at once; further requests queue on a
+    semaphore in arrival order. Each request is bounded by `timeout` seconds so
+    a stuck upload can't hold a slot forever. Nothing here blocks the event loop.
+    """
+
+    def __init__(self, api_key: str = None, *, max_concurrency: int = TRANSCRIBE_CONCURRENCY,
+                 timeout: float = TRANSCRIBE_TIMEOUT, model: str = WHISPER_MODEL):
+        self.client = groq.AsyncGroq(api_key=api_key, timeout=timeout)
+        self.model = model
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+
+        self.queued = 0  # Requests waiting for a slot
+        self.active = 0  # Requests being uploaded or transcribed
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def transcribe(self, path) -> dict:
+        """Transcribe an audio file and return its parsed text, segments and words.
+
+        Raises asyncio.TimeoutError if the request takes longer than `timeout`.
+        """
+        path = pathlib.Path(path)
+
+        self.queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        self.active += 1
+        try:
+            data = await run_io(_read_file, path)
+            transcription = await asyncio.wait_for(
+                self.client.audio.transcriptions.create(
+                    file=(path.name, data),
+                    model=self.model,
+                    response_format="verbose_json"
+                ),
+                timeout=self.timeout
+            )
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+        return parse_transcription(transcription)